@@ -0,0 +1,42 @@
+"""
+Measures building and querying a record with many data channels, like per-tooth features or FFT bins.
+"""
+import random
+import time
+
+import spp2086.measurement_data
+
+
+N_CHANNELS = 10_000
+N_GRIDS = 10
+
+
+def bench_channel_index():
+
+    record = spp2086.measurement_data.MeasurementRecord()
+    for grid_idx in range(N_GRIDS):
+        record.add_sampling_grid(f"grid {grid_idx}", "s", [0.0, 1.0])
+
+    start = time.perf_counter()
+    for channel_idx in range(N_CHANNELS):
+        record.add_data_channel(f"channel {channel_idx}", "", channel_idx % N_GRIDS, [0.0, 1.0])
+    duration = time.perf_counter() - start
+    print(f"add_data_channel x {N_CHANNELS}: {duration:.3f} s")
+
+    names = record.get_data_channel_names()
+    random.shuffle(names)
+    start = time.perf_counter()
+    for name in names:
+        record.get_data_channel(name)
+    duration = time.perf_counter() - start
+    print(f"get_data_channel x {N_CHANNELS}: {duration:.3f} s")
+
+    start = time.perf_counter()
+    for grid_idx in range(N_GRIDS):
+        record.get_data_channel_names(grid_idx)
+    duration = time.perf_counter() - start
+    print(f"get_data_channel_names(sampling_grid_idx) x {N_GRIDS}: {duration:.3f} s")
+
+
+if __name__ == '__main__':
+    bench_channel_index()
@@ -0,0 +1,69 @@
+"""
+Compares the compressed encodings and filters of external files on sine and noise channels
+like those of examples/simple_example.py.
+"""
+import os
+import tempfile
+import time
+
+import numpy
+
+import spp2086.measurement_data
+
+from synthetic import generate_header
+
+
+N_SAMPLES = 1_000_000
+
+
+def create_channels() -> dict:
+    rng = numpy.random.default_rng(0)
+    t = numpy.arange(N_SAMPLES) * 1e-4
+    return {
+        "sine": numpy.sin(2*numpy.pi*50*t),
+        "sine+noise": numpy.sin(2*numpy.pi*50*t) + 0.01*rng.standard_normal(N_SAMPLES),
+        "counter": numpy.arange(N_SAMPLES, dtype=numpy.int32),
+    }
+
+
+def bench_compression():
+
+    channels = create_channels()
+    variants = [("json", [])] + [(f"bin{compression}", filters)
+        for compression in ("", "+gzip", "+zstd", "+lz4")
+        for filters in ([], ["shuffle"], ["delta", "shuffle"])
+        if compression or not filters]
+
+    print(f"{N_SAMPLES} samples per channel, MB/s relative to the uncompressed binary size")
+    print(f"{'channel':12}{'encoding':12}{'filters':18}{'ratio':>8}{'write MB/s':>12}{'read MB/s':>12}")
+    with tempfile.TemporaryDirectory() as tempdir:
+        for name, values in channels.items():
+            for encoding, filters in variants:
+                record = spp2086.measurement_data.MeasurementRecord()
+                record.header = generate_header()
+                record.add_sampling_grid("grid", "s", [0.0])
+                data = values.tolist() if encoding == "json" else values
+                try:
+                    record.add_data_channel(name, "1", 0, data, storageType="externalFile", encoding=encoding, filters=filters)
+                except ImportError as err:
+                    print(f"{name:12}{encoding:12}skipped: {err}")
+                    continue
+                filepath = os.path.join(tempdir, f"{name}_{encoding}_{len(filters)}.json")
+
+                start = time.perf_counter()
+                record.write(filepath, validate="header")
+                write_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filepath, validate="header")
+                read_time = time.perf_counter() - start
+
+                record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filepath, lazy_loading=True, validate="header")
+                ext_filepath = os.path.join(tempdir, record_read.data_channels[0]["data"]["relativeFilePath"])
+                ratio = values.nbytes / os.path.getsize(ext_filepath)
+                megabytes = values.nbytes / 1e6
+                print(f"{name:12}{encoding:12}{','.join(filters) or '-':18}{ratio:>8.2f}{megabytes/write_time:>12.1f}{megabytes/read_time:>12.1f}")
+
+
+if __name__ == '__main__':
+    bench_compression()
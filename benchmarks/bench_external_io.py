@@ -0,0 +1,105 @@
+"""
+Compares the file I/O per external channel of MeasurementRecord with the former
+two-pass implementation that re-read each file to compute its md5 checksum.
+
+The byte counts are taken from /proc/self/io and therefore only available on Linux.
+"""
+import hashlib
+import json
+import math
+import os
+import tempfile
+import time
+
+import spp2086.measurement_data
+
+from synthetic import generate_header
+
+
+N_CHANNELS = 8
+N_SAMPLES = 200_000
+
+
+def io_counters():
+    """return the number of bytes read and written by this process so far"""
+    counters = {}
+    with open("/proc/self/io") as file:
+        for line in file:
+            key, value = line.split(":")
+            counters[key] = int(value)
+    return counters["rchar"], counters["wchar"]
+
+
+def measure(function, *args):
+    """return the result, duration and bytes read/written of a function call"""
+    read_before, written_before = io_counters()
+    start = time.perf_counter()
+    result = function(*args)
+    duration = time.perf_counter() - start
+    read_after, written_after = io_counters()
+    return result, duration, read_after - read_before, written_after - written_before
+
+
+def create_record():
+    record = spp2086.measurement_data.MeasurementRecord()
+    record.header = generate_header()
+    grid = [n*1e-4 for n in range(N_SAMPLES)]
+    record.add_sampling_grid("grid", "s", grid, storageType="externalFile")
+    for channel_idx in range(N_CHANNELS):
+        data = [math.sin(t*(channel_idx+1)) for t in grid]
+        record.add_data_channel(f"channel {channel_idx}", "N", 0, data, storageType="externalFile")
+    return record
+
+
+def legacy_write(data, filename):
+    """former implementation: write the file, then read it back for the checksum"""
+    with open(filename, mode='wt', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
+    with open(filename, mode='rb') as file:
+        file_hash = hashlib.md5()
+        while chunk := file.read(8192):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def legacy_read(filename):
+    """former implementation: hash the file, then open it again for parsing"""
+    with open(filename, mode='rb') as file:
+        file_hash = hashlib.md5()
+        while chunk := file.read(8192):
+            file_hash.update(chunk)
+    with open(filename, mode='rt', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def bench_external_io():
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        record = create_record()
+        data_iters = record.sampling_grids + record.data_channels
+        n_files = len(data_iters)
+        channel_data = [data_iter["data"] for data_iter in data_iters]
+        filepath = os.path.join(tempdir, "record.json")
+
+        _, write_time, write_read, write_written = measure(record.write, filepath)
+        written = spp2086.measurement_data.MeasurementRecord.from_filename(filepath, lazy_loading=True)
+        ext_files = [os.path.join(tempdir, data_iter["data"]["relativeFilePath"]) for data_iter in written.sampling_grids + written.data_channels]
+        payload = sum(os.path.getsize(ext_file) for ext_file in ext_files)
+
+        _, read_time, read_read, _ = measure(spp2086.measurement_data.MeasurementRecord.from_filename, filepath)
+
+        legacy_files = [os.path.join(tempdir, f"legacy_{n}.json") for n in range(n_files)]
+        _, legacy_write_time, legacy_write_read, _ = measure(lambda: [legacy_write(data, name) for data, name in zip(channel_data, legacy_files)])
+        _, legacy_read_time, legacy_read_read, _ = measure(lambda: [legacy_read(name) for name in legacy_files])
+
+    print(f"{n_files} external files, {payload/n_files/1e6:.2f} MB per file")
+    print(f"{'':16}{'read MB/file':>18}{'time [s]':>12}")
+    print(f"{'write (legacy)':16}{legacy_write_read/n_files/1e6:>18.2f}{legacy_write_time:>12.3f}")
+    print(f"{'write':16}{write_read/n_files/1e6:>18.2f}{write_time:>12.3f}")
+    print(f"{'read (legacy)':16}{legacy_read_read/n_files/1e6:>18.2f}{legacy_read_time:>12.3f}")
+    print(f"{'read':16}{read_read/n_files/1e6:>18.2f}{read_time:>12.3f}")
+    print(f"bytes written during write: {write_written/1e6:.2f} MB for {payload/1e6:.2f} MB of external payload")
+
+
+if __name__ == '__main__':
+    bench_external_io()
@@ -0,0 +1,33 @@
+"""
+Compares opening a record with large inplace channels completely and header-only.
+"""
+import os
+import tempfile
+import time
+
+import spp2086.measurement_data
+
+from bench_validation import N_SAMPLES, create_record
+
+
+def bench_header_open():
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        filepath = os.path.join(tempdir, "record.json")
+        create_record().write(filepath, validate="structure")
+        print(f"{3*N_SAMPLES} inplace samples, main file of {os.path.getsize(filepath)/1e6:.1f} MB")
+
+        for load, validate in (("all", "structure"), ("header", "structure"), ("header", "header")):
+            start = time.perf_counter()
+            record = spp2086.measurement_data.MeasurementRecord.from_filename(filepath, load=load, validate=validate)
+            duration = time.perf_counter() - start
+            print(f"from_filename(load='{load}', validate='{validate}'): {duration:.3f} s")
+
+        start = time.perf_counter()
+        record.get_data_channel("force")
+        duration = time.perf_counter() - start
+        print(f"get_data_channel('force') after header-only open: {duration:.3f} s")
+
+
+if __name__ == '__main__':
+    bench_header_open()
@@ -0,0 +1,63 @@
+"""
+Compares the JSON backends for writing and reading a record with large inplace data and external JSON files,
+with the data given as lists and as numpy arrays, and the sizes of the main file in the JSON layouts.
+"""
+import os
+import tempfile
+import time
+
+import numpy
+
+import spp2086.measurement_data
+
+from synthetic import generate_header
+
+
+N_CHANNELS = 8
+N_SAMPLES = 200_000
+
+
+def create_record(as_array: bool) -> spp2086.measurement_data.MeasurementRecord:
+    rng = numpy.random.default_rng(0)
+    record = spp2086.measurement_data.MeasurementRecord()
+    record.header = generate_header()
+    record.add_sampling_grid("grid", "s", (numpy.arange(N_SAMPLES) * 1e-4).tolist())
+    for channel_idx in range(N_CHANNELS):
+        values = rng.standard_normal(N_SAMPLES)
+        record.add_data_channel(f"inplace_{channel_idx}", "1", 0, values.tolist())
+        record.add_data_channel(f"external_{channel_idx}", "1", 0, values if as_array else values.tolist(), storageType="externalFile")
+    return record
+
+
+def bench_json_backend():
+
+    records = {"lists": create_record(False), "arrays": create_record(True)}
+    print(f"{N_CHANNELS} inplace and {N_CHANNELS} external channels of {N_SAMPLES} samples")
+    with tempfile.TemporaryDirectory() as tempdir:
+        for name in spp2086.measurement_data.JSON_BACKENDS:
+            try:
+                spp2086.measurement_data.set_json_backend(name)
+            except ImportError as err:
+                print(f"{name:>7}: skipped: {err}")
+                continue
+            for data_type, record in records.items():
+                filepath = os.path.join(tempdir, f"{name}_{data_type}.json")
+                start = time.perf_counter()
+                record.write(filepath, validate="header")
+                write_duration = time.perf_counter() - start
+                start = time.perf_counter()
+                spp2086.measurement_data.MeasurementRecord.from_filename(filepath, validate="header")
+                read_duration = time.perf_counter() - start
+                print(f"{name:>7}, {data_type:>6}: write {write_duration:.3f} s, read {read_duration:.3f} s")
+        spp2086.measurement_data.set_json_backend(None)
+
+        for layout in spp2086.measurement_data.JSON_LAYOUTS:
+            filepath = os.path.join(tempdir, f"{layout}.json")
+            start = time.perf_counter()
+            records["lists"].write(filepath, validate="header", json_layout=layout)
+            duration = time.perf_counter() - start
+            print(f"{layout:>13}: main file {os.path.getsize(filepath)/1e6:.1f} MB, write {duration:.3f} s")
+
+
+if __name__ == '__main__':
+    bench_json_backend()
@@ -0,0 +1,58 @@
+"""
+Compares loading a generated corpus of records one after the other with MeasurementRecord.load_many.
+"""
+import math
+import os
+import tempfile
+import time
+
+import spp2086.measurement_data
+
+from synthetic import generate_header
+
+
+N_RECORDS = 64
+N_SAMPLES = 20_000
+
+
+def create_corpus(directory):
+    """write N_RECORDS records with an inplace and two external channels and return their paths"""
+    filepaths = []
+    grid = [n*1e-4 for n in range(N_SAMPLES)]
+    for record_idx in range(N_RECORDS):
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = generate_header()
+        record.add_sampling_grid("grid", "s", grid)
+        record.add_data_channel("force", "N", 0, [math.sin(t*record_idx) for t in grid])
+        record.add_data_channel("current", "A", 0, [math.cos(t*record_idx) for t in grid], storageType="externalFile")
+        record.add_data_channel("speed", "1/min", 0, [t*record_idx for t in grid], storageType="externalFile")
+        filepath = os.path.join(directory, f"record_{record_idx}.json")
+        record.write(filepath, validate="structure")
+        filepaths.append(filepath)
+    return filepaths
+
+
+def bench_load_many(validate="structure"):
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        filepaths = create_corpus(tempdir)
+
+        start = time.perf_counter()
+        for filepath in filepaths:
+            spp2086.measurement_data.MeasurementRecord.from_filename(filepath, validate=validate)
+        serial_time = time.perf_counter() - start
+        print(f"{N_RECORDS} records, validate='{validate}', {os.cpu_count()} CPUs")
+        print(f"{'serial':>20}: {serial_time:.3f} s")
+
+        for executor in ("thread", "process"):
+            for workers in (1, 2, 4, 8):
+                start = time.perf_counter()
+                for result in spp2086.measurement_data.MeasurementRecord.load_many(filepaths, workers=workers, executor=executor, validate=validate):
+                    if result.error is not None:
+                        raise result.error
+                duration = time.perf_counter() - start
+                print(f"{executor:>10} x {workers:<7}: {duration:.3f} s, speedup {serial_time/duration:.2f}")
+
+
+if __name__ == '__main__':
+    bench_load_many()
@@ -0,0 +1,62 @@
+"""
+Compares aligning a 10 kHz channel onto a 100 Hz grid with a loop over the samples in python
+with MeasurementRecord.align_channels on a memory mapped record.
+"""
+import bisect
+import os
+import tempfile
+import time
+
+import numpy
+
+import spp2086.measurement_data
+
+from synthetic import generate_header
+
+
+N_SAMPLES = 2_000_000
+
+
+def align_in_python(grid, values, target):
+    """linear interpolation as it is written without numpy"""
+    aligned = []
+    for point in target:
+        idx = min(max(bisect.bisect_right(grid, point) - 1, 0), len(grid) - 2)
+        weight = (point - grid[idx]) / (grid[idx + 1] - grid[idx])
+        aligned.append(values[idx] * (1 - weight) + values[idx + 1] * weight)
+    return aligned
+
+
+def bench_resampling():
+
+    t_fast = numpy.arange(N_SAMPLES) * 1e-4
+    t_slow = numpy.arange(N_SAMPLES // 100) * 1e-2
+    record = spp2086.measurement_data.MeasurementRecord()
+    record.header = generate_header()
+    record.add_sampling_grid("fast timer", "s", t_fast, storageType="externalFile", encoding="bin")
+    record.add_sampling_grid("slow timer", "s", t_slow, storageType="externalFile", encoding="bin")
+    record.add_data_channel("force", "N", 0, numpy.sin(2*numpy.pi*2*t_fast), storageType="externalFile", encoding="bin")
+    record.add_data_channel("temperature", "K", 1, numpy.linspace(20, 40, len(t_slow)), storageType="externalFile", encoding="bin")
+
+    print(f"{N_SAMPLES} samples at 10 kHz aligned to 100 Hz and {N_SAMPLES // 100} samples at 100 Hz aligned to 10 kHz")
+    with tempfile.TemporaryDirectory() as tempdir:
+        filepath = os.path.join(tempdir, "record.json")
+        record.write(filepath, validate="header")
+
+        start = time.perf_counter()
+        align_in_python(t_fast.tolist(), record.data_channels[0]["data"].tolist(), t_slow.tolist())
+        align_in_python(t_slow.tolist(), record.data_channels[1]["data"].tolist(), t_fast.tolist())
+        print(f"{'python loop, linear':>32}: {time.perf_counter() - start:.3f} s")
+
+        for method in spp2086.measurement_data.RESAMPLING_METHODS:
+            for anti_aliasing in (False, True):
+                record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filepath, lazy_loading=True, memory_map=True, validate="header")
+                start = time.perf_counter()
+                record_read.align_channels(["temperature", "force"], method=method, anti_aliasing=anti_aliasing)
+                record_read.align_channels(["force", "temperature"], method=method, anti_aliasing=anti_aliasing)
+                label = f"align_channels, {method}{', anti-aliasing' if anti_aliasing else ''}"
+                print(f"{label:>32}: {time.perf_counter() - start:.3f} s")
+
+
+if __name__ == '__main__':
+    bench_resampling()
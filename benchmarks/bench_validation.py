@@ -0,0 +1,48 @@
+"""
+Compares the validation modes of MeasurementRecord on a record with large inplace channels.
+"""
+import json
+import math
+import os
+import tempfile
+import time
+
+import spp2086.measurement_data
+
+from synthetic import generate_header
+
+
+N_SAMPLES = 200_000
+
+
+def create_record():
+    record = spp2086.measurement_data.MeasurementRecord()
+    record.header = generate_header()
+    grid = [n*1e-4 for n in range(N_SAMPLES)]
+    record.add_sampling_grid("grid", "s", grid)
+    record.add_data_channel("force", "N", 0, [math.sin(t) for t in grid])
+    record.add_data_channel("position", "mm", 0, [[math.cos(t), math.sin(t)] for t in grid])
+    return record
+
+
+def bench_validation():
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        filepath = os.path.join(tempdir, "record.json")
+        create_record().write(filepath, validate="structure")
+
+        start = time.perf_counter()
+        with open(filepath, mode='rt', encoding='utf-8') as file:
+            json.load(file)
+        parse_time = time.perf_counter() - start
+        print(f"{3*N_SAMPLES} inplace samples, json.load alone: {parse_time:.3f} s")
+
+        for validate in spp2086.measurement_data.VALIDATION_MODES:
+            start = time.perf_counter()
+            spp2086.measurement_data.MeasurementRecord.from_filename(filepath, validate=validate)
+            duration = time.perf_counter() - start
+            print(f"from_filename(validate='{validate}'): {duration:.3f} s")
+
+
+if __name__ == '__main__':
+    bench_validation()
@@ -0,0 +1,45 @@
+"""
+Compares verifying an archive of records without a checksum cache, with an empty cache and with a cache
+in which all files are verified already, and opening a record with and without the cache.
+"""
+import os
+import tempfile
+import time
+
+import spp2086.measurement_data
+
+from synthetic import generate_record
+
+
+N_RECORDS = 20
+N_CHANNELS = 8
+N_SAMPLES = 200_000
+
+
+def bench_verification():
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        archive_dir = os.path.join(tempdir, "archive")
+        for record_idx in range(N_RECORDS):
+            generate_record(N_CHANNELS, N_SAMPLES, "externalFile", "bin", seed=record_idx).write(os.path.join(archive_dir, f"run_{record_idx}.json"),
+                validate="header")
+        megabytes = N_RECORDS * (N_CHANNELS + 1) * N_SAMPLES * 8 / 1e6
+        print(f"{N_RECORDS} records of {N_CHANNELS + 1} external files, {megabytes:.0f} MB, {os.cpu_count()} CPUs")
+
+        with spp2086.measurement_data.ChecksumCache(os.path.join(tempdir, "checksums.sqlite")) as cache:
+            for label, checksum_cache in (("no cache", None), ("empty cache", cache), ("filled cache", cache)):
+                start = time.perf_counter()
+                results = spp2086.measurement_data.verify_archive(archive_dir, checksum_cache)
+                duration = time.perf_counter() - start
+                print(f"verify_archive, {label:>12}: {duration:.3f} s, {len(results)} files")
+
+            filename = os.path.join(archive_dir, "run_0.json")
+            for label, checksum_cache in (("no cache", None), ("filled cache", cache)):
+                start = time.perf_counter()
+                spp2086.measurement_data.MeasurementRecord.from_filename(filename, validate="header", checksum_cache=checksum_cache)
+                duration = time.perf_counter() - start
+                print(f"from_filename,  {label:>12}: {duration:.3f} s")
+
+
+if __name__ == '__main__':
+    bench_verification()
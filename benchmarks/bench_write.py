@@ -0,0 +1,38 @@
+"""
+Compares the throughput of MeasurementRecord.write for a record with many external channels
+with threads that write the external files in parallel and worker processes that encode JSON lists.
+"""
+import os
+import tempfile
+import time
+
+from synthetic import generate_record
+
+
+N_CHANNELS = 64
+N_SAMPLES = 100_000
+
+
+def bench_write():
+
+    megabytes = N_CHANNELS * N_SAMPLES * 8 / 1e6
+    print(f"{N_CHANNELS} channels of {N_SAMPLES} samples, MB/s relative to the binary size, {os.cpu_count()} CPUs")
+    with tempfile.TemporaryDirectory() as tempdir:
+        for encoding in ("bin", "bin+zstd", "json"):
+            try:
+                record = generate_record(N_CHANNELS, N_SAMPLES, "externalFile", encoding)
+            except ImportError as err:
+                print(f"{encoding:>10}: skipped: {err}")
+                continue
+            for workers, json_processes in ((None, None), (4, None), (8, None), (4, 4)):
+                if json_processes is not None and not encoding.startswith("json"):
+                    continue
+                filepath = os.path.join(tempdir, f"{encoding}_{workers}_{json_processes}.json")
+                start = time.perf_counter()
+                record.write(filepath, validate="header", workers=workers, json_processes=json_processes)
+                duration = time.perf_counter() - start
+                print(f"{encoding:>10}, workers {workers or 1:<2}, json_processes {json_processes or 0:<2}: {duration:.3f} s, {megabytes/duration:.1f} MB/s")
+
+
+if __name__ == '__main__':
+    bench_write()
@@ -0,0 +1,174 @@
+"""
+Benchmark suite of the load and write paths on synthetic records, compared against a stored baseline.
+
+Times write, from_filename (eager, lazy and header-only), validate_header and get_data_channel for records
+of several layouts and measures the peak memory of each operation with tracemalloc. The results are compared
+with benchmarks/baselines/<size>.json, operations slower or larger than the baseline by more than the tolerance
+are reported as regressions and make the script exit with status 1.
+
+    python benchmarks/run_benchmarks.py --size small
+    python benchmarks/run_benchmarks.py --size small --save-baseline
+
+Baselines depend on the machine, so they should be saved on the machine that compares against them.
+"""
+from typing import Callable, Dict, NamedTuple, Optional
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import spp2086.measurement_data
+
+from synthetic import generate_record
+
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+#number of channels and samples per channel of each size
+SIZES = {
+    "small": {"n_channels": 8, "n_samples": 10_000},
+    "medium": {"n_channels": 32, "n_samples": 100_000},
+    "large": {"n_channels": 128, "n_samples": 500_000}
+}
+
+#layouts of the records, passed on to generate_record together with the size
+SCENARIOS = {
+    "inplace_json": {"storage_type": "inplace"},
+    "external_json": {"storage_type": "externalFile", "encoding": "json"},
+    "external_bin": {"storage_type": "externalFile", "encoding": "bin"},
+    "deep_header": {"storage_type": "externalFile", "encoding": "bin", "n_parameters": 500, "header_depth": 50}
+}
+
+
+class Operation(NamedTuple):
+    """setup returns the argument of run, only run is timed and measured"""
+    setup: Callable[[], object]
+    run: Callable[[object], object]
+
+
+def operations(filepath: str) -> Dict[str, Operation]:
+    """return the benchmarked operations on the record written to filepath"""
+
+    MeasurementRecord = spp2086.measurement_data.MeasurementRecord
+
+    def read_all_channels(record):
+        for name in record.get_data_channel_names():
+            record.get_data_channel(name)
+
+    return {
+        "write": Operation(lambda: MeasurementRecord.from_filename(filepath), lambda record: record.write(filepath + ".copy.json")),
+        "from_filename": Operation(lambda: filepath, MeasurementRecord.from_filename),
+        "from_filename_lazy": Operation(lambda: filepath, lambda path: MeasurementRecord.from_filename(path, lazy_loading=True)),
+        "from_filename_header": Operation(lambda: filepath, lambda path: MeasurementRecord.from_filename(path, load="header")),
+        "validate_header": Operation(lambda: MeasurementRecord.from_filename(filepath, load="header"), lambda record: record.validate_header()),
+        "get_data_channel": Operation(lambda: MeasurementRecord.from_filename(filepath, load="header"), read_all_channels)
+    }
+
+
+def measure(operation: Operation, repeat: int) -> dict:
+    """return the best and median duration of repeat runs after one warm-up run and the peak memory of one more run"""
+
+    operation.run(operation.setup())
+    durations = []
+    for _ in range(repeat):
+        argument = operation.setup()
+        start = time.perf_counter()
+        operation.run(argument)
+        durations.append(time.perf_counter() - start)
+
+    #tracemalloc slows down allocations, so memory is measured in a separate run
+    argument = operation.setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        operation.run(argument)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(durations), "median_seconds": statistics.median(durations), "peak_mb": peak / 1e6}
+
+
+def run_suite(size: str, repeat: int, scenario_filter: Optional[str] = None) -> dict:
+    """run all scenarios and operations and return the results by 'scenario/operation'"""
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tempdir:
+        for scenario, kwargs in SCENARIOS.items():
+            if scenario_filter and scenario_filter not in scenario:
+                continue
+            filepath = os.path.join(tempdir, scenario, "record.json")
+            generate_record(**SIZES[size], **kwargs).write(filepath)
+            for name, operation in operations(filepath).items():
+                key = f"{scenario}/{name}"
+                results[key] = measure(operation, repeat)
+                print(f"{key:<40} {results[key]['seconds']:9.4f} s {results[key]['peak_mb']:9.1f} MB", flush=True)
+    return {
+        "size": size,
+        "environment": {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system(), "cpus": os.cpu_count()},
+        "results": results
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """print the ratios of the current results to the baseline and return the keys of the regressions"""
+
+    regressions = []
+    print(f"\n{'operation':<40} {'time':>8} {'memory':>8}   relative to the baseline, tolerance {tolerance:.0%}")
+    for key, result in current["results"].items():
+        reference = baseline["results"].get(key)
+        if reference is None:
+            print(f"{key:<40} {'new':>8}")
+            continue
+        time_ratio = result["seconds"] / reference["seconds"] if reference["seconds"] else 1.0
+        memory_ratio = result["peak_mb"] / reference["peak_mb"] if reference["peak_mb"] else 1.0
+        regressed = time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance
+        if regressed:
+            regressions.append(key)
+        print(f"{key:<40} {time_ratio:8.2f} {memory_ratio:8.2f}{'   REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs of each operation")
+    parser.add_argument("--scenario", help="only run the scenarios whose name contains this text")
+    parser.add_argument("--baseline", help="baseline file, by default benchmarks/baselines/<size>.json")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline instead of comparing")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative increase of time and peak memory")
+    args = parser.parse_args(argv)
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"{args.size}.json")
+    current = run_suite(args.size, args.repeat, args.scenario)
+    if args.output:
+        with open(args.output, mode='wt', encoding='utf-8') as file:
+            json.dump(current, file, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, mode='wt', encoding='utf-8') as file:
+            json.dump(current, file, indent=2)
+        print(f"\nbaseline saved to {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        print(f"\nno baseline at {baseline_path}, store one with --save-baseline")
+        return 0
+
+    with open(baseline_path, mode='rt', encoding='utf-8') as file:
+        baseline = json.load(file)
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Generator of synthetic records of configurable size for the benchmark suite run_benchmarks.py and the other benchmarks.
+"""
+from typing import Optional
+
+import spp2086.measurement_data
+
+
+def generate_header(n_parameters: int = 8, header_depth: int = 2) -> dict:
+    """
+    return a valid header with n_parameters process parameters, alternately scalars, arrays and strings,
+    and machine details nested header_depth levels deep
+    """
+
+    details = {"serialNumber": "SN-0", "axes": ["X", "Y", "Z"]}
+    for level in range(header_depth):
+        details = {"level": level, "notes": f"nested level {level}", "details": details}
+
+    record = spp2086.measurement_data.MeasurementRecord()
+    record.header = {
+        "projectName": "synthetic benchmark record",
+        "location": "nowhere",
+        "creationDate": "2022-02-17",
+        "machine": {"name": "synthetic machine", "details": details},
+        "process": {"processType": "synthetic process", "tool": {"id": "ID1"}, "workpiece": {"name": "synthetic piece"}, "parameters": []}
+    }
+    for parameter_idx in range(n_parameters):
+        kind = parameter_idx % 3
+        if kind == 0:
+            record.add_parameter(f"scalar {parameter_idx}", parameter_idx * 1.5, "mm", symbol=f"p{parameter_idx}")
+        elif kind == 1:
+            record.add_parameter(f"array {parameter_idx}", [float(parameter_idx), parameter_idx + 0.5, parameter_idx + 1.0], "mm")
+        else:
+            record.add_parameter(f"string {parameter_idx}", f"setting {parameter_idx}", "")
+    return record.header
+
+
+def generate_record(n_channels: int = 8, n_samples: int = 10_000, storage_type="inplace", encoding="json",
+        n_parameters: int = 8, header_depth: int = 2, seed: Optional[int] = 0) -> spp2086.measurement_data.MeasurementRecord:
+    """
+    return a record with one time grid and n_channels noisy sine channels of n_samples float64 samples each
+
+    :param storage_type: 'inplace' or 'externalFile' for the grid and all channels
+    :param encoding: encoding of external files like 'json', 'bin' or 'bin+zstd', inplace data is always JSON
+    :param n_parameters: number of process parameters in the header
+    :param header_depth: nesting depth of the machine details in the header
+    :param seed: seed of the noise, the same arguments give the same record
+    """
+
+    #numpy is only needed for the data, benchmarks that only use the header run without it
+    import numpy
+
+    rng = numpy.random.default_rng(seed)
+    record = spp2086.measurement_data.MeasurementRecord()
+    record.header = generate_header(n_parameters, header_depth)
+
+    time = numpy.arange(n_samples) * 1e-4
+    #typed arrays are only kept for external binary files, everything else is stored as lists like parsed JSON
+    as_array = storage_type == "externalFile" and encoding.startswith("bin")
+    kwargs = {"storageType": storage_type, "encoding": encoding if storage_type == "externalFile" else "json"}
+    record.add_sampling_grid("time", "s", time if as_array else time.tolist(), **kwargs)
+    for channel_idx in range(n_channels):
+        values = numpy.sin(2 * numpy.pi * (channel_idx + 1) * time) + 0.01 * rng.standard_normal(n_samples)
+        record.add_data_channel(f"channel_{channel_idx}", "N", 0, values if as_array else values.tolist(), **kwargs)
+    return record
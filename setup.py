@@ -27,5 +27,15 @@ setuptools.setup(
     install_requires=[
         "jsonschema >= 4",
         "importlib_resources >= 5"
-    ]
+    ],
+    extras_require={
+        "numpy": ["numpy"],
+        "zstd": ["zstandard"],
+        "lz4": ["lz4"],
+        "parquet": ["pyarrow"],
+        "hdf5": ["h5py"],
+        "xxhash": ["xxhash"],
+        "orjson": ["orjson"],
+        "ujson": ["ujson"]
+    }
 )
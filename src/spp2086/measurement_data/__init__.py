@@ -1,3 +1,34 @@
 """Parses data to/from JSON files conforming to the defined JSON-Schema"""
 from .measurement_record import MeasurementRecord
+from .measurement_record import MeasurementRecordStream
+from .measurement_record import LoadResult
 from .measurement_record import create_json_validator
+from .measurement_record import get_json_validator
+from .measurement_record import DEFAULT_SCHEMA_ID
+from .measurement_record import VALIDATION_MODES
+from .catalog import RecordCatalog
+from .compression import COMPRESSIONS
+from .compression import FILTERS
+from .channel_cache import ChannelCache
+from .content_store import CONTENT_HASHES
+from .content_store import collect_garbage
+from .content_store import count_references
+from .columnar import COLUMNAR_FORMATS
+from .columnar import export_record
+from .columnar import export_records
+from .columnar import import_record
+from .columnar import import_records
+from .resampling import RESAMPLING_METHODS
+from .resampling import decimate
+from .resampling import resample
+from .json_backend import JSON_BACKENDS
+from .json_backend import JSON_LAYOUTS
+from .json_backend import get_json_backend
+from .json_backend import set_json_backend
+from .instrumentation import RecordProfiler
+from .instrumentation import Span
+from .instrumentation import add_observer
+from .instrumentation import remove_observer
+from .verification import ChecksumCache
+from .verification import VerificationResult
+from .verification import verify_archive
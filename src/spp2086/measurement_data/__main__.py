@@ -0,0 +1,16 @@
+"""
+Command line tools of the package
+
+    python -m spp2086.measurement_data verify <directory> [--cache checksums.sqlite] [--workers N] [--recheck]
+"""
+import sys
+
+from .verification import main as verify
+
+COMMANDS = {"verify": verify}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(__doc__.strip())
+        sys.exit(2)
+    sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
@@ -0,0 +1,258 @@
+"""Catalog of the record headers of an archive in an SQLite database"""
+from typing import Iterable, List, Optional, Tuple, Union
+import hashlib
+import json
+import os
+
+from .measurement_record import MeasurementRecord
+
+_CATALOG_TABLES = """
+CREATE TABLE IF NOT EXISTS records (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    md5 TEXT NOT NULL,
+    project_name TEXT,
+    location TEXT,
+    creation_date TEXT,
+    machine TEXT,
+    process_type TEXT,
+    tool_id TEXT,
+    workpiece_name TEXT,
+    header TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS parameters (
+    path TEXT NOT NULL REFERENCES records(path) ON DELETE CASCADE,
+    name TEXT,
+    symbol TEXT,
+    unit TEXT,
+    value_type TEXT,
+    value REAL,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS sampling_grids (
+    path TEXT NOT NULL REFERENCES records(path) ON DELETE CASCADE,
+    grid_index INTEGER NOT NULL,
+    name TEXT,
+    unit TEXT,
+    storage_type TEXT,
+    length INTEGER
+);
+CREATE TABLE IF NOT EXISTS data_channels (
+    path TEXT NOT NULL REFERENCES records(path) ON DELETE CASCADE,
+    name TEXT,
+    unit TEXT,
+    sampling_grid_index INTEGER,
+    storage_type TEXT,
+    in_process INTEGER,
+    length INTEGER
+);
+CREATE INDEX IF NOT EXISTS records_process_type ON records(process_type);
+CREATE INDEX IF NOT EXISTS parameters_symbol ON parameters(symbol, value);
+CREATE INDEX IF NOT EXISTS parameters_name ON parameters(name, value);
+CREATE INDEX IF NOT EXISTS parameters_path ON parameters(path);
+CREATE INDEX IF NOT EXISTS sampling_grids_path ON sampling_grids(path);
+CREATE INDEX IF NOT EXISTS data_channels_name ON data_channels(name);
+CREATE INDEX IF NOT EXISTS data_channels_path ON data_channels(path);
+"""
+
+#comparison operators allowed in parameter conditions
+_OPERATORS = {"=": "=", "==": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+#header fields that can be searched directly
+_HEADER_COLUMNS = ("project_name", "location", "creation_date", "machine", "process_type", "tool_id", "workpiece_name")
+
+
+def _file_md5(path: str) -> str:
+    with open(path, mode='rb') as file:
+        file_hash = hashlib.md5()
+        while chunk := file.read(1 << 20):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _is_record_file(path: str) -> bool:
+    """main files are JSON objects while external JSON files contain arrays"""
+    with open(path, mode='rb') as file:
+        start = file.read(64).lstrip()
+    return start.startswith(b"{")
+
+
+def _data_length(data_iter: dict) -> Optional[int]:
+    data = data_iter["data"]
+    if not isinstance(data, dict):
+        return len(data)
+    if "length" in data:
+        return data["length"]
+    if data.get("shape"):
+        return data["shape"][0]
+    return None
+
+
+class RecordCatalog:
+    """
+    searchable index of the headers, parameters, sampling grids and data channels of the records in a directory tree
+
+    The index is kept in an SQLite database and updated incrementally, only files whose size, modification
+    time and md5 checksum changed are read again.
+    """
+
+    def __init__(self, database: str = ":memory:"):
+        """:param database: path of the SQLite database file, by default the catalog is only kept in memory"""
+        import sqlite3
+
+        self.connection = sqlite3.connect(database)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        with self.connection:
+            self.connection.executescript(_CATALOG_TABLES)
+
+
+    def __enter__(self) -> "RecordCatalog":
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+    def update(self, root_dir: str) -> dict:
+        """
+        index all records below root_dir and remove records that no longer exist or can no longer be read
+
+        Returns the paths that were added, updated, removed or that failed to load as a dict of lists.
+        """
+
+        root_dir = os.path.abspath(root_dir)
+        summary = {"added": [], "updated": [], "removed": [], "failed": []}
+        #LIKE ignores the case of ASCII letters, which file systems may not
+        prefix = os.path.join(root_dir, "")
+        known = {path: (size, mtime_ns, md5) for path, size, mtime_ns, md5 in self.connection.execute(
+            "SELECT path, size, mtime_ns, md5 FROM records WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))}
+
+        with self.connection:
+            for dir_path, _, filenames in os.walk(root_dir):
+                for filename in sorted(filenames):
+                    if not filename.endswith(".json"):
+                        continue
+                    path = os.path.join(dir_path, filename)
+                    try:
+                        result = self.__update_file(path, known.pop(path, None))
+                    except Exception:
+                        #a record that can no longer be read must not be found with its old header
+                        self.connection.execute("DELETE FROM records WHERE path = ?", (path,))
+                        summary["failed"].append(path)
+                        continue
+                    if result is not None:
+                        summary[result].append(path)
+
+            for path in known:
+                self.connection.execute("DELETE FROM records WHERE path = ?", (path,))
+                summary["removed"].append(path)
+
+        return summary
+
+
+    def add_file(self, path: str) -> None:
+        """index or re-index a single record file"""
+        path = os.path.abspath(path)
+        with self.connection:
+            self.__index_file(path, os.stat(path), _file_md5(path))
+
+
+    def find(self, parameters: Iterable[Tuple[str, str, Union[float, str]]] = (), channels: Iterable[str] = (), **header_fields) -> List[str]:
+        """
+        return the sorted paths of all records matching all given conditions
+
+        :param parameters: conditions like ("vc", ">", 200) on process parameters given by symbol or name
+        :param channels: names of data channels the record must contain
+        :Keyword Arguments: values of the header fields project_name, location, creation_date, machine,
+            process_type, tool_id or workpiece_name
+        """
+
+        conditions = []
+        arguments = []
+        for column, value in header_fields.items():
+            if column not in _HEADER_COLUMNS:
+                raise ValueError(f"Unknown header field '{column}', use one of {_HEADER_COLUMNS}")
+            conditions.append(f"r.{column} = ?")
+            arguments.append(value)
+
+        for parameter, operator, value in parameters:
+            if operator not in _OPERATORS:
+                raise ValueError(f"Unsupported operator '{operator}'")
+            value_column = "text" if isinstance(value, str) else "value"
+            conditions.append(f"EXISTS (SELECT 1 FROM parameters p WHERE p.path = r.path AND (p.symbol = ? OR p.name = ?) AND p.{value_column} {_OPERATORS[operator]} ?)")
+            arguments.extend((parameter, parameter, value))
+
+        for channel in channels:
+            conditions.append("EXISTS (SELECT 1 FROM data_channels c WHERE c.path = r.path AND c.name = ?)")
+            arguments.append(channel)
+
+        query = "SELECT r.path FROM records r"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY r.path"
+        return [path for path, in self.connection.execute(query, arguments)]
+
+
+    def get_header(self, path: str) -> dict:
+        """return the indexed header of a record"""
+        row = self.connection.execute("SELECT header FROM records WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        if row is None:
+            raise ValueError(f"No record with path '{path}' in the catalog")
+        return json.loads(row[0])
+
+
+    def __update_file(self, path: str, known: Optional[tuple]) -> Optional[str]:
+        """index a file if it changed and return 'added' or 'updated', or None if it was unchanged or is no record"""
+
+        stat = os.stat(path)
+        if known is not None:
+            size, mtime_ns, md5 = known
+            if size == stat.st_size and mtime_ns == stat.st_mtime_ns:
+                return None
+            md5_actual = _file_md5(path)
+            if md5 == md5_actual:
+                #the file was touched but its content is the same
+                self.connection.execute("UPDATE records SET size = ?, mtime_ns = ? WHERE path = ?", (stat.st_size, stat.st_mtime_ns, path))
+                return None
+        elif not _is_record_file(path):
+            return None
+        else:
+            md5_actual = _file_md5(path)
+
+        self.__index_file(path, stat, md5_actual)
+        return "added" if known is None else "updated"
+
+
+    def __index_file(self, path: str, stat: os.stat_result, md5: str) -> None:
+        record = MeasurementRecord.from_filename(path, load="header", validate="header")
+        header = record.header
+        process = header["process"]
+
+        self.connection.execute("DELETE FROM records WHERE path = ?", (path,))
+        self.connection.execute("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            path, stat.st_size, stat.st_mtime_ns, md5,
+            header.get("projectName"), header.get("location"), header.get("creationDate"),
+            header["machine"].get("name"), process.get("processType"),
+            process["tool"].get("id"), process["workpiece"].get("name"),
+            json.dumps(header, ensure_ascii=False)))
+
+        self.connection.executemany("INSERT INTO parameters VALUES (?, ?, ?, ?, ?, ?, ?)", [
+            (path, parameter["name"], parameter["symbol"], parameter["unit"], parameter["valueType"],
+                parameter["value"] if parameter["valueType"] == "scalar" else None,
+                parameter["value"] if parameter["valueType"] == "string" else json.dumps(parameter["value"]))
+            for parameter in process["parameters"]])
+
+        self.connection.executemany("INSERT INTO sampling_grids VALUES (?, ?, ?, ?, ?, ?)", [
+            (path, grid_index, sampling_grid.get("name"), sampling_grid["unit"], sampling_grid["storageType"], _data_length(sampling_grid))
+            for grid_index, sampling_grid in enumerate(record.sampling_grids)])
+
+        self.connection.executemany("INSERT INTO data_channels VALUES (?, ?, ?, ?, ?, ?, ?)", [
+            (path, channel["name"], channel["unit"], channel["samplingGridIndex"], channel["storageType"], channel["inProcess"], _data_length(channel))
+            for channel in record.data_channels])
+
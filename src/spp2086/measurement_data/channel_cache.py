@@ -0,0 +1,156 @@
+"""Cache of decoded external data shared by records, bounded by a memory budget with least recently used eviction"""
+from typing import Hashable, Optional, Tuple
+import array
+import collections
+import hashlib
+import itertools
+import os
+import sys
+import threading
+
+from .measurement_record import _import_numpy
+
+
+def _data_nbytes(data) -> int:
+    """estimate the memory taken by decoded data, python objects of lists are estimated from their first item"""
+
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(data, numpy.ndarray):
+        return data.nbytes
+    if isinstance(data, (bytes, bytearray, memoryview, array.array)):
+        return memoryview(data).nbytes
+    if isinstance(data, list):
+        if not data:
+            return sys.getsizeof(data)
+        item_size = sys.getsizeof(data[0])
+        if isinstance(data[0], list):
+            item_size += len(data[0]) * (sys.getsizeof(data[0][0]) if data[0] else 0)
+        return sys.getsizeof(data) + len(data) * item_size
+    return sys.getsizeof(data)
+
+
+class ChannelCache:
+    """
+    decoded data of external files by (path, md5, modification time, size) of the file
+
+    Records opened with MeasurementRecord.from_filename(filename, channel_cache=cache) take the data of external files
+    from the cache instead of reading, hashing and parsing them again, and do not keep it themselves. When the decoded
+    data takes more than max_bytes, the least recently used data is evicted and read again on the next request.
+
+    With disk_dir, decoded numeric data of JSON and compressed files is also kept as .npy files, so other processes
+    and later sessions skip parsing as well. Lists are only kept if all their items are ints, floats or bools, so they
+    are read back with the same types. A cache can be shared by the threads of a process.
+    """
+
+    def __init__(self, max_bytes: int = 1 << 30, disk_dir: Optional[str] = None):
+        """
+        :param max_bytes: memory budget of the decoded data
+        :param disk_dir: directory of the .npy files of the on-disk cache, no on-disk cache if None
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key_of(filename: str, md5: Optional[str]) -> Tuple[str, Optional[str], int, int]:
+        """return the key of an external file, a modified file gets a new key even if its md5 is not updated"""
+        stat = os.stat(filename)
+        return (os.path.abspath(filename), md5, stat.st_mtime_ns, stat.st_size)
+
+    def get(self, key: Hashable):
+        """return the cached data or None, data of the on-disk cache is moved into memory"""
+
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data[0]
+
+        data = self.__load_from_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self.put(key, data, persist=False)
+        return data
+
+    def put(self, key: Hashable, data, persist=True) -> None:
+        """
+        add decoded data, data larger than max_bytes is not cached
+
+        :param persist: also write numeric data to the on-disk cache
+        """
+
+        nbytes = _data_nbytes(data)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            self._entries[key] = (data, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+                self.evictions += 1
+
+        if persist and self.disk_dir is not None:
+            self.__save_to_disk(key, data)
+
+    def clear(self) -> None:
+        """remove all data from memory, the on-disk cache is kept"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __disk_path(self, key: Hashable) -> str:
+        return os.path.join(self.disk_dir, hashlib.blake2b(repr(key).encode(), digest_size=20).hexdigest())
+
+    def __load_from_disk(self, key: Hashable):
+        if self.disk_dir is None:
+            return None
+        path = self.__disk_path(key)
+        for suffix, is_list in ((".npy", False), (".list.npy", True)):
+            if os.path.exists(path + suffix):
+                values = _import_numpy().load(path + suffix, allow_pickle=False)
+                return values.tolist() if is_list else values
+        return None
+
+    def __save_to_disk(self, key: Hashable, data) -> None:
+        numpy = _import_numpy()
+        is_list = isinstance(data, list)
+        if is_list:
+            try:
+                values = numpy.asarray(data)
+            except ValueError:
+                #lists of tuples of different lengths
+                return
+            #numpy converts the ints of a list with floats, which would be read back as floats
+            items = data
+            for _ in range(values.ndim - 1):
+                items = itertools.chain.from_iterable(items)
+            if set(map(type, items)) not in ({int}, {float}, {bool}):
+                return
+        elif isinstance(data, numpy.ndarray):
+            values = data
+        else:
+            return
+
+        os.makedirs(self.disk_dir, exist_ok=True)
+        path = self.__disk_path(key) + (".list.npy" if is_list else ".npy")
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(temp_path, mode='wb') as file:
+            numpy.save(file, values, allow_pickle=False)
+        os.replace(temp_path, path)
@@ -0,0 +1,426 @@
+"""Export of records to columnar formats for analytics pipelines and import back into MeasurementRecord"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import array
+import json
+import os
+
+from .catalog import _is_record_file
+from .measurement_record import MeasurementRecord, _import_numpy
+
+#supported formats and the extension of their files
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "hdf5": ".h5"}
+
+#keys of the schema metadata of exported tables and of the attributes of HDF5 groups
+_HEADER_KEY = "spp2086.header"
+_GRID_KEY = "spp2086.sampling_grid"
+_CHANNELS_KEY = "spp2086.data_channels"
+_PARTITIONS_KEY = "spp2086.partition_columns"
+
+#prefix of the partition columns, so they do not share a name with a data channel
+_PARTITION_PREFIX = "_partition."
+
+#file of the header and partition columns in the directory of an exported record, it is ignored by dataset readers
+_HEADER_FILENAME = "_header.json"
+
+#number of rows that are written at once, typed binary data that is memory mapped is only read chunk by chunk
+_CHUNK_ROWS = 1 << 20
+
+
+def _import_pyarrow():
+    """import pyarrow on demand, it is only required for Parquet and Arrow files"""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as err:
+        raise ImportError("pyarrow is required for Parquet and Arrow files, install it with python -m pip install .[parquet]") from err
+    return pyarrow
+
+
+def _import_h5py():
+    """import h5py on demand, it is only required for HDF5 files"""
+    try:
+        import h5py
+    except ImportError as err:
+        raise ImportError("h5py is required for HDF5 files, install it with python -m pip install .[hdf5]") from err
+    return h5py
+
+
+def _get_format(path: str, format: Optional[str]) -> str:
+    """return the given format or guess it from the path"""
+
+    if format is not None:
+        if format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unsupported format '{format}', use one of {list(COLUMNAR_FORMATS)}")
+        return format
+
+    if os.path.splitext(path)[1] in (".h5", ".hdf5"):
+        return "hdf5"
+    if os.path.isdir(path):
+        for filename in os.listdir(path):
+            for name, extension in COLUMNAR_FORMATS.items():
+                if filename.startswith("grid_") and filename.endswith(extension):
+                    return name
+    return "parquet"
+
+
+def _grid_filename(grid_idx: int, format: str) -> str:
+    return f"grid_{grid_idx}{COLUMNAR_FORMATS[format]}"
+
+
+def _is_grid_file(filename: str) -> bool:
+    return filename.startswith("grid_") and filename.endswith(tuple(COLUMNAR_FORMATS.values()))
+
+
+def _described(data_iter: dict) -> dict:
+    """copy of a sampling grid or data channel without its data that keeps the order of the keys"""
+    return {key: None if key == "data" else value for key, value in data_iter.items()}
+
+
+def _partitions(record: MeasurementRecord, record_id: str) -> dict:
+    """constant columns of all tables of a record to filter an archive by header fields and parameters"""
+
+    process = record.header.get("process", {})
+    partitions = {
+        "record": record_id,
+        "processType": process.get("processType"),
+        "machine": record.header.get("machine", {}).get("name"),
+        "tool": process.get("tool", {}).get("id"),
+        "workpiece": process.get("workpiece", {}).get("name"),
+    }
+    for parameter in process.get("parameters", []):
+        if parameter["valueType"] in ("scalar", "string"):
+            partitions["parameters." + (parameter.get("symbol") or parameter["name"])] = parameter["value"]
+    return partitions
+
+
+def _record_tables(record: MeasurementRecord) -> Iterator[Tuple[int, dict, Dict[str, object]]]:
+    """
+    yield the grid index, metadata and columns of each sampling grid of a record
+
+    The data of a sampling grid and its channels is loaded just before it is yielded, so with lazy loading
+    only the data of one table is held in memory at a time.
+    """
+
+    positions = {name: idx for idx, name in enumerate(record.get_data_channel_names())}
+    for grid_idx in range(len(record.sampling_grids)):
+        channel_indices = [positions[name] for name in record.get_data_channel_names(grid_idx)]
+        #descriptions of data that is not loaded yet, they are put back afterwards to release the loaded data
+        unloaded = [(data_iter, data_iter["data"]) for data_iter in [record.sampling_grids[grid_idx]] + [record.data_channels[idx] for idx in channel_indices]
+            if isinstance(data_iter["data"], dict)]
+
+        sampling_grid = record.get_sampling_grid(grid_idx)
+        grid_name = sampling_grid.get("name") or f"grid_{grid_idx}"
+        columns = {grid_name: sampling_grid["data"]}
+        channel_descriptions = []
+
+        for idx in channel_indices:
+            channel, _ = record.get_data_channel(record.data_channels[idx]["name"])
+            name = channel["name"]
+            if name in columns:
+                raise ValueError(f"The data channel '{name}' has the same name as another column of sampling grid {grid_idx}")
+            if len(channel["data"]) != len(sampling_grid["data"]):
+                raise ValueError(f"The data channel '{name}' has {len(channel['data'])} samples but its sampling grid {len(sampling_grid['data'])}")
+            columns[name] = channel["data"]
+            channel_descriptions.append({"index": idx, "channel": _described(channel)})
+
+        metadata = {
+            _HEADER_KEY: record.header,
+            _GRID_KEY: {"index": grid_idx, "column": grid_name, "samplingGrid": _described(sampling_grid)},
+            _CHANNELS_KEY: channel_descriptions,
+        }
+        yield grid_idx, metadata, columns
+
+        for data_iter, description in unloaded:
+            data_iter["data"] = description
+
+
+def _to_numpy(name: str, data):
+    """return typed data as a native numpy array without copying it where possible, or None for lists"""
+
+    numpy = _import_numpy()
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        raise ValueError(f"Untyped binary data of '{name}' can not be exported")
+    if isinstance(data, array.array):
+        return numpy.frombuffer(data, dtype=data.typecode)
+    if isinstance(data, numpy.ndarray):
+        if not data.dtype.isnative:
+            data = data.astype(data.dtype.newbyteorder("="))
+        if data.ndim not in (1, 2):
+            raise ValueError(f"Data of '{name}' with {data.ndim} dimensions can not be exported")
+        return data
+    return None
+
+
+def _to_arrow(pyarrow, name: str, data):
+    """convert the data of a column to an arrow array, numeric arrays are handed over without a copy"""
+
+    values = _to_numpy(name, data)
+    if values is None:
+        return pyarrow.array(data)
+    if values.ndim == 1:
+        return pyarrow.array(values)
+    #tuples of a fixed size share the buffer of the flattened array
+    flat = pyarrow.array(values.reshape(-1) if values.flags.c_contiguous else values.ravel())
+    return pyarrow.FixedSizeListArray.from_arrays(flat, values.shape[1])
+
+
+def _from_arrow(pyarrow, column, encoding: Optional[str]):
+    """convert a column back to a list or, if it was stored as binary data, a numpy array"""
+
+    if pyarrow.types.is_list(column.type) or pyarrow.types.is_large_list(column.type):
+        return column.to_pylist()
+
+    column = column.combine_chunks() if isinstance(column, pyarrow.ChunkedArray) else column
+    if pyarrow.types.is_fixed_size_list(column.type):
+        values = column.flatten().to_numpy(zero_copy_only=False).reshape(len(column), column.type.list_size)
+    else:
+        values = column.to_numpy(zero_copy_only=False)
+
+    if encoding is not None and encoding.startswith("bin"):
+        return values
+    return values.tolist()
+
+
+def _metadata_to_arrow(metadata: dict) -> dict:
+    return {key.encode(): json.dumps(value, ensure_ascii=False).encode() for key, value in metadata.items()}
+
+
+def _build_record(header: Optional[dict], tables: List[Tuple[dict, Dict[str, object]]]) -> MeasurementRecord:
+    """assemble a record from its header and the metadata and columns of its sampling grids, header None takes it from the tables"""
+
+    if header is None and not tables:
+        raise ValueError("No exported record found")
+
+    record = MeasurementRecord()
+    record.header = header if header is not None else tables[0][0][_HEADER_KEY]
+    tables = sorted(tables, key=lambda table: table[0][_GRID_KEY]["index"])
+    if [metadata[_GRID_KEY]["index"] for metadata, _ in tables] != list(range(len(tables))):
+        raise ValueError("The tables of some sampling grids are missing")
+
+    data_channels = []
+    for metadata, columns in tables:
+        sampling_grid = metadata[_GRID_KEY]["samplingGrid"]
+        sampling_grid["data"] = columns[metadata[_GRID_KEY]["column"]]
+        record.sampling_grids.append(sampling_grid)
+        for description in metadata[_CHANNELS_KEY]:
+            channel = description["channel"]
+            channel["data"] = columns[channel["name"]]
+            data_channels.append((description["index"], channel))
+
+    record.data_channels = [channel for _, channel in sorted(data_channels, key=lambda item: item[0])]
+    return record
+
+
+def export_record(record: MeasurementRecord, target: str, format: Optional[str] = None, partitions: Optional[dict] = None,
+        chunk_rows: int = _CHUNK_ROWS) -> List[str]:
+    """
+    export a record to one table per sampling grid with its data channels as columns
+
+    The header and the descriptions of the sampling grid and data channels are stored as metadata of each table,
+    so import_record can restore the record. Typed binary data is handed over to the writer without a copy.
+
+    :param target: directory that receives a file grid_<index>.parquet or .arrow per sampling grid and the header
+        in _header.json, so records without sampling grids keep it as well, or the path of an HDF5 file that receives
+        a group grid_<index> per sampling grid and the header as attribute. Tables of an earlier export to target
+        are removed first.
+    :param format: 'parquet', 'arrow' or 'hdf5', by default it is guessed from target
+    :param partitions: constant columns added to every table with their name prefixed by '_partition.',
+        like the header fields added by export_records
+    :param chunk_rows: number of rows written at once, this is the row group size of Parquet files
+    :return: the paths of the written tables or HDF5 groups
+    """
+
+    format = _get_format(target, format)
+    if format == "hdf5":
+        with _import_h5py().File(target, "a") as h5_file:
+            return [f"{target}:{name}" for name in _write_hdf5_groups(h5_file, "/", record, partitions or {}, chunk_rows)]
+
+    pyarrow = _import_pyarrow()
+    os.makedirs(target, exist_ok=True)
+    #tables of sampling grids the record does not have anymore would be imported with it
+    for filename in os.listdir(target):
+        if _is_grid_file(filename):
+            os.remove(os.path.join(target, filename))
+    partition_columns = {_PARTITION_PREFIX + name: value for name, value in (partitions or {}).items()}
+    with open(os.path.join(target, _HEADER_FILENAME), mode='wt', encoding='utf-8') as file:
+        json.dump({_HEADER_KEY: record.header, _PARTITIONS_KEY: list(partition_columns)}, file, ensure_ascii=False)
+    paths = []
+    for grid_idx, metadata, columns in _record_tables(record):
+        names = list(columns)
+        arrays = [_to_arrow(pyarrow, name, data) for name, data in columns.items()]
+        n_rows = len(arrays[0])
+        for name, value in partition_columns.items():
+            if name in columns:
+                raise ValueError(f"The partition column '{name}' has the same name as a column of the data")
+            #a dictionary array stores the value once and an index per row
+            names.append(name)
+            arrays.append(pyarrow.DictionaryArray.from_arrays(pyarrow.array(_import_numpy().zeros(n_rows, dtype="int32")), pyarrow.array([value])))
+        metadata[_PARTITIONS_KEY] = list(partition_columns)
+
+        table = pyarrow.Table.from_arrays(arrays, names=names).replace_schema_metadata(_metadata_to_arrow(metadata))
+        path = os.path.join(target, _grid_filename(grid_idx, format))
+        if format == "parquet":
+            pyarrow.parquet.write_table(table, path, row_group_size=chunk_rows)
+        else:
+            with pyarrow.OSFile(path, "wb") as sink, pyarrow.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=chunk_rows)
+        paths.append(path)
+    return paths
+
+
+def _write_hdf5_groups(h5_file, group_name: str, record: MeasurementRecord, partitions: dict, chunk_rows: int) -> List[str]:
+    """write a group with a dataset per column for each sampling grid of a record below group_name"""
+
+    numpy = _import_numpy()
+    record_group = h5_file.require_group(group_name)
+    record_group.attrs[_HEADER_KEY] = json.dumps(record.header, ensure_ascii=False)
+    record_group.attrs[_PARTITIONS_KEY] = json.dumps(partitions, ensure_ascii=False)
+    #groups of records below this one are kept
+    for grid_name in [name for name, item in record_group.items() if _GRID_KEY in item.attrs]:
+        del record_group[grid_name]
+
+    names = []
+    for grid_idx, metadata, columns in _record_tables(record):
+        grid_group = record_group.create_group(f"grid_{grid_idx}")
+        for key in (_GRID_KEY, _CHANNELS_KEY):
+            grid_group.attrs[key] = json.dumps(metadata[key], ensure_ascii=False)
+        #column names may contain '/' so the datasets are numbered and named by an attribute
+        grid_group.attrs["columns"] = json.dumps(list(columns), ensure_ascii=False)
+
+        for column_idx, (name, data) in enumerate(columns.items()):
+            values = _to_numpy(name, data)
+            if values is None:
+                values = numpy.asarray(data)
+                if values.dtype.kind not in "biuf":
+                    raise ValueError(f"Data of '{name}' can not be stored as an HDF5 dataset")
+            dataset = grid_group.create_dataset(str(column_idx), shape=values.shape, dtype=values.dtype, chunks=True if len(values) else None)
+            for start in range(0, len(values), chunk_rows):
+                dataset[start:start + chunk_rows] = values[start:start + chunk_rows]
+        names.append(grid_group.name)
+    return names
+
+
+def import_record(source: str, format: Optional[str] = None, group: str = "/") -> MeasurementRecord:
+    """
+    import a record written by export_record or export_records
+
+    Columns of data that was stored as binary data are returned as numpy arrays, other columns as lists.
+    Arrow files are memory mapped, so their numeric columns are not copied.
+
+    :param source: directory with the files of the sampling grids or the path of an HDF5 file
+    :param format: 'parquet', 'arrow' or 'hdf5', by default it is guessed from source
+    :param group: group of the record in an HDF5 file
+    """
+
+    format = _get_format(source, format)
+    if format == "hdf5":
+        with _import_h5py().File(source, "r") as h5_file:
+            return _read_hdf5_record(h5_file[group])
+
+    header = None
+    header_filename = os.path.join(source, _HEADER_FILENAME)
+    if os.path.exists(header_filename):
+        with open(header_filename, mode='rt', encoding='utf-8') as file:
+            header = json.load(file)[_HEADER_KEY]
+
+    pyarrow = _import_pyarrow()
+    tables = []
+    for filename in sorted(os.listdir(source)):
+        if not (filename.startswith("grid_") and filename.endswith(COLUMNAR_FORMATS[format])):
+            continue
+        path = os.path.join(source, filename)
+        if format == "parquet":
+            table = pyarrow.parquet.read_table(path, memory_map=True)
+        else:
+            table = pyarrow.ipc.open_file(pyarrow.memory_map(path, "r")).read_all()
+
+        metadata = {key.decode(): json.loads(value) for key, value in table.schema.metadata.items() if key.decode().startswith("spp2086.")}
+        encodings = {metadata[_GRID_KEY]["column"]: metadata[_GRID_KEY]["samplingGrid"].get("encoding")}
+        encodings.update((description["channel"]["name"], description["channel"].get("encoding")) for description in metadata[_CHANNELS_KEY])
+        columns = {name: _from_arrow(pyarrow, table.column(name), encoding) for name, encoding in encodings.items()}
+        tables.append((metadata, columns))
+    return _build_record(header, tables)
+
+
+def _read_hdf5_record(record_group) -> MeasurementRecord:
+    header = json.loads(record_group.attrs[_HEADER_KEY])
+    tables = []
+    for grid_group in record_group.values():
+        if _GRID_KEY not in grid_group.attrs:
+            continue
+        metadata = {_HEADER_KEY: header}
+        for key in (_GRID_KEY, _CHANNELS_KEY):
+            metadata[key] = json.loads(grid_group.attrs[key])
+        encodings = {metadata[_GRID_KEY]["column"]: metadata[_GRID_KEY]["samplingGrid"].get("encoding")}
+        encodings.update((description["channel"]["name"], description["channel"].get("encoding")) for description in metadata[_CHANNELS_KEY])
+
+        columns = {}
+        for column_idx, name in enumerate(json.loads(grid_group.attrs["columns"])):
+            values = grid_group[str(column_idx)][()]
+            encoding = encodings.get(name)
+            columns[name] = values if encoding is not None and encoding.startswith("bin") else values.tolist()
+        tables.append((metadata, columns))
+    return _build_record(header, tables)
+
+
+def export_records(sources: Union[str, Iterable[str]], target: str, format: Optional[str] = None, chunk_rows: int = _CHUNK_ROWS) -> List[str]:
+    """
+    export many records, for example a whole archive, with header fields and parameters as partition columns
+
+    The records are loaded one after another with lazy loading and memory mapped binary files, so archives larger than
+    the memory can be exported. Each table gets the constant columns record, processType, machine, tool, workpiece
+    and parameters.<symbol> of scalar and string parameters, prefixed by '_partition.', which tools like Spark or Polars
+    can filter on.
+
+    :param sources: directory that is searched for records or the paths of the main files
+    :param target: directory that receives a directory per record, or an HDF5 file that receives a group per record
+    :param format: 'parquet', 'arrow' or 'hdf5', by default it is guessed from target
+    :return: the record ids, which are the paths of the main files relative to the common directory without extension
+    """
+
+    if isinstance(sources, str):
+        root_dir = sources
+        paths = sorted(os.path.join(dir_path, filename) for dir_path, _, filenames in os.walk(sources) for filename in filenames
+            if filename.endswith(".json") and _is_record_file(os.path.join(dir_path, filename)))
+    else:
+        paths = list(sources)
+        root_dir = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths]) if paths else ""
+
+    format = _get_format(target, format)
+    record_ids = []
+    h5_file = _import_h5py().File(target, "a") if format == "hdf5" else None
+    try:
+        for path in paths:
+            record_id = os.path.splitext(os.path.relpath(os.path.abspath(path), os.path.abspath(root_dir)))[0].replace(os.sep, "/")
+            record = MeasurementRecord.from_filename(path, lazy_loading=True, memory_map=True, validate="structure")
+            partitions = _partitions(record, record_id)
+            if h5_file is not None:
+                _write_hdf5_groups(h5_file, record_id, record, partitions, chunk_rows)
+            else:
+                export_record(record, os.path.join(target, record_id), format, partitions, chunk_rows)
+            record_ids.append(record_id)
+    finally:
+        if h5_file is not None:
+            h5_file.close()
+    return record_ids
+
+
+def import_records(source: str, format: Optional[str] = None) -> Iterator[Tuple[str, MeasurementRecord]]:
+    """yield the record ids and records exported by export_records one after another"""
+
+    format = _get_format(source, format)
+    if format == "hdf5":
+        h5py = _import_h5py()
+        with h5py.File(source, "r") as h5_file:
+            record_groups = []
+            h5_file.visititems(lambda name, item: record_groups.append(name) if isinstance(item, h5py.Group) and _HEADER_KEY in item.attrs else None)
+            if _HEADER_KEY in h5_file.attrs:
+                record_groups.insert(0, "")
+            for name in record_groups:
+                yield name, _read_hdf5_record(h5_file[name or "/"])
+        return
+
+    for dir_path, _, filenames in sorted(os.walk(source)):
+        if _HEADER_FILENAME in filenames or any(filename.startswith("grid_") and filename.endswith(COLUMNAR_FORMATS[format]) for filename in filenames):
+            yield os.path.relpath(dir_path, source).replace(os.sep, "/"), import_record(dir_path, format)
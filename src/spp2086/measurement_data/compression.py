@@ -0,0 +1,201 @@
+"""Compressed encodings and filters of external files"""
+from typing import Iterable, Iterator, List, Optional, Tuple
+import io
+import zlib
+
+#compressions of external files by the suffix of their fileEncoding like 'bin+zstd', gzip is always available
+COMPRESSIONS = ("gzip", "zstd", "lz4")
+_COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst", "lz4": ".lz4"}
+_COMPRESSION_PACKAGES = {"zstd": "zstandard", "lz4": "lz4"}
+
+#filters that rearrange typed binary data before it is compressed, in the order they are applied
+FILTERS = ("delta", "shuffle")
+
+
+def split_encoding(encoding: str) -> Tuple[str, Optional[str]]:
+    """split a fileEncoding like 'bin+zstd' into the encoding of the data and the compression, raises ValueError"""
+
+    base, _, compression = encoding.partition("+")
+    if base not in ("json", "bin") or (compression and compression not in COMPRESSIONS):
+        raise ValueError(f"Encoding: '{encoding}' not supported, use 'json' or 'bin' optionally followed by one of {['+' + name for name in COMPRESSIONS]}")
+    return base, compression or None
+
+
+def file_extension(encoding: str) -> str:
+    """return the extension of external files with the given encoding like '.bin.zst'"""
+    base, compression = split_encoding(encoding)
+    extension = '.bin' if base == "bin" else '.json'
+    if compression is not None:
+        extension += _COMPRESSION_EXTENSIONS[compression]
+    return extension
+
+
+def check_filters(filters: List[str]) -> None:
+    """raise ValueError unless filters is a list of FILTERS in their order"""
+    if not isinstance(filters, (list, tuple)) or list(filters) != [name for name in FILTERS if name in filters]:
+        raise ValueError(f"Unsupported filters {filters}, use a list of distinct values of {FILTERS} in this order")
+
+
+def _import_codec(compression: str):
+    """import the optional package of a compression"""
+    package = _COMPRESSION_PACKAGES[compression]
+    try:
+        if compression == "zstd":
+            import zstandard
+            return zstandard
+        import lz4.frame
+        return lz4.frame
+    except ImportError as err:
+        raise ImportError(f"The compression '{compression}' requires {package}, install it with python -m pip install .[{compression}]") from err
+
+
+def _compressor(compression: str):
+    """return an object with compress(data) and flush() like zlib.compressobj"""
+
+    if compression == "gzip":
+        #the gzip header written by zlib has no time stamp, so the output and its md5 are reproducible
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if compression == "zstd":
+        return _import_codec(compression).ZstdCompressor(level=3).compressobj()
+
+    lz4_frame = _import_codec(compression)
+    compressor = lz4_frame.LZ4FrameCompressor()
+    header = compressor.begin()
+
+    class _Lz4Compressor:
+        def compress(self, data) -> bytes:
+            nonlocal header
+            output = header + compressor.compress(data)
+            header = b""
+            return output
+
+        def flush(self) -> bytes:
+            return header + compressor.flush()
+
+    return _Lz4Compressor()
+
+
+def _decompressor(compression: str):
+    """return an object with decompress(data) and eof like zlib.decompressobj"""
+
+    if compression == "gzip":
+        return zlib.decompressobj(31)
+    if compression == "zstd":
+        return _import_codec(compression).ZstdDecompressor().decompressobj()
+    return _import_codec(compression).LZ4FrameDecompressor()
+
+
+class CompressingWriter(io.RawIOBase):
+    """writable stream that compresses all bytes and passes them on to another stream, close() ends the compressed data"""
+
+    def __init__(self, raw: io.RawIOBase, compression: str):
+        self.raw = raw
+        self.compressor = _compressor(compression)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        compressed = self.compressor.compress(data)
+        if compressed:
+            self.raw.write(compressed)
+        return memoryview(data).nbytes
+
+    def close(self) -> None:
+        if not self.closed:
+            self.raw.write(self.compressor.flush())
+        super().close()
+
+
+def decompress(chunks: Iterable[bytes], compression: Optional[str], filename: str) -> Iterator[bytes]:
+    """decompress a stream of chunks piece by piece, raises RuntimeError if the compressed data is incomplete"""
+
+    if compression is None:
+        yield from chunks
+        return
+
+    decompressor = _decompressor(compression)
+    for chunk in chunks:
+        if decompressor.eof:
+            raise RuntimeError(f"{filename} contains data after the end of the compressed data")
+        piece = decompressor.decompress(chunk)
+        if piece:
+            yield piece
+    if not decompressor.eof:
+        raise RuntimeError(f"the compressed data of {filename} is incomplete")
+    if decompressor.unused_data:
+        raise RuntimeError(f"{filename} contains data after the end of the compressed data")
+
+
+def apply_filters(buffer: memoryview, dtype: "numpy.dtype", filters: List[str]) -> memoryview:
+    """return the bytes of typed binary data after applying the filters"""
+    import numpy
+
+    values = numpy.frombuffer(buffer, dtype=dtype)
+    for name in filters:
+        if name == "delta":
+            #differences of unsigned integers wrap around and are reversed exactly, also for the bits of floats
+            unsigned = _unsigned_view(values)
+            values = numpy.empty_like(unsigned)
+            values[:1] = unsigned[:1]
+            numpy.subtract(unsigned[1:], unsigned[:-1], out=values[1:])
+        else:
+            #the first bytes of all items, then the second bytes and so on
+            values = numpy.ascontiguousarray(values.view(numpy.uint8).reshape(-1, dtype.itemsize).T)
+    return memoryview(values.reshape(-1).view(numpy.uint8))
+
+
+def _unsigned_view(values: "numpy.ndarray") -> "numpy.ndarray":
+    """view the items of a 1-dimensional array as unsigned integers of the same byte order, complex numbers as two integers"""
+    import numpy
+
+    itemsize = values.dtype.itemsize // 2 if values.dtype.kind == "c" else values.dtype.itemsize
+    byte_order = values.dtype.str[0] if itemsize > 1 else "|"
+    return values.view(numpy.dtype(f"{byte_order}u{itemsize}"))
+
+
+class FilteredBuffer:
+    """
+    buffer of known size that is filled piece by piece with the filtered bytes of typed binary data
+
+    Shuffled bytes are written directly to their final position, so the data is only held once in memory.
+    """
+
+    def __init__(self, nbytes: int, dtype: "numpy.dtype", filters: List[str]):
+        import numpy
+
+        self.buffer = bytearray(nbytes)
+        self.dtype = dtype
+        self.filters = filters
+        self.position = 0
+        self._planes = numpy.frombuffer(self.buffer, dtype=numpy.uint8).reshape(-1, dtype.itemsize) if "shuffle" in filters else None
+
+    def write(self, piece: bytes) -> None:
+        import numpy
+
+        if self.position + len(piece) > len(self.buffer):
+            raise ValueError("more data than expected")
+        if self._planes is None:
+            self.buffer[self.position:self.position + len(piece)] = piece
+            self.position += len(piece)
+            return
+
+        n_items = len(self._planes)
+        piece = numpy.frombuffer(piece, dtype=numpy.uint8)
+        while len(piece):
+            plane, item = divmod(self.position, n_items)
+            count = min(n_items - item, len(piece))
+            self._planes[item:item + count, plane] = piece[:count]
+            piece = piece[count:]
+            self.position += count
+
+    def finish(self) -> bytearray:
+        """reverse the remaining filters and return the buffer"""
+        import numpy
+
+        if self.position != len(self.buffer):
+            raise ValueError("less data than expected")
+        if "delta" in self.filters:
+            unsigned = _unsigned_view(numpy.frombuffer(self.buffer, dtype=self.dtype))
+            numpy.add.accumulate(unsigned, dtype=unsigned.dtype.type, out=unsigned)
+        return self.buffer
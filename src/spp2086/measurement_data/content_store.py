@@ -0,0 +1,201 @@
+"""Content addressed store of external files that are shared by many records"""
+from typing import Dict, Iterable, Iterator, List, Union
+import collections
+import contextlib
+import hashlib
+import io
+import os
+
+from .catalog import _is_record_file
+from .json_scanner import scan_main_file
+
+#hashes that name the files of a content store, xxh3 requires the optional package xxhash
+CONTENT_HASHES = ("blake2b", "sha256", "xxh3")
+
+#suffix of files that are being added to a store
+_PART_SUFFIX = ".part"
+
+#files up to this size are kept in memory until their hash is known, so files the store has already are never written
+_SPOOL_SIZE = 1 << 25
+
+
+class _SpooledFile(io.RawIOBase):
+    """writable file that keeps its content in memory up to max_size bytes and only beyond writes it to a temporary file"""
+
+    def __init__(self, directory: str, max_size: int):
+        self.directory = directory
+        self.max_size = max_size
+        self.buffer = bytearray()
+        self.file = None
+        self.temp_path = None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        nbytes = memoryview(data).nbytes
+        if self.file is None and len(self.buffer) + nbytes <= self.max_size:
+            self.buffer += data
+            return nbytes
+        if self.file is None:
+            self.__spill()
+        self.file.write(data)
+        return nbytes
+
+    def __spill(self) -> None:
+        #tempfile is imported here to keep the import of the package fast
+        import tempfile
+
+        fd, self.temp_path = tempfile.mkstemp(suffix=_PART_SUFFIX, dir=self.directory)
+        self.file = os.fdopen(fd, mode='wb', buffering=1 << 20)
+        self.file.write(self.buffer)
+        self.buffer = bytearray()
+
+    def move_to(self, path: str) -> None:
+        """write the content to path, a file that is replaced concurrently gets the same content"""
+        if self.file is None:
+            self.__spill()
+        self.file.close()
+        os.chmod(self.temp_path, 0o644)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self.temp_path, path)
+
+    def discard(self) -> None:
+        self.buffer = bytearray()
+        if self.file is not None:
+            self.file.close()
+            os.remove(self.temp_path)
+
+
+class _StoreEntry:
+    """file being added to a store, its path and contentHash are known once the block of ContentStore.add is left"""
+
+    def __init__(self, file, content_hash):
+        self.file = file
+        self.hash = content_hash
+        self.content_hash = None
+        self.path = None
+
+
+class ContentStore:
+    """
+    directory of external files named by the hash of their content, so identical data is stored once
+
+    A file with the contentHash 'blake2b:3fa1...' and the extension '.bin' is stored at <directory>/3f/a1....bin.
+    Files are never modified, files that are no longer referenced by any record are removed by collect_garbage().
+    """
+
+    def __init__(self, directory: str, hash_name="blake2b"):
+        if hash_name not in CONTENT_HASHES:
+            raise ValueError(f"Unsupported content hash '{hash_name}', use one of {CONTENT_HASHES}")
+        self.directory = os.path.abspath(directory)
+        self.hash_name = hash_name
+        self.new_hash()
+
+    def new_hash(self):
+        """return a new hash object of the content hash of this store"""
+        if self.hash_name == "blake2b":
+            return hashlib.blake2b(digest_size=32)
+        if self.hash_name == "sha256":
+            return hashlib.sha256()
+        try:
+            import xxhash
+        except ImportError as err:
+            raise ImportError("The content hash 'xxh3' requires xxhash, install it with python -m pip install .[xxhash]") from err
+        return xxhash.xxh3_128()
+
+    def path_of(self, content_hash: str, extension: str) -> str:
+        """return the path of the file with the given contentHash like 'blake2b:3fa1...' and extension"""
+        hex_digest = content_hash.partition(":")[2]
+        return os.path.join(self.directory, hex_digest[:2], hex_digest[2:] + extension)
+
+    def contains(self, content_hash: str, extension: str) -> bool:
+        """return whether the store has a file with the given contentHash, hashes of other algorithms are never found"""
+        return content_hash.startswith(self.hash_name + ":") and os.path.exists(self.path_of(content_hash, extension))
+
+    @contextlib.contextmanager
+    def add(self, extension: str) -> Iterator[_StoreEntry]:
+        """
+        add a file to the store whose content is written to entry.file and hashed by entry.hash within the block
+
+        The file is moved into place when the block is left, or dropped if the store has it already. Content up to
+        _SPOOL_SIZE bytes is kept in memory until then, so it is not written at all if the store has it.
+        """
+
+        os.makedirs(self.directory, exist_ok=True)
+        entry = _StoreEntry(_SpooledFile(self.directory, _SPOOL_SIZE), self.new_hash())
+        try:
+            yield entry
+        except BaseException:
+            entry.file.discard()
+            raise
+
+        entry.content_hash = f"{self.hash_name}:{entry.hash.hexdigest()}"
+        entry.path = self.path_of(entry.content_hash, extension)
+        if os.path.exists(entry.path):
+            entry.file.discard()
+        else:
+            #a concurrent writer of the same content replaces the file with identical bytes
+            entry.file.move_to(entry.path)
+
+
+def _main_files(sources: Union[str, Iterable[str]], skip_dir: str) -> Iterator[str]:
+    if not isinstance(sources, str):
+        yield from sources
+        return
+
+    for dir_path, dir_names, filenames in os.walk(sources):
+        dir_names[:] = sorted(name for name in dir_names if os.path.abspath(os.path.join(dir_path, name)) != skip_dir)
+        for filename in sorted(filenames):
+            path = os.path.join(dir_path, filename)
+            if filename.endswith(".json") and _is_record_file(path):
+                yield path
+
+
+def count_references(store_dir: str, sources: Union[str, Iterable[str]]) -> Dict[str, int]:
+    """
+    return the number of sampling grids and data channels that reference each file of a content store
+
+    :param store_dir: directory of the content store
+    :param sources: directory that is searched for records or the paths of their main files
+    :return: the number of references by the absolute path of the file, files without references are included with 0
+    """
+
+    store_dir = os.path.abspath(store_dir)
+    references = collections.Counter()
+    for dir_path, _, filenames in os.walk(store_dir):
+        for filename in filenames:
+            if not filename.endswith(_PART_SUFFIX):
+                references[os.path.join(dir_path, filename)] = 0
+
+    for path in _main_files(sources, store_dir):
+        #the items of inplace data are skipped, a file that can not be read aborts so no referenced file is removed
+        file_dict = scan_main_file(path)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        for data_iter in file_dict["data"]["samplingGrids"] + file_dict["data"]["dataChannels"]:
+            if data_iter["storageType"] == "externalFile":
+                ext_filepath = os.path.normpath(os.path.join(base_dir, data_iter["data"]["relativeFilePath"]))
+                if ext_filepath in references:
+                    references[ext_filepath] += 1
+    return dict(references)
+
+
+def collect_garbage(store_dir: str, sources: Union[str, Iterable[str]], dry_run=False) -> List[str]:
+    """
+    remove the files of a content store that are not referenced by any of the records
+
+    Records that are written to the store while it is collected must be included in sources or written afterwards.
+
+    :param store_dir: directory of the content store
+    :param sources: directory that is searched for records or the paths of the main files of all records using the store
+    :param dry_run: only return the files that would be removed
+    :return: the paths of the removed files
+    """
+
+    unreferenced = sorted(path for path, count in count_references(store_dir, sources).items() if count == 0)
+    if not dry_run:
+        for path in unreferenced:
+            os.remove(path)
+            with contextlib.suppress(OSError):
+                os.rmdir(os.path.dirname(path))
+    return unreferenced
@@ -0,0 +1,212 @@
+"""Opt-in timing of the stages of loading and writing records, reported to observers as spans"""
+from typing import Callable, Dict, List, Optional
+import contextvars
+import itertools
+import os
+import threading
+import time
+import warnings
+
+#callbacks that receive each finished span, stages are only timed while there is at least one
+_observers = []
+_observers_lock = threading.Lock()
+
+#the innermost running stage of the current thread or task, the parent of stages started within it
+_current_span = contextvars.ContextVar("spp2086_current_span", default=None)
+
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """
+    timing of one stage of loading or writing a record
+
+    Stages started within another stage of the same thread or asyncio task are its children. Attributes describe
+    the stage, for example 'path' of the main file, 'channel' and 'bytes' read or written.
+    """
+
+    __slots__ = ("name", "attributes", "span_id", "parent_id", "trace_id", "thread_id", "start_time_ns", "duration", "error", "_start")
+
+    def __init__(self, name: str, attributes: dict, parent: Optional["Span"]):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else (os.getpid() << 64) | self.span_id
+        self.thread_id = threading.get_ident()
+        self.start_time_ns = time.time_ns()
+        self.duration = None
+        self.error = None
+        self._start = time.perf_counter()
+
+    def __repr__(self) -> str:
+        return f"Span({self.name!r}, duration={self.duration}, attributes={self.attributes})"
+
+    def as_dict(self) -> dict:
+        """return the span as a plain dict, duration in seconds"""
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "thread_id": self.thread_id,
+            "start_time_ns": self.start_time_ns,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": dict(self.attributes)
+        }
+
+    def as_otel_dict(self) -> dict:
+        """return the span in the JSON structure of OpenTelemetry spans with hexadecimal ids and times in nanoseconds"""
+        return {
+            "name": self.name,
+            "context": {"trace_id": f"{self.trace_id:032x}", "span_id": f"{self.span_id:016x}"},
+            "parent_id": f"{self.parent_id:016x}" if self.parent_id is not None else None,
+            "start_time": self.start_time_ns,
+            "end_time": self.start_time_ns + int(self.duration * 1e9),
+            "attributes": {f"spp2086.{key}": value for key, value in self.attributes.items() if value is not None},
+            "status": {"status_code": "ERROR", "description": self.error} if self.error is not None else {"status_code": "OK"}
+        }
+
+
+class _Stage:
+    """context manager that times a stage and reports its span to the observers"""
+
+    __slots__ = ("span", "_token")
+
+    def __init__(self, name: str, attributes: dict):
+        self.span = Span(name, attributes, _current_span.get())
+
+    def __enter__(self) -> "_Stage":
+        self._token = _current_span.set(self.span)
+        self.span._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        span = self.span
+        span.duration = time.perf_counter() - span._start
+        _current_span.reset(self._token)
+        if exc_value is not None:
+            span.error = repr(exc_value)
+        for observer in list(_observers):
+            try:
+                observer(span)
+            except Exception as err:
+                warnings.warn(f"Observer {observer!r} failed: {err!r}")
+
+    def set(self, key: str, value) -> None:
+        self.span.attributes[key] = value
+
+    def add_bytes(self, nbytes: int) -> None:
+        self.span.attributes["bytes"] = self.span.attributes.get("bytes", 0) + nbytes
+
+
+class _NullStage:
+    """stage that is used while nobody observes, it does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+    def set(self, key: str, value) -> None:
+        pass
+
+    def add_bytes(self, nbytes: int) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def is_enabled() -> bool:
+    """return whether stages are timed, which is the case while there are observers"""
+    return bool(_observers)
+
+
+def stage(name: str, **attributes):
+    """return a context manager that times the stage with the given name, a shared no-op while nobody observes"""
+    if not _observers:
+        return _NULL_STAGE
+    return _Stage(name, attributes)
+
+
+def in_current_context(function: Callable) -> Callable:
+    """wrap function so that the stages it runs in other threads are children of the current stage"""
+    if not _observers:
+        return function
+    context = contextvars.copy_context()
+    #a context can only be entered by one thread at a time, so each call runs in its own copy
+    return lambda *args, **kwargs: context.copy().run(function, *args, **kwargs)
+
+
+def add_observer(observer: Callable[[Span], None]) -> None:
+    """
+    call observer with each finished Span of loading and writing records in this process
+
+    Observers are called in the thread that ran the stage and must be thread-safe. Stages that run in
+    worker processes, for example of MeasurementRecord.load_many, are not reported.
+    """
+    with _observers_lock:
+        _observers.append(observer)
+
+
+def remove_observer(observer: Callable[[Span], None]) -> None:
+    """stop calling an observer added by add_observer"""
+    with _observers_lock:
+        _observers.remove(observer)
+
+
+class RecordProfiler:
+    """
+    collects the spans of all records loaded and written within a with block
+
+        with RecordProfiler() as profiler:
+            record = MeasurementRecord.from_filename(filename)
+        print(profiler.summary())
+
+    The stages are 'from_filename', 'read_main_file', 'parse', 'scan_main_file', 'validate', 'read_external',
+    'read', 'checksum', 'decode', 'load_inplace', 'write', 'commit', 'write_external', 'encode_main_file' and 'write_main_file'.
+    """
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def __enter__(self) -> "RecordProfiler":
+        add_observer(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        remove_observer(self)
+
+    def to_dicts(self) -> List[dict]:
+        """return the spans as plain dicts in the order they finished"""
+        return [span.as_dict() for span in self.spans]
+
+    def to_otel_spans(self) -> List[dict]:
+        """return the spans as dicts in the structure of OpenTelemetry spans"""
+        return [span.as_otel_dict() for span in self.spans]
+
+    def summary(self, attribute: Optional[str] = None) -> Dict[object, dict]:
+        """
+        return the count, total duration in seconds and total bytes of the spans of each stage
+
+        :param attribute: also group by the value of this attribute, for example 'channel' or 'path',
+            the keys are then tuples of the stage name and the value
+        """
+
+        totals = {}
+        for span in self.spans:
+            key = span.name if attribute is None else (span.name, span.attributes.get(attribute))
+            total = totals.setdefault(key, {"count": 0, "seconds": 0.0, "bytes": 0})
+            total["count"] += 1
+            total["seconds"] += span.duration
+            total["bytes"] += span.attributes.get("bytes", 0)
+        return totals
@@ -0,0 +1,235 @@
+"""Exchangeable JSON libraries for parsing and writing main files and external JSON files"""
+from typing import Optional, Union
+import array
+import json
+import math
+import re
+import sys
+
+#backends in the order of preference, orjson and ujson are optional dependencies
+JSON_BACKENDS = ("orjson", "ujson", "json")
+
+#layouts of main files: indented, indented with the items of inplace data on one line, or without any whitespace
+JSON_LAYOUTS = ("indent", "compact_items", "compact")
+
+#maps digits to 'd', decimal points to '.' and all other bytes to ' ' to find long runs of digits
+_DIGIT_TABLE = bytes(ord("d") if 48 <= c <= 57 else c if c == ord(".") else ord(" ") for c in range(256))
+#an integer with at least 19 digits, which may be beyond the 64 bits that orjson parses exactly
+_LONG_INTEGER = b" " + b"d" * 19
+#size of the pieces of a document that are searched for long integers, so the search does not copy the whole document
+_SEARCH_CHUNK_SIZE = 1 << 20
+
+
+def _default(obj):
+    """convert objects unknown to the JSON libraries, numpy arrays are only passed here by libraries that do not support them"""
+
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(obj, (numpy.ndarray, numpy.generic)):
+        return obj.tolist()
+    if isinstance(obj, array.array):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _has_long_integer(data: Union[bytes, bytearray, memoryview, str]) -> bool:
+    """return whether the JSON text may contain an integer of at least 19 digits, digits after a decimal point do not count"""
+
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    view = memoryview(data).cast("B")
+    for start in range(0, len(view), _SEARCH_CHUNK_SIZE):
+        #the chunks overlap, so a run of digits at the border is found, and the first one starts like after a separator
+        chunk = bytes(view[start - len(_LONG_INTEGER):start + _SEARCH_CHUNK_SIZE]) if start else b" " + bytes(view[:_SEARCH_CHUNK_SIZE])
+        if _LONG_INTEGER in chunk.translate(_DIGIT_TABLE):
+            return True
+    return False
+
+
+def _prepare_for_orjson(obj):
+    """
+    return obj with the numpy arrays in it converted for orjson and whether it contains NaN or infinite values
+
+    orjson writes floats narrower than 64 bits in their own shortest form, so such arrays are widened to float64
+    to write the same digits as the other libraries. Containers are only copied if an array in them was converted.
+    """
+
+    if isinstance(obj, float):
+        return obj, not math.isfinite(obj)
+    if isinstance(obj, dict):
+        prepared = {key: _prepare_for_orjson(value) for key, value in obj.items()}
+        non_finite = any(value_non_finite for _, value_non_finite in prepared.values())
+        if all(prepared[key][0] is value for key, value in obj.items()):
+            return obj, non_finite
+        return {key: value for key, (value, _) in prepared.items()}, non_finite
+    if isinstance(obj, (list, tuple, array.array)):
+        #the sum of a list of numbers is finite if all of them are, a sum that overflows is checked item by item
+        try:
+            total = sum(obj, 0.0)
+            if isinstance(total, float) and math.isfinite(total):
+                return obj, False
+        except (TypeError, OverflowError):
+            pass
+        prepared = [_prepare_for_orjson(item) for item in obj]
+        non_finite = any(item_non_finite for _, item_non_finite in prepared)
+        if all(item is original for (item, _), original in zip(prepared, obj)):
+            return obj, non_finite
+        return [item for item, _ in prepared], non_finite
+
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(obj, numpy.ndarray):
+        if obj.dtype.kind == "O":
+            return _prepare_for_orjson(obj.tolist())
+        if obj.dtype.kind == "f" and obj.dtype.itemsize < 8:
+            obj = obj.astype(numpy.float64)
+        elif not obj.dtype.isnative:
+            #orjson reads the buffer in native byte order
+            obj = obj.astype(obj.dtype.newbyteorder("="))
+        return obj, obj.dtype.kind == "f" and not numpy.isfinite(obj).all()
+    return obj, False
+
+
+class _StdlibBackend:
+    name = "json"
+
+    def loads(self, data: Union[bytes, bytearray, str]):
+        return json.loads(data)
+
+    def dumps(self, obj, indent=False) -> bytes:
+        if indent:
+            return json.dumps(obj, ensure_ascii=False, indent=2, default=_default).encode('utf-8')
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+class _OrjsonBackend:
+    """
+    orjson writes numpy arrays without converting them to lists
+
+    orjson neither writes nor parses NaN and infinite values, and it parses integers beyond 64 bits as floats.
+    Documents with such values are handled by the json module, so the result is the same as with it.
+    """
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def loads(self, data: Union[bytes, bytearray, str]):
+        if _has_long_integer(data):
+            return json.loads(data)
+        try:
+            return self.orjson.loads(data)
+        except self.orjson.JSONDecodeError:
+            #NaN and Infinity as written by the json module
+            return json.loads(data)
+
+    def dumps(self, obj, indent=False) -> bytes:
+        option = self.orjson.OPT_SERIALIZE_NUMPY | (self.orjson.OPT_INDENT_2 if indent else 0)
+        obj, non_finite = _prepare_for_orjson(obj)
+        if non_finite:
+            #orjson writes NaN and infinite values as null, the json module as NaN and Infinity
+            return _StdlibBackend().dumps(obj, indent)
+        try:
+            return self.orjson.dumps(obj, default=_default, option=option)
+        except self.orjson.JSONEncodeError:
+            #for example integers beyond 64 bits
+            return _StdlibBackend().dumps(obj, indent)
+
+
+class _UjsonBackend:
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self.ujson = ujson
+
+    def loads(self, data: Union[bytes, bytearray, str]):
+        return self.ujson.loads(data)
+
+    def dumps(self, obj, indent=False) -> bytes:
+        try:
+            return self.ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False, indent=2 if indent else 0, default=_default).encode('utf-8')
+        except OverflowError:
+            #versions before 5 do not write NaN and infinite values
+            return _StdlibBackend().dumps(obj, indent)
+
+
+_BACKEND_CLASSES = {"orjson": _OrjsonBackend, "ujson": _UjsonBackend, "json": _StdlibBackend}
+_backends = {}
+_selected_backend = None
+
+
+def get_json_backend(name: Optional[str] = None):
+    """
+    return the backend with the given name or the selected one, which is by default the first installed one of JSON_BACKENDS
+
+    A backend has loads(bytes or str) and dumps(obj, indent=False) -> bytes like the json module.
+    """
+
+    if name is None:
+        name = _selected_backend
+    if name is None:
+        for candidate in JSON_BACKENDS:
+            try:
+                return get_json_backend(candidate)
+            except ImportError:
+                continue
+
+    if name not in _BACKEND_CLASSES:
+        raise ValueError(f"Unsupported JSON backend '{name}', use one of {JSON_BACKENDS}")
+    backend = _backends.get(name)
+    if backend is None:
+        try:
+            backend = _backends[name] = _BACKEND_CLASSES[name]()
+        except ImportError as err:
+            raise ImportError(f"The JSON backend '{name}' requires {name}, install it with python -m pip install .[{name}]") from err
+    return backend
+
+
+def set_json_backend(name: Optional[str]) -> None:
+    """select the backend used by all records by its name, None selects the first installed one of JSON_BACKENDS"""
+    global _selected_backend
+    if name is not None:
+        get_json_backend(name)
+    _selected_backend = name
+
+
+#placeholder of the items of inplace data while the rest of a main file is indented
+_ITEMS_PLACEHOLDER = "\u0000items{}\u0000"
+_ITEMS_PATTERN = re.compile(rb'"\\u0000items(\d+)\\u0000"')
+
+
+def dumps_main_file(file_dict: dict, layout="compact_items", backend=None) -> bytes:
+    """
+    encode the content of a main file in one of the JSON_LAYOUTS
+
+    'compact_items' indents the header and descriptions like 'indent' but writes the items of inplace data on one line,
+    so large inplace data does not take a line per sample. Items that have a read() method returning their JSON text,
+    like the deferred items of a record opened by from_filename(load='header'), are copied as they are in all layouts.
+    """
+
+    backend = backend or get_json_backend()
+    if layout not in JSON_LAYOUTS:
+        raise ValueError(f"Unsupported layout '{layout}', use one of {JSON_LAYOUTS}")
+
+    items = []
+    data = file_dict.get("data", {})
+    replaced = dict(file_dict, data=dict(data))
+    for key in ("samplingGrids", "dataChannels"):
+        replaced["data"][key] = []
+        for data_iter in data.get(key, []):
+            internal_data = data_iter.get("data")
+            if data_iter.get("storageType") == "inplace" and isinstance(internal_data, dict) and "items" in internal_data \
+                    and (layout == "compact_items" or hasattr(internal_data["items"], "read")):
+                data_iter = dict(data_iter, data=dict(internal_data, items=_ITEMS_PLACEHOLDER.format(len(items))))
+                items.append(internal_data["items"])
+            replaced["data"][key].append(data_iter)
+
+    content = backend.dumps(replaced, indent=layout != "compact")
+    if not items:
+        return content
+    parts = _ITEMS_PATTERN.split(content)
+    #the split alternates between the text around the placeholders and their numbers
+    for part_idx in range(1, len(parts), 2):
+        item = items[int(parts[part_idx])]
+        parts[part_idx] = item.read() if hasattr(item, "read") else backend.dumps(item)
+    return b"".join(parts)
@@ -0,0 +1,213 @@
+"""Scanner for main files that parses everything except the items of inplace data"""
+from typing import Tuple
+import json
+import mmap
+import re
+
+from .json_backend import get_json_backend
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+_STRUCTURE = re.compile(rb'[\[\]{}"]')
+_STRING_TAIL = re.compile(rb'(?:[^"\\]|\\.)*"', re.DOTALL)
+_SCALAR = re.compile(rb'[^,\]}\s]+')
+_DOUBLE_CLOSE = re.compile(rb'\][ \t\n\r]*\]')
+#two opening or two closing brackets without a bracket of the other kind between them
+_TWO_OPEN = re.compile(rb'\[[^\[\]]*\[')
+_TWO_CLOSE = re.compile(rb'\][^\[\]]*\]')
+
+
+class DeferredItems:
+    """position of the items of inplace data in a main file, they are parsed by load()"""
+
+    __slots__ = ("filename", "start", "end")
+
+    def __init__(self, filename: str, start: int, end: int):
+        self.filename = filename
+        self.start = start
+        self.end = end
+
+    def __repr__(self) -> str:
+        return f"DeferredItems({self.filename!r}, {self.start}, {self.end})"
+
+    def read(self) -> bytes:
+        """return the JSON text of the items"""
+        with open(self.filename, mode='rb') as file:
+            file.seek(self.start)
+            return file.read(self.end - self.start)
+
+    def load(self) -> list:
+        return get_json_backend().loads(self.read())
+
+
+def scan_main_file(filename: str) -> dict:
+    """
+    parse a main file except for the items of inplace data, which are replaced by DeferredItems
+
+    Only the structure of the skipped arrays is scanned by regular expressions on a memory map of the file,
+    so the cost is dominated by reading the file and not by creating python objects for every sample.
+    """
+
+    with open(filename, mode='rb') as file:
+        if file.seek(0, 2) == 0:
+            raise ValueError(f"{filename} is empty")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            scanner = _Scanner(buffer, filename)
+            file_dict, end = scanner.parse_value(scanner.skip_whitespace(0), ())
+            if scanner.skip_whitespace(end) != len(buffer):
+                raise ValueError(f"Extra data in {filename} at position {end}")
+    return file_dict
+
+
+def _role(path: tuple) -> str:
+    """return whether the value at path is descended into, parsed as a whole or deferred"""
+
+    #root/data/<samplingGrids|dataChannels>/<index>/data/items
+    depth = len(path)
+    if depth == 0:
+        return "descend"
+    if path[0] != "data":
+        return "parse"
+    if depth == 1:
+        return "descend"
+    if path[1] not in ("samplingGrids", "dataChannels"):
+        return "parse"
+    if depth <= 3:
+        return "descend"
+    if path[3] != "data":
+        return "parse"
+    if depth == 4:
+        return "descend"
+    if depth == 5 and path[4] == "items":
+        return "defer"
+    return "parse"
+
+
+class _Scanner:
+
+    def __init__(self, buffer, filename: str):
+        self.buffer = buffer
+        self.filename = filename
+
+    def skip_whitespace(self, position: int) -> int:
+        return _WHITESPACE.match(self.buffer, position).end()
+
+    def parse_value(self, position: int, path: tuple) -> Tuple[object, int]:
+        token = self.buffer[position:position+1]
+        role = _role(path)
+
+        if role == "descend" and token == b"{":
+            return self.parse_object(position, path)
+        if role == "descend" and token == b"[":
+            return self.parse_array(position, path)
+
+        if role == "defer" and token == b"[":
+            end = self.skip_items(position)
+            return DeferredItems(self.filename, position, end), end
+        end = self.skip_value(position)
+        return json.loads(self.buffer[position:end]), end
+
+    def parse_object(self, position: int, path: tuple) -> Tuple[dict, int]:
+        result = {}
+        position = self.skip_whitespace(position + 1)
+        if self.buffer[position:position+1] == b"}":
+            return result, position + 1
+
+        while True:
+            if self.buffer[position:position+1] != b'"':
+                self.fail(position, "a key")
+            key_end = self.skip_string(position + 1)
+            key = json.loads(self.buffer[position:key_end])
+            position = self.skip_whitespace(key_end)
+            if self.buffer[position:position+1] != b":":
+                self.fail(position, "':'")
+            position = self.skip_whitespace(position + 1)
+            result[key], position = self.parse_value(position, path + (key,))
+            position = self.skip_whitespace(position)
+            token = self.buffer[position:position+1]
+            if token == b"}":
+                return result, position + 1
+            if token != b",":
+                self.fail(position, "',' or '}'")
+            position = self.skip_whitespace(position + 1)
+
+    def parse_array(self, position: int, path: tuple) -> Tuple[list, int]:
+        result = []
+        position = self.skip_whitespace(position + 1)
+        if self.buffer[position:position+1] == b"]":
+            return result, position + 1
+
+        while True:
+            value, position = self.parse_value(position, path + (len(result),))
+            result.append(value)
+            position = self.skip_whitespace(position)
+            token = self.buffer[position:position+1]
+            if token == b"]":
+                return result, position + 1
+            if token != b",":
+                self.fail(position, "',' or ']'")
+            position = self.skip_whitespace(position + 1)
+
+    def skip_items(self, position: int) -> int:
+        """
+        return the end of the items array starting at position
+
+        Items are numbers or flat arrays of numbers, so the array ends at the first ']' or, for nested arrays,
+        at the first ']]'. The candidate is accepted if it contains no strings or objects and no further '[' or,
+        for nested arrays, if the inner arrays open and close alternately, so its brackets are balanced. Otherwise
+        the items are skipped by the general scan. As the items are the value of an object, a candidate beyond
+        the array would contain its '}'. The candidate is searched in place, so the items are not copied out of
+        the memory map.
+        """
+
+        buffer = self.buffer
+        first = self.skip_whitespace(position + 1)
+        if buffer[first:first+1] == b"[":
+            match = _DOUBLE_CLOSE.search(buffer, first)
+            end = match.end() if match is not None else 0
+            #the last ']' closes the items, the ones before must alternate with '[' starting at first
+            nested_deeper = end > 0 and (_TWO_OPEN.search(buffer, first, end - 1) is not None
+                or _TWO_CLOSE.search(buffer, first, end - 1) is not None)
+        else:
+            end = buffer.find(b"]", position) + 1
+            nested_deeper = end > 0 and buffer.find(b"[", position + 1, end) != -1
+
+        if end > 0 and not nested_deeper and all(buffer.find(token, position, end) == -1 for token in (b'"', b"{", b"}")):
+            return end
+        return self.skip_value(position)
+
+    def skip_value(self, position: int) -> int:
+        """return the end of the value starting at position without parsing it"""
+
+        token = self.buffer[position:position+1]
+        if token == b'"':
+            return self.skip_string(position + 1)
+
+        if token not in (b"[", b"{"):
+            match = _SCALAR.match(self.buffer, position)
+            if match is None:
+                self.fail(position, "a value")
+            return match.end()
+
+        #only brackets and strings matter, so arrays of numbers are skipped with a single search
+        depth = 0
+        while True:
+            match = _STRUCTURE.search(self.buffer, position)
+            if match is None:
+                self.fail(len(self.buffer), "the end of an array or object")
+            token = match.group()
+            if token == b'"':
+                position = self.skip_string(match.end())
+                continue
+            depth += 1 if token in (b"[", b"{") else -1
+            position = match.end()
+            if depth == 0:
+                return position
+
+    def skip_string(self, position: int) -> int:
+        """return the end of a string whose opening quote is before position"""
+        match = _STRING_TAIL.match(self.buffer, position)
+        if match is None:
+            self.fail(position, "the end of a string")
+        return match.end()
+
+    def fail(self, position: int, expected: str):
+        raise ValueError(f"Expected {expected} in {self.filename} at position {position}")
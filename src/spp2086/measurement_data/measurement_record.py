@@ -1,35 +1,435 @@
-from typing import List, Union, Tuple, TypeVar, Type
+from typing import Dict, List, Union, Tuple, TypeVar, Type, Optional, Iterable, Iterator, NamedTuple, Sequence, TYPE_CHECKING
+import array
+import bisect
+import collections
+import contextlib
 import hashlib
+import io
+import mmap
+import numbers
 import os
+import sys
 import json
+import functools
 import itertools
+import threading
 import warnings
 
-import jsonschema
-import importlib_resources
-
-def create_json_validator():
-    """ create a JSON validator from the stored SPP schema"""
+from .compression import CompressingWriter, FilteredBuffer, apply_filters, check_filters, decompress, file_extension, split_encoding
+from .instrumentation import in_current_context, is_enabled, stage
+from .json_backend import dumps_main_file, get_json_backend
+from .json_scanner import DeferredItems, scan_main_file
+
+#jsonschema, importlib_resources and concurrent.futures are imported on first use to keep the import of this module fast
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, Future, ThreadPoolExecutor
+    import jsonschema
+    from .channel_cache import ChannelCache
+    from .verification import ChecksumCache
+    from .content_store import ContentStore
+
+#schemas shipped with this package by their $id
+DEFAULT_SCHEMA_ID = "https://spp2086.de/v1.0/base-schema"
+_SCHEMA_RESOURCES = {DEFAULT_SCHEMA_ID: "schema_spp2086.json"}
+
+def create_json_validator(schema_id: str = DEFAULT_SCHEMA_ID, check_schema: Optional[bool] = None) -> "jsonschema.Draft7Validator":
+    """
+    create a JSON validator from the stored SPP schema
+
+    :param schema_id: $id of one of the schemas shipped with this package
+    :param check_schema: check the schema against the draft-07 specification,
+        by default this is only done in python's development mode (python -X dev)
+    """
+    import jsonschema
+    import importlib_resources
+
+    if schema_id not in _SCHEMA_RESOURCES:
+        raise ValueError(f"Unknown schema '{schema_id}'")
 
     #load the schema from package resources
     package_resources = importlib_resources.files( __package__+".schemas")
-    ref =  package_resources / "schema_spp2086.json"
+    ref =  package_resources / _SCHEMA_RESOURCES[schema_id]
     with importlib_resources.as_file(ref) as schema_filepath:
         with open(schema_filepath) as json_file:
             spp_schema = json.load(json_file)
 
 
     #check our schema against the draft-07 JSON schema specifications
-    jsonschema.Draft7Validator.check_schema(spp_schema)
+    if check_schema is None:
+        check_schema = sys.flags.dev_mode
+    if check_schema:
+        jsonschema.Draft7Validator.check_schema(spp_schema)
 
     return jsonschema.Draft7Validator(spp_schema)
 
+
+_json_validators = {}
+_json_validators_lock = threading.Lock()
+
+def get_json_validator(schema_id: str = DEFAULT_SCHEMA_ID) -> "jsonschema.Draft7Validator":
+    """return the validator of a schema, it is created on first use and cached by the $id of the schema"""
+
+    validator = _json_validators.get(schema_id)
+    if validator is None:
+        with _json_validators_lock:
+            validator = _json_validators.get(schema_id)
+            if validator is None:
+                validator = create_json_validator(schema_id)
+                _json_validators[schema_id] = validator
+    return validator
+
+
+class _LazyJsonValidator:
+    """class attribute that returns the cached validator of the default schema"""
+
+    def __get__(self, instance, owner) -> "jsonschema.Draft7Validator":
+        return get_json_validator()
+
+def _import_numpy():
+    """import numpy on demand, it is only required for typed binary data"""
+    try:
+        import numpy
+    except ImportError as err:
+        raise ImportError("numpy is required to read or write typed binary data") from err
+    return numpy
+
+#size of the chunks in which external files are streamed from and to disk
+_IO_BUFFER_SIZE = 1 << 20
+
+#number of items of external JSON data that are encoded at once
+_JSON_CHUNK_ITEMS = 1 << 16
+
+class _HashingWriter(io.RawIOBase):
+    """writable stream that passes all bytes on to one or more files and hashes them on the way, optionally with a second hash"""
+
+    def __init__(self, *files, content_hash=None):
+        self.files = files
+        self.file_hash = hashlib.md5()
+        self.content_hash = content_hash
+        self.nbytes = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.file_hash.update(data)
+        if self.content_hash is not None:
+            self.content_hash.update(data)
+        for file in self.files:
+            file.write(data)
+        nbytes = memoryview(data).nbytes
+        self.nbytes += nbytes
+        return nbytes
+
+
+@contextlib.contextmanager
+def _open_for_replace(filepaths: List[str]) -> Iterator[list]:
+    """
+    open temporary files that replace the files at filepaths when the block completes without an error
+
+    Data that is memory mapped from a replaced file stays valid as the old file is only unlinked.
+    """
+
+    temp_filepaths = [filepath + ".part" for filepath in filepaths]
+    files = []
+    try:
+        for temp_filepath in temp_filepaths:
+            files.append(open(temp_filepath, mode='wb', buffering=_IO_BUFFER_SIZE))
+        yield files
+    except BaseException:
+        for file, temp_filepath in zip(files, temp_filepaths):
+            file.close()
+            os.remove(temp_filepath)
+        raise
+
+    for file in files:
+        file.close()
+    for temp_filepath, filepath in zip(temp_filepaths, filepaths):
+        os.replace(temp_filepath, filepath)
+
+
+def _is_raw_binary(external_file: dict) -> bool:
+    """return whether the external file contains the bytes of the data as they are, so it can be mapped or read partially"""
+    return external_file["fileEncoding"] == "bin" and not external_file.get("filters")
+
+
+def _encode_json(data, backend_name: Optional[str] = None) -> bytes:
+    """
+    encode a slice of items without whitespace, this also runs in the worker processes of write(json_processes=N),
+    which get the name of the backend as they do not share the selection of the main process
+    """
+    return get_json_backend(backend_name).dumps(data)
+
+
+def _is_sliceable_array(data) -> bool:
+    """return whether data is a numpy array or array.array whose slices are encoded without converting them to lists first"""
+    numpy = sys.modules.get("numpy")
+    return isinstance(data, array.array) or (numpy is not None and isinstance(data, numpy.ndarray))
+
+
+def _serialize_data(data, encoding: str, filters: List[str], writer: io.RawIOBase, json_pool: Optional["Executor"] = None) -> dict:
+    """
+    write the data of a sampling grid or data channel in the given encoding and close the writer
+
+    Lists and arrays are encoded as JSON in slices of _JSON_CHUNK_ITEMS items, which is faster than encoding item by item
+    and needs less memory than encoding all at once. The slices are encoded in json_pool if it is given.
+    Returns the dtype, shape and filters of typed binary data.
+    """
+
+    base_encoding, compression = split_encoding(encoding)
+    if compression is not None:
+        writer = CompressingWriter(writer, compression)
+
+    if base_encoding == "json":
+        if filters:
+            raise ValueError("Filters can only be applied to typed binary data")
+        if not isinstance(data, list) and not _is_sliceable_array(data):
+            data = list(data)
+        chunks = [data[start:start + _JSON_CHUNK_ITEMS] for start in range(0, len(data), _JSON_CHUNK_ITEMS)]
+        if json_pool is not None and len(chunks) > 1:
+            encoded_chunks = json_pool.map(functools.partial(_encode_json, backend_name=get_json_backend().name), chunks)
+        else:
+            encoded_chunks = map(_encode_json, chunks)
+        with io.BufferedWriter(writer, _IO_BUFFER_SIZE) as file:
+            file.write(b"[")
+            for chunk_idx, encoded in enumerate(encoded_chunks):
+                if chunk_idx:
+                    file.write(b",")
+                file.write(memoryview(encoded)[1:-1])
+            file.write(b"]")
+        return {}
+
+    #write binary bytes directly to file
+    buffer, binary_layout = _encode_binary(data)
+    if filters:
+        if not binary_layout:
+            raise ValueError("Filters can only be applied to typed binary data")
+        buffer = apply_filters(buffer, _import_numpy().dtype(binary_layout["dtype"]), filters)
+        binary_layout = {**binary_layout, "filters": list(filters)}
+    writer.write(buffer)
+    writer.close()
+    return binary_layout
+
+
+def _encode_binary(data) -> Tuple[memoryview, dict]:
+    """return a byte view of data and the dtype/shape description of typed arrays"""
+
+    #only look for numpy arrays if numpy has been imported by someone else
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(data, numpy.ndarray):
+        if data.dtype.kind not in "biufc" or data.dtype.fields is not None:
+            raise TypeError(f"Arrays of dtype {data.dtype} can not be stored as binary data")
+        data = numpy.ascontiguousarray(data)
+        layout = {"dtype": data.dtype.str, "shape": list(data.shape)}
+        return memoryview(data.reshape(-1).view(numpy.uint8)), layout
+
+    if isinstance(data, array.array):
+        if data.typecode in "fd":
+            kind = "f"
+        elif data.typecode in "bhilq":
+            kind = "i"
+        elif data.typecode in "BHILQ":
+            kind = "u"
+        else:
+            raise TypeError(f"array.array with typecode '{data.typecode}' can not be stored as binary data")
+        if data.itemsize == 1:
+            byte_order = "|"
+        else:
+            byte_order = "<" if sys.byteorder == "little" else ">"
+        layout = {"dtype": f"{byte_order}{kind}{data.itemsize}", "shape": [len(data)]}
+        return memoryview(data).cast("B"), layout
+
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        #untyped raw bytes are written as they are
+        return memoryview(data).cast("B"), {}
+
+    raise TypeError(f"Data of type {type(data).__name__} can not be stored as binary data")
+
+
+def _read_file(file, file_hash=None, size: Optional[int] = None) -> bytearray:
+    """read an unbuffered binary file or the next size bytes of it into a single buffer and hash the chunks while they are read"""
+
+    buffer = bytearray(os.fstat(file.fileno()).st_size if size is None else size)
+    view = memoryview(buffer)
+    position = 0
+    while position < len(buffer):
+        chunk = view[position:position + _IO_BUFFER_SIZE]
+        n_read = file.readinto(chunk)
+        if not n_read:
+            break
+        if file_hash is not None:
+            file_hash.update(chunk[:n_read])
+        position += n_read
+    view.release()
+
+    if position < len(buffer):
+        #the file was truncated while it was read
+        del buffer[position:]
+    return buffer
+
+
+def _check_md5(filename: str, md5_checksum_valid: str, data: Optional[bytearray] = None, checksum_cache: Optional["ChecksumCache"] = None,
+        stat: Optional[os.stat_result] = None) -> None:
+    """
+    compare the md5 checksum of the given data or the file content to the specified one,
+    a matching file is added to the checksum cache with the stat taken before it was read
+    """
+
+    if data is not None:
+        md5_checksum_actual = hashlib.md5(data).hexdigest()
+    else:
+        with open(filename, mode='rb', buffering=0) as file:
+            file_hash = hashlib.md5()
+            buffer = bytearray(_IO_BUFFER_SIZE)
+            while n_read := file.readinto(buffer):
+                file_hash.update(memoryview(buffer)[:n_read])
+        md5_checksum_actual = file_hash.hexdigest()
+
+    if md5_checksum_actual != md5_checksum_valid:
+        raise RuntimeError(f"calculated md5 checksum of {filename} is different from the specified one")
+    if checksum_cache is not None:
+        checksum_cache.add(filename, md5_checksum_valid, stat)
+
+
+_checksum_executor = None
+
+def _get_checksum_executor() -> "ThreadPoolExecutor":
+    """return the thread pool used to verify checksums in the background"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    global _checksum_executor
+    if _checksum_executor is None:
+        _checksum_executor = ThreadPoolExecutor(thread_name_prefix="spp2086-checksum")
+    return _checksum_executor
+
+def _reset_checksum_executor() -> None:
+    #the threads of the pool do not exist in a forked child process
+    global _checksum_executor
+    _checksum_executor = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_checksum_executor)
+
+#modes of validating a record against the schema
+VALIDATION_MODES = ("full", "structure", "header")
+
+def _is_json_number(value) -> bool:
+    """same check as the 'number' type of jsonschema"""
+    return not isinstance(value, bool) and isinstance(value, numbers.Number)
+
+
+def _are_valid_items(items: list) -> bool:
+    """check that all items are numbers or numeric tuples with at least two elements like the internalData schema"""
+
+    #map(type, ...) runs in C so the common case of plain floats and ints never loops in python
+    item_types = set(map(type, items))
+    if item_types <= {int, float}:
+        return True
+
+    tuples = [item for item in items if isinstance(item, list)]
+    if len(tuples) != len(items):
+        if not all(_is_json_number(item) for item in items if not isinstance(item, list)):
+            return False
+
+    if tuples:
+        if min(map(len, tuples)) < 2:
+            return False
+        value_types = set(map(type, itertools.chain.from_iterable(tuples)))
+        if not value_types <= {int, float}:
+            if not all(map(_is_json_number, itertools.chain.from_iterable(tuples))):
+                return False
+    return True
+
+
+def _inplace_data(file_dict: dict):
+    """yield (name, data) of all sampling grids and data channels whose data is an internalData object"""
+
+    data = file_dict.get("data")
+    if not isinstance(data, dict):
+        return
+    for key in ("samplingGrids", "dataChannels"):
+        data_iters = data.get(key)
+        if not isinstance(data_iters, list):
+            continue
+        for data_iter in data_iters:
+            if not isinstance(data_iter, dict) or not isinstance(data_iter.get("data"), dict):
+                continue
+            internal_data = data_iter["data"]
+            #an object that could also be an externalFile is left to the schema because of the oneOf
+            if "length" in internal_data and "relativeFilePath" not in internal_data and isinstance(internal_data.get("items"), (list, DeferredItems)):
+                yield data_iter.get("name", key), internal_data
+
+
+def _without_items(file_dict: dict) -> dict:
+    """return a shallow copy of the file content in which the items of internalData objects are empty"""
+
+    stripped_ids = {id(internal_data) for _, internal_data in _inplace_data(file_dict)}
+
+    def strip(data_iter):
+        if isinstance(data_iter, dict) and id(data_iter.get("data")) in stripped_ids:
+            return {**data_iter, "data": {**data_iter["data"], "items": []}}
+        return data_iter
+
+    data = {key: [strip(data_iter) for data_iter in value] if isinstance(value, list) else value
+            for key, value in file_dict["data"].items()}
+    return {**file_dict, "data": data}
+
+
+def _check_inplace_data(file_dict: dict, check_items: bool) -> None:
+    """check the items of internalData objects and that their length matches the number of items"""
+
+    for name, internal_data in _inplace_data(file_dict):
+        #deferred items are checked when they are loaded
+        if not isinstance(internal_data["items"], DeferredItems):
+            _check_items(name, internal_data, check_items)
+
+
+def _check_items(name: str, internal_data: dict, check_items: bool) -> None:
+    """check the items of one internalData object and that its length matches the number of items"""
+    import jsonschema
+
+    items = internal_data["items"]
+    if check_items and not _are_valid_items(items):
+        raise jsonschema.ValidationError(f"the items of '{name}' must be numbers or numeric tuples with at least two elements")
+    length = internal_data["length"]
+    if isinstance(length, int) and length != len(items):
+        raise jsonschema.ValidationError(f"the length {length} of '{name}' does not match the number of items {len(items)}")
+
+
+def _dump_main_file(file_dict: dict, filepath: str, json_layout="compact_items") -> None:
+    """write the content of a main file as JSON in one of the JSON_LAYOUTS"""
+    with stage("encode_main_file", path=filepath):
+        content = dumps_main_file(file_dict, json_layout)
+    with stage("write_main_file", path=filepath) as write_stage:
+        #an existing main file is replaced at once, so readers never see a partially written file
+        with _open_for_replace([filepath]) as (file,):
+            file.write(content)
+        write_stage.add_bytes(len(content))
+
+class LoadResult(NamedTuple):
+    """result of loading one file with MeasurementRecord.load_many, either record or error is None"""
+    path: str
+    record: Optional["MeasurementRecord"]
+    error: Optional[Exception]
+
+
+def _load_record(cls: Type["MeasurementRecord"], path: str, load_external: bool, checksum_workers: int, kwargs: dict) -> LoadResult:
+    """load a single record in a worker of MeasurementRecord.load_many"""
+    try:
+        record = cls.from_filename(path, lazy_loading=True, **kwargs)
+        if load_external:
+            record.load_external_data(workers=checksum_workers)
+        record.wait_for_checksums()
+        return LoadResult(path, record, None)
+    except Exception as err:
+        return LoadResult(path, None, err)
+
 T = TypeVar('T', bound='MeasurementRecord')
 
 class MeasurementRecord:
     """represents content of a JSON file and associated external files"""
 
-    json_validator = create_json_validator()
+    json_validator = _LazyJsonValidator()
 
     def __init__(self):
         self.sampling_grids = []
@@ -37,59 +437,217 @@ class MeasurementRecord:
         self.header = {}
         self.base_filepath = ""
         self.rel_ext_filepath = "data"
+        self.memory_map = False
+        self.verify_checksums = True
+        self.validation_mode = "full"
+        self.channel_cache = None
+        self.checksum_cache = None
+        self._pending_checksums = []
+        #id of the data -> future of its loading by the async methods, so concurrent requests share it
+        self._loading = {}
+        #name -> indices and sampling grid index -> indices of the data channels, see __get_channel_index
+        self._channel_index = {}
+        self._grid_channel_index = {}
+        self._indexed_channels = self.data_channels
+        self._indexed_length = 0
+        #main file of a record opened by open_for_update and, by id of the data, its description in the main file
+        #together with the data loaded from it, which counts as unchanged as long as the data is not replaced
+        self._update_filepath = None
+        self._loaded_data = {}
 
 
     @classmethod
-    def from_filename(cls: Type[T], filename: str, lazy_loading=False) -> T:
-        """ Initialize instance from a file"""
+    def from_filename(cls: Type[T], filename: str, lazy_loading=False, memory_map=False, verify_checksums=None, validate="full", load="all",
+            channel_cache: Optional["ChannelCache"] = None, checksum_cache: Optional["ChecksumCache"] = None) -> T:
+        """
+        Initialize instance from a file
+
+        :param filename: path to the main JSON file
+        :param lazy_loading: read external files only when the data channel is requested by get_data_channel
+        :param memory_map: map external binary files read-only into memory instead of reading them,
+            typed files are returned as numpy.memmap and untyped files as memoryview
+        :param verify_checksums: True to check the md5 checksum of each external file while it is read, False to skip the check
+            or 'background' to check it in a background thread, errors are then raised by wait_for_checksums().
+            None (default) is True, except for memory mapped files, whose check needs a pass over the whole file and
+            therefore runs in the background
+        :param validate: 'full' to validate the whole file against the schema, 'structure' to validate everything except
+            the items of inplace data with the schema and check those with a fast type check, 'header' to validate the header only
+        :param load: 'all' to parse the whole main file or 'header' to skip the items of inplace data until the data channel
+            is requested by get_data_channel, this implies lazy_loading and items are then checked in 'structure' mode when loaded
+        :param channel_cache: ChannelCache shared by many records that holds the decoded data of external files,
+            this implies lazy_loading and get_data_channel then returns copies of the descriptions with the cached data
+        :param checksum_cache: ChecksumCache of verified files, files that are unchanged since their md5 checksum was verified
+            are not hashed again and files verified while they are read are added to it
+        """
 
-        with open(filename, mode='rt', encoding='utf-8') as file:
-            file_dict = json.load(file)
-            cls.json_validator.validate(file_dict)
+        if verify_checksums not in (None, True, False, "background"):
+            raise ValueError(f"Unsupported checksum verification '{verify_checksums}'")
+
+        with stage("from_filename", path=filename, load=load, validate=validate):
+            if load == "all":
+                with stage("read_main_file", path=filename) as read_stage:
+                    with open(filename, mode='rb') as file:
+                        content = file.read()
+                    read_stage.add_bytes(len(content))
+                with stage("parse", path=filename):
+                    file_dict = get_json_backend().loads(content)
+                del content
+            elif load == "header":
+                with stage("scan_main_file", path=filename) as scan_stage:
+                    file_dict = scan_main_file(filename)
+                    if is_enabled():
+                        scan_stage.add_bytes(os.path.getsize(filename))
+                validate = "header" if validate == "header" else "structure"
+                lazy_loading = True
+            else:
+                raise ValueError(f"Unsupported load '{load}', use 'all' or 'header'")
+            with stage("validate", path=filename, mode=validate):
+                cls.validate_file_dict(file_dict, validate)
+            if channel_cache is not None:
+                lazy_loading = True
+
+            self = cls()
+            self.base_filepath = os.path.dirname(os.path.abspath(filename))
+            self.memory_map = memory_map
+            self.verify_checksums = verify_checksums
+            self.validation_mode = validate
+            self.channel_cache = channel_cache
+            self.checksum_cache = checksum_cache
+            self.header = file_dict["header"]
+            self.sampling_grids = file_dict["data"]["samplingGrids"]
+            self.data_channels = file_dict["data"]["dataChannels"]
+
+            #read sampling grids and data channels into memory
+            for data_iter in itertools.chain(self.sampling_grids, self.data_channels):
+                if data_iter["storageType"] == "inplace":
+                    if not isinstance(data_iter["data"]["items"], DeferredItems):
+                        data_iter["data"] = self.__read_inplace(data_iter["data"])
+                elif data_iter["storageType"] == "externalFile":
+                    if not lazy_loading:
+                        self.__load_external_data(data_iter)
+                else:
+                    raise ValueError()
+
+            return self
 
-        header = file_dict["header"]
-        sampling_grids = file_dict["data"]["samplingGrids"]
-        data_channels = file_dict["data"]["dataChannels"]
-        base_dir = os.path.dirname(os.path.abspath(filename))
 
-        #read sampling grids and data channels into memory
-        for data_iter in itertools.chain(sampling_grids, data_channels):
-            if data_iter["storageType"] == "inplace":
-                data_iter["data"] = cls.__read_inplace(data_iter["data"])
-            elif data_iter["storageType"] == "externalFile":
-                if not lazy_loading:
-                    data_iter["data"] = cls.__read_from_external_file(data_iter["data"], base_dir)
-            else:
-                raise ValueError()
+    @classmethod
+    async def aload(cls: Type[T], filename: str, executor: Optional["Executor"] = None, **kwargs) -> T:
+        """
+        load a record like from_filename() without blocking the event loop
+
+        The main file is parsed and validated in the executor, then the external files are read and their
+        checksums verified concurrently in the default executor of the event loop.
+
+        :param executor: executor that parses the main file, by default the default executor of the event loop,
+            a ProcessPoolExecutor keeps the parsing of large files from competing with the event loop for the interpreter lock
+        :Keyword Arguments: passed on to from_filename
+        """
+        import asyncio
 
-        self = cls()
-        self.base_filepath = base_dir
-        self.header = header
-        self.sampling_grids = sampling_grids
-        self.data_channels = data_channels
+        loop = asyncio.get_running_loop()
+        lazy_loading = kwargs.pop("lazy_loading", False)
+        self = await loop.run_in_executor(executor, functools.partial(cls.from_filename, filename, lazy_loading=True, **kwargs))
+        if not lazy_loading:
+            await self.aload_external_data()
         return self
 
 
-    def add_sampling_grid(self, name: str, unit: str, data: List, **kwargs) -> int:
+    async def aload_external_data(self) -> None:
+        """read all data that is not loaded yet like load_external_data(), one task per file in the default executor"""
+        import asyncio
+
+        await asyncio.gather(*(self.__aload_data(data_iter) for data_iter in itertools.chain(self.sampling_grids, self.data_channels)))
+
+
+    @classmethod
+    def load_many(cls: Type[T], paths: Iterable[str], workers: Optional[int] = None, executor="process", ordered=True,
+        checksum_workers=4, **kwargs) -> Iterator[LoadResult]:
+        """
+        load many records in parallel and yield a LoadResult for each path
+
+        Files that can not be loaded are reported by the error of their result instead of aborting the batch.
+
+        :param paths: paths of the main JSON files
+        :param workers: number of worker processes or threads, by default the number of CPUs
+        :param executor: 'process' to parse and validate in worker processes or 'thread' to use threads,
+            threads keep memory maps valid but share the interpreter lock for parsing and validation
+        :param ordered: yield the results in the order of paths if True, otherwise as soon as they are done
+        :param checksum_workers: number of threads per record that read and verify its external files
+        :Keyword Arguments: passed on to from_filename
+        """
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+        if executor == "process":
+            pool = ProcessPoolExecutor(max_workers=workers)
+        elif executor == "thread":
+            pool = ThreadPoolExecutor(max_workers=workers)
+        else:
+            raise ValueError(f"Unsupported executor '{executor}', use 'process' or 'thread'")
+
+        load_external = not kwargs.pop("lazy_loading", False)
+        #limit the number of submitted files so that results do not pile up in memory
+        max_pending = 4 * (workers or os.cpu_count() or 1)
+        paths = iter(paths)
+        pending = collections.OrderedDict()
+
+        def submit_next() -> bool:
+            path = next(paths, None)
+            if path is None:
+                return False
+            future = pool.submit(_load_record, cls, path, load_external, checksum_workers, kwargs)
+            pending[future] = path
+            return True
+
+        def result_of(future) -> LoadResult:
+            path = pending.pop(future)
+            try:
+                return future.result()
+            except Exception as err:
+                #for example a result that could not be sent back by a worker process
+                return LoadResult(path, None, err)
+
+        try:
+            while len(pending) < max_pending and submit_next():
+                pass
+            while pending:
+                if ordered:
+                    done = [next(iter(pending))]
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield result_of(future)
+                    submit_next()
+        finally:
+            #cancel_futures of shutdown requires Python 3.9
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+
+
+    def add_sampling_grid(self, name: str, unit: str, data: Union[List, bytes, bytearray, array.array, "numpy.ndarray"], **kwargs) -> int:
         """
         add a sampling grid to the record
 
         :param name: name of the sampling grid like 'Timer 1'
         :param unit: physical unit of the data
-        :param data: the actual data as a list
+        :param data: the actual data as a list or a numpy array, array.array or bytes if encoding is set to bin
 
         :Keyword Arguments:
             storageType (string): Either 'inplace'(default) for writing to the main file or 'externalFile' for writing to a sub file
             notes (string): Notes about this data.
-            encoding (string): 'json' or 'bin'
+            encoding (string): 'json' or 'bin', optionally compressed by appending '+gzip', '+zstd' or '+lz4'
+            filters (list): 'delta' and/or 'shuffle' to rearrange typed binary data in external files before compression
         """
 
         storage_type = kwargs.pop("storageType", "inplace")
         notes = kwargs.pop("notes", None)
         encoding = kwargs.pop("encoding", "json")
+        filters = kwargs.pop("filters", None)
 
         if storage_type not in ("inplace", "externalFile"):
             raise ValueError("Unsupported storage type")
+        self.__check_filters(filters, storage_type, encoding)
 
         sampling_grid = {
             "name": name,
@@ -102,24 +660,28 @@ class MeasurementRecord:
         if notes is not None:
             sampling_grid["notes"] = notes
 
+        if filters:
+            sampling_grid["filters"] = list(filters)
+
         self.sampling_grids.append(sampling_grid)
         return len(self.sampling_grids)-1
 
 
-    def add_data_channel(self, name: str, unit: str, sampling_grid_idx: int, data: Union[List, bytearray], **kwargs) -> None:
+    def add_data_channel(self, name: str, unit: str, sampling_grid_idx: int, data: Union[List, bytes, bytearray, array.array, "numpy.ndarray"], **kwargs) -> None:
         """
         add a data channel sampled over an existing sampling grid
         
         :param name: name of the data channel like Fc
         :param unit: physical unit of the data
         :param sampling_grid_idx: the zero-based index of the corresponding sampling grid in self.sampling_grids
-        :param data: the actual data as a list or bytearray if encoding is set to bin
+        :param data: the actual data as a list or a numpy array, array.array or bytes if encoding is set to bin
 
         :Keyword Arguments:
             storageType (string): Either 'inplace'(default) for writing to the main file or 'externalFile' for writing to a sub file
             notes (string): Notes about this data.
             inProcess (bool): Flag whether this data is measured in process
-            encoding (string): 'json' or 'bin'
+            encoding (string): 'json' or 'bin', optionally compressed by appending '+gzip', '+zstd' or '+lz4'
+            filters (list): 'delta' and/or 'shuffle' to rearrange typed binary data in external files before compression
         """
 
 
@@ -130,11 +692,17 @@ class MeasurementRecord:
         storage_type = kwargs.pop("storageType", "inplace")
         notes = kwargs.pop("notes", None)
         encoding = kwargs.pop("encoding", "json")
+        filters = kwargs.pop("filters", None)
 
         if storage_type not in ("inplace", "externalFile"):
             raise ValueError("Unsupported storage type")
+        self.__check_filters(filters, storage_type, encoding)
 
-        if name in self.get_data_channel_names():
+        channel_indices = self.__get_channel_index().get(name, ())
+        if any(self.data_channels[idx]["name"] != name for idx in channel_indices):
+            #a channel may have been renamed in place
+            channel_indices = self.__get_channel_index(rebuild=True).get(name, ())
+        if channel_indices:
             raise ValueError(f"A data channel with the name '{name}' already exists")
 
         if bool(kwargs):
@@ -154,7 +722,14 @@ class MeasurementRecord:
         if notes is not None:
             data_channel["notes"] = notes
 
+        if filters:
+            data_channel["filters"] = list(filters)
+
+        channel_idx = len(self.data_channels)
         self.data_channels.append(data_channel)
+        self._channel_index[name] = [channel_idx]
+        self._grid_channel_index.setdefault(sampling_grid_idx, []).append(channel_idx)
+        self._indexed_length = channel_idx + 1
 
 
     def add_parameter(self, name: str, value: Union[str,int,float,list], unit: str, symbol="") -> None:
@@ -180,34 +755,158 @@ class MeasurementRecord:
         return
 
 
-    def write(self, filepath: str) -> None:
-        """write the record to a compliant JSON file"""
-        
-        self.base_filepath = os.path.dirname(filepath)
-        filename = os.path.splitext(os.path.basename(filepath))[0]
-        self.rel_ext_filepath = os.path.join(self.rel_ext_filepath, filename)
-        if not os.path.exists(self.base_filepath):
-            os.makedirs(self.base_filepath)
+    def write(self, filepath: Union[str, Sequence[str]], validate="full", workers: Optional[int] = None, json_processes: Optional[int] = None,
+            content_store: Optional[str] = None, content_hash="blake2b", json_layout="compact_items") -> None:
+        """
+        write the record to a compliant JSON file
+
+        The record is not modified and can be written again. External files of data that is not loaded are copied
+        from the files the record was read from.
+
+        :param filepath: path of the main JSON file or a list of paths to write the record to several targets,
+            the data is then serialized once and written to all targets in a single pass
+        :param validate: 'full', 'structure' or 'header', see from_filename
+        :param workers: number of threads that serialize, write and hash the external files in parallel,
+            the main file is the same as without workers
+        :param json_processes: number of worker processes that encode large lists of external JSON files,
+            which otherwise compete for the interpreter lock
+        :param content_store: directory of a content store shared by many records, external files are then stored there
+            once per content and named by their contentHash instead of next to the main file, see collect_garbage()
+        :param content_hash: 'blake2b', 'sha256' or 'xxh3', the hash that names the files of the content store
+        :param json_layout: 'indent' to indent the whole main file, 'compact_items' to indent it but write the items
+            of inplace data on one line, or 'compact' to write it without whitespace
+        """
 
-        #write sampling grids and data channels
-        for data_iter in itertools.chain(self.sampling_grids, self.data_channels):
-            if data_iter["storageType"] == "inplace":
-                data_iter["data"] = self.__write_inplace(data_iter["data"])
-            elif data_iter["storageType"] == "externalFile":
-                data_iter["data"] = self.__write_to_external_file(data_iter["data"], data_iter["name"], data_iter.pop("encoding", "json"))
-            else:
-                raise ValueError()
+        with stage("write", path=filepath, workers=workers):
+            filepaths, rel_ext_filepaths = self.__prepare_targets(filepath)
+            store = self.__open_content_store(content_store, content_hash)
+            data_iters = list(itertools.chain(self.sampling_grids, self.data_channels))
 
-        file_dict = {
-            "$schema": self.json_validator.schema["$id"],
-            "header": self.header,
-            "data": {"samplingGrids": self.sampling_grids, "dataChannels": self.data_channels}
-            }
+            with contextlib.ExitStack() as stack:
+                json_pool = None
+                if json_processes is not None and json_processes > 0:
+                    from concurrent.futures import ProcessPoolExecutor
+                    json_pool = stack.enter_context(ProcessPoolExecutor(max_workers=json_processes))
 
-        with open(filepath, mode='wt', encoding='utf-8') as file:
-            self.json_validator.validate(file_dict)
-            json.dump(file_dict, file, ensure_ascii=False, indent=2)
-        return
+                def describe(data_iter):
+                    return self.__describe_data(data_iter, filepaths, rel_ext_filepaths, json_pool, store)
+
+                if workers is None or workers <= 1 or len(data_iters) <= 1:
+                    results = [describe(data_iter) for data_iter in data_iters]
+                else:
+                    from concurrent.futures import ThreadPoolExecutor
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        #results are returned in the order of data_iters
+                        results = list(pool.map(in_current_context(describe), data_iters))
+
+            descriptions = {id(data_iter): description for data_iter, description in zip(data_iters, results)}
+            self.__write_main_files(filepaths, rel_ext_filepaths, descriptions, validate, json_layout)
+
+
+    async def awrite(self, filepath: Union[str, Sequence[str]], validate="full", executor: Optional["Executor"] = None,
+            content_store: Optional[str] = None, content_hash="blake2b", json_layout="compact_items") -> None:
+        """
+        write the record like write() without blocking the event loop
+
+        The external files of all sampling grids and data channels are serialized, written and hashed concurrently
+        in the executor, the main files are written once they are done.
+
+        :param executor: executor for the file operations, by default the default executor of the event loop
+        :param content_store: directory of a content store, see write()
+        :param content_hash: hash that names the files of the content store, see write()
+        :param json_layout: layout of the main files, see write()
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        with stage("write", path=filepath):
+            filepaths, rel_ext_filepaths = await loop.run_in_executor(executor, self.__prepare_targets, filepath)
+            store = self.__open_content_store(content_store, content_hash)
+            data_iters = list(itertools.chain(self.sampling_grids, self.data_channels))
+            #the executor does not pass on the current stage, so its stages are children of the write stage
+            describe_data = in_current_context(self.__describe_data)
+            results = await asyncio.gather(*(loop.run_in_executor(executor, describe_data, data_iter, filepaths, rel_ext_filepaths, None, store)
+                for data_iter in data_iters))
+            descriptions = {id(data_iter): description for data_iter, description in zip(data_iters, results)}
+            await loop.run_in_executor(executor, in_current_context(self.__write_main_files), filepaths, rel_ext_filepaths, descriptions,
+                validate, json_layout)
+
+
+    @classmethod
+    def open_for_update(cls: Type[T], filename: str, validate="structure", **kwargs) -> T:
+        """
+        open a record to add or replace sampling grids, data channels or header entries and save them with commit()
+
+        Only the header and the descriptions of the data are read, data is loaded when it is requested.
+
+        :param filename: path to the main JSON file
+        :param validate: 'structure' or 'header', see from_filename
+        :Keyword Arguments: passed on to from_filename, except load which is always 'header'
+        """
+
+        kwargs.pop("load", None)
+        self = cls.from_filename(filename, validate=validate, load="header", **kwargs)
+        self._update_filepath = filename
+        return self
+
+
+    def commit(self, validate="structure", json_layout="compact_items") -> None:
+        """
+        save the changes of a record opened by open_for_update to its files
+
+        External files are only written for data that was added or replaced, the descriptions and checksums of all other
+        external files stay as they are and the items of inplace data that was not replaced are copied from the main file
+        without parsing them. The main file is replaced at once when it is completely written. Data counts as replaced
+        if the sampling grid or data channel refers to another object than the one loaded from the file,
+        modifications of the loaded object itself are not detected.
+
+        Afterwards, the record refers to the written files like a newly opened one.
+
+        :param validate: 'structure' or 'header', see from_filename
+        :param json_layout: layout of the main file, see write()
+        """
+
+        filepath = self._update_filepath
+        if filepath is None:
+            raise RuntimeError("Only records opened by open_for_update can be committed")
+        if validate == "full":
+            #the items that are not loaded are checked when they are loaded
+            validate = "structure"
+
+        with stage("commit", path=filepath):
+            filepaths, rel_ext_filepaths = self.__prepare_targets(filepath)
+            descriptions = {}
+            for data_iter in itertools.chain(self.sampling_grids, self.data_channels):
+                description = self.__unchanged_description(data_iter)
+                if description is not None:
+                    descriptions[id(data_iter)] = (None, description)
+                else:
+                    descriptions[id(data_iter)] = self.__describe_data(data_iter, filepaths, rel_ext_filepaths)
+            self.__write_main_files(filepaths, rel_ext_filepaths, descriptions, validate, json_layout)
+
+            #the positions of deferred items have changed, so the record refers to the new main file from scratch
+            file_dict = scan_main_file(filepath)
+            written_iters = itertools.chain(file_dict["data"]["samplingGrids"], file_dict["data"]["dataChannels"])
+            for data_iter, written_iter in zip(itertools.chain(self.sampling_grids, self.data_channels), written_iters):
+                if data_iter["storageType"] == "externalFile":
+                    data_iter.pop("encoding", None)
+                    data_iter.pop("filters", None)
+                data_iter["data"] = written_iter["data"]
+            self.base_filepath = os.path.dirname(os.path.abspath(filepath))
+            self._loaded_data = {}
+
+
+    def open_stream(self, filepath: str, validate="structure") -> "MeasurementRecordStream":
+        """
+        open an incremental writer for long acquisitions
+
+        The header, sampling grids and data channels must be added before, their data is written as first chunk.
+        Further chunks are added with append() of the returned stream, and close() writes the main JSON file.
+
+        :param filepath: path of the main JSON file
+        :param validate: 'full', 'structure' or 'header', see from_filename
+        """
+        return MeasurementRecordStream(self, filepath, validate)
 
 
     def validate_header(self) -> None:
@@ -223,116 +922,916 @@ class MeasurementRecord:
         return
 
 
-    def get_data_channel(self, name:str) -> Tuple[dict, dict]:
-        """return (data_channel, sampling_grid) specified by the channel name"""
-        channel = [channel for channel in self.data_channels if channel["name"] == name]
+    @classmethod
+    def validate_file_dict(cls, file_dict: dict, validate="full") -> None:
+        """validate the parsed content of a main file in one of the VALIDATION_MODES, raises jsonschema.ValidationError"""
 
-        if not channel:
-            raise ValueError(f"No channel with name: '{name}' found")
+        if validate == "full":
+            cls.json_validator.validate(file_dict)
+            _check_inplace_data(file_dict, check_items=False)
+        elif validate == "structure":
+            if not isinstance(file_dict, dict) or not isinstance(file_dict.get("data"), dict):
+                #nothing to strip, the schema reports what is wrong
+                cls.json_validator.validate(file_dict)
+            cls.json_validator.validate(_without_items(file_dict))
+            _check_inplace_data(file_dict, check_items=True)
+        elif validate == "header":
+            if not isinstance(file_dict, dict):
+                cls.json_validator.validate(file_dict)
+            cls.json_validator.validate({**file_dict, "data": {"samplingGrids": [], "dataChannels": []}})
+        else:
+            raise ValueError(f"Unsupported validation mode '{validate}', use one of {VALIDATION_MODES}")
 
-        if len(channel) > 1:
-            raise ValueError(f"Multiple data channels with name '{name}' exist.")
 
-        channel = channel[0]
-        if not self.__is_data_loaded(channel):
-            channel["data"] = self.__read_from_external_file(channel["data"], self.base_filepath)
-            channel_idx = self.get_data_channel_names().index(name)
-            self.data_channels[channel_idx] = channel
+    def get_data_channel(self, name:str, start: Optional[int] = None, stop: Optional[int] = None) -> Tuple[dict, dict]:
+        """
+        return (data_channel, sampling_grid) specified by the channel name
 
+        If start or stop is given, copies of both are returned whose data only contains the samples in [start:stop].
+        External typed binary files that are not loaded yet are then read partially, without checking their md5 checksum.
+        """
+        channel = self.__find_data_channel(name)
         sampling_grid = self.sampling_grids[channel["samplingGridIndex"]]
+
+        if start is not None or stop is not None:
+            channel_window = dict(channel, data=self.__get_window(channel, start, stop))
+            sampling_grid_window = dict(sampling_grid, data=self.__get_window(sampling_grid, start, stop))
+            return (channel_window, sampling_grid_window)
+
+        if self.channel_cache is not None:
+            return (self.__with_cached_data(channel), self.__with_cached_data(sampling_grid))
+
+        if not self.__is_data_loaded(channel):
+            self.__load_data(channel)
+
         if not self.__is_data_loaded(sampling_grid):
-            sampling_grid["data"] = self.__read_from_external_file(sampling_grid["data"], self.base_filepath)
-            self.sampling_grids[channel["samplingGridIndex"]] = sampling_grid
+            self.__load_data(sampling_grid)
 
         return (channel, sampling_grid)
 
 
-    def get_data_channel_names(self) -> List[str]:
-        """returns a list with all data channel names"""
-        channel_names = [channel["name"] for channel in self.data_channels]
-        return channel_names
+    async def aget_data_channel(self, name: str, start: Optional[int] = None, stop: Optional[int] = None) -> Tuple[dict, dict]:
+        """return (data_channel, sampling_grid) like get_data_channel(), the data channel and its sampling grid are loaded concurrently"""
+        import asyncio
+
+        channel = self.__find_data_channel(name)
+        if start is None and stop is None and self.channel_cache is None:
+            await asyncio.gather(self.__aload_data(channel), self.__aload_data(self.sampling_grids[channel["samplingGridIndex"]]))
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(self.get_data_channel, name, start, stop))
+
+
+    def get_sampling_grid(self, sampling_grid_idx: int) -> dict:
+        """return the sampling grid at sampling_grid_idx, its data is loaded if necessary"""
+        sampling_grid = self.sampling_grids[sampling_grid_idx]
+        if self.channel_cache is not None:
+            return self.__with_cached_data(sampling_grid)
+        if not self.__is_data_loaded(sampling_grid):
+            self.__load_data(sampling_grid)
+        return sampling_grid
+
+
+    def slice_by_grid(self, name: str, lower: float, upper: float) -> Tuple[dict, dict]:
+        """
+        return copies of (data_channel, sampling_grid) with the samples whose grid values are within [lower, upper]
+
+        The sampling grid must be monotonically increasing and is searched by bisection. A grid in an external
+        typed binary file is searched through a memory map so only the pages touched by the search are read.
+        """
+        channel = self.__find_data_channel(name)
+        sampling_grid = self.sampling_grids[channel["samplingGridIndex"]]
+
+        grid_values = sampling_grid["data"]
+        if not self.__is_data_loaded(sampling_grid):
+            external_file = sampling_grid["data"]
+            if sampling_grid["storageType"] == "externalFile" and _is_raw_binary(external_file) and "dtype" in external_file:
+                grid_values = self.__map_binary(external_file, os.path.join(self.base_filepath, external_file["relativeFilePath"]))
+            else:
+                self.__load_data(sampling_grid)
+                grid_values = sampling_grid["data"]
+
+        numpy = sys.modules.get("numpy")
+        if numpy is not None and isinstance(grid_values, numpy.ndarray):
+            if grid_values.ndim != 1:
+                raise ValueError("Only sampling grids of scalars can be searched")
+            start = int(numpy.searchsorted(grid_values, lower, side="left"))
+            stop = int(numpy.searchsorted(grid_values, upper, side="right"))
+        elif isinstance(grid_values, list):
+            if grid_values and isinstance(grid_values[0], list):
+                raise ValueError("Only sampling grids of scalars can be searched")
+            start = bisect.bisect_left(grid_values, lower)
+            stop = bisect.bisect_right(grid_values, upper)
+        else:
+            raise ValueError(f"Sampling grid of type {type(grid_values).__name__} can not be searched")
+
+        return self.get_data_channel(name, start, max(start, stop))
+
+
+    def align_channels(self, names: Sequence[str], sampling_grid: Union[int, Sequence[float], "numpy.ndarray", None] = None, method="linear",
+            anti_aliasing=True) -> Tuple["numpy.ndarray", Dict[str, "numpy.ndarray"]]:
+        """
+        resample data channels onto a common sampling grid with numpy, see resampling.resample
+
+        Channels are processed in chunks, so channels of a record read with memory_map=True are not loaded as a whole.
+
+        :param names: names of the data channels
+        :param sampling_grid: index of the sampling grid to align to or the points of a target grid,
+            by default the sampling grid of the first channel
+        :param method: 'linear', 'nearest' or 'zoh' (zero-order hold)
+        :param anti_aliasing: lowpass filter channels that are sampled more finely than the target grid
+        :return: the points of the target grid and the aligned data as float arrays by channel name,
+            channels of numeric tuples have one column per element
+        """
+        from .resampling import as_array, resample
+        numpy = _import_numpy()
+
+        if not names:
+            raise ValueError("No data channels given")
+        if sampling_grid is None:
+            sampling_grid = self.__find_data_channel(names[0])["samplingGridIndex"]
+        if isinstance(sampling_grid, numbers.Integral):
+            target_idx = int(sampling_grid)
+            target = as_array(self.get_sampling_grid(target_idx)["data"], self.sampling_grids[target_idx]["name"])
+        else:
+            target_idx = None
+            target = as_array(sampling_grid, "sampling_grid")
+
+        aligned = {}
+        for name in names:
+            channel, channel_grid = self.get_data_channel(name)
+            values = as_array(channel["data"], name)
+            if channel["samplingGridIndex"] == target_idx:
+                aligned[name] = numpy.asarray(values, dtype=numpy.result_type(values.dtype, numpy.float64))
+            else:
+                aligned[name] = resample(channel_grid["data"], values, target, method, anti_aliasing)
+        return target, aligned
+
+
+    def decimate_channel(self, name: str, factor: int, numtaps: Optional[int] = None) -> Tuple[dict, dict]:
+        """
+        return copies of (data_channel, sampling_grid) with every factor-th sample, see resampling.decimate
+
+        The data channel is lowpass filtered before, so frequencies above the new Nyquist frequency do not alias.
+        """
+        from .resampling import as_array, decimate
+
+        channel, sampling_grid = self.get_data_channel(name)
+        grid_values = as_array(sampling_grid["data"], sampling_grid["name"])[::factor]
+        decimated = decimate(as_array(channel["data"], name), factor, numtaps)
+        if isinstance(channel["data"], list):
+            grid_values, decimated = grid_values.tolist(), decimated.tolist()
+        return dict(channel, data=decimated), dict(sampling_grid, data=grid_values)
+
+
+    def load_external_data(self, workers: Optional[int] = None) -> None:
+        """
+        read all external files and deferred inplace items that are not loaded yet,
+        with more than one worker they are read and verified in a thread pool
+        """
+
+        not_loaded = [data_iter for data_iter in itertools.chain(self.sampling_grids, self.data_channels)
+            if not self.__is_data_loaded(data_iter)]
+
+        if workers is None or workers <= 1 or len(not_loaded) <= 1:
+            for data_iter in not_loaded:
+                self.__load_data(data_iter)
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            #hashing and file reads release the interpreter lock
+            list(pool.map(self.__load_data, not_loaded))
+
+
+    def wait_for_checksums(self) -> None:
+        """wait for the checksums verified in the background, raises RuntimeError if one does not match"""
+
+        pending_checksums, self._pending_checksums = self._pending_checksums, []
+        for checksum_check in pending_checksums:
+            checksum_check.result()
+
+
+    def get_data_channel_names(self, sampling_grid_idx: Optional[int] = None) -> List[str]:
+        """returns a list with all data channel names or with the names of the channels sampled over sampling_grid_idx"""
+
+        if sampling_grid_idx is None:
+            return [channel["name"] for channel in self.data_channels]
+
+        channel_indices = self.__get_grid_channel_index().get(sampling_grid_idx, [])
+        if any(self.data_channels[idx]["samplingGridIndex"] != sampling_grid_idx for idx in channel_indices):
+            channel_indices = self.__get_grid_channel_index(rebuild=True).get(sampling_grid_idx, [])
+        return [self.data_channels[idx]["name"] for idx in channel_indices]
+
+
+    @staticmethod
+    def __check_filters(filters: Optional[List[str]], storage_type: str, encoding: str) -> None:
+        if filters is None:
+            return
+        check_filters(filters)
+        if filters and (storage_type != "externalFile" or not encoding.startswith("bin")):
+            raise ValueError("Filters can only be applied to binary data in external files")
+
+
+    def __find_data_channel(self, name: str) -> dict:
+        channel_indices = self.__get_channel_index().get(name)
+        if not channel_indices or any(self.data_channels[idx]["name"] != name for idx in channel_indices):
+            #a channel may have been renamed in place
+            channel_indices = self.__get_channel_index(rebuild=True).get(name)
+
+        if not channel_indices:
+            raise ValueError(f"No channel with name: '{name}' found")
+
+        if len(channel_indices) > 1:
+            raise ValueError(f"Multiple data channels with name '{name}' exist.")
+
+        return self.data_channels[channel_indices[0]]
+
+
+    def __get_channel_index(self, rebuild=False) -> dict:
+        """
+        return a dict of the indices of the data channels by name
+
+        The index is updated by add_data_channel and rebuilt if data_channels was replaced or changed in length,
+        or if a lookup finds a channel whose name or sampling grid index was changed in place.
+        """
+
+        if rebuild or self._indexed_channels is not self.data_channels or self._indexed_length != len(self.data_channels):
+            self._channel_index = {}
+            self._grid_channel_index = {}
+            for channel_idx, channel in enumerate(self.data_channels):
+                self._channel_index.setdefault(channel["name"], []).append(channel_idx)
+                self._grid_channel_index.setdefault(channel["samplingGridIndex"], []).append(channel_idx)
+            self._indexed_channels = self.data_channels
+            self._indexed_length = len(self.data_channels)
+        return self._channel_index
+
+
+    def __get_grid_channel_index(self, rebuild=False) -> dict:
+        """return a dict of the indices of the data channels by sampling grid index"""
+        self.__get_channel_index(rebuild)
+        return self._grid_channel_index
+
+
+    def __prepare_targets(self, filepath: Union[str, Sequence[str]]) -> Tuple[List[str], List[str]]:
+        """return the paths of the main files and the directories of their external files relative to them"""
+
+        filepaths = [filepath] if isinstance(filepath, (str, os.PathLike)) else list(filepath)
+        if not filepaths:
+            raise ValueError("No filepath given")
+
+        #external files are written to <rel_ext_filepath>/<name of the main file>/ next to each main file
+        rel_ext_filepaths = [os.path.join(self.rel_ext_filepath, os.path.splitext(os.path.basename(path))[0]) for path in filepaths]
+        for path in filepaths:
+            base_dir = os.path.dirname(path)
+            if base_dir:
+                os.makedirs(base_dir, exist_ok=True)
+        return filepaths, rel_ext_filepaths
+
+
+    @staticmethod
+    def __open_content_store(content_store: Optional[str], content_hash: str) -> Optional["ContentStore"]:
+        if content_store is None:
+            return None
+        #imported here as the content store reads main files through the catalog module, which imports this module
+        from .content_store import ContentStore
+        return ContentStore(content_store, content_hash)
+
+
+    def __unchanged_description(self, data_iter: dict) -> Optional[dict]:
+        """return the description in the main file of data that is not loaded or was not replaced since it was loaded"""
+
+        if not self.__is_data_loaded(data_iter):
+            return data_iter["data"]
+        description, loaded_data = self._loaded_data.get(id(data_iter), (None, None))
+        if description is not None and loaded_data is data_iter["data"]:
+            return description
+        return None
+
+
+    def __describe_data(self, data_iter: dict, filepaths: List[str], rel_ext_filepaths: List[str],
+            json_pool: Optional["Executor"] = None, store: Optional["ContentStore"] = None) -> Tuple[Optional[str], dict]:
+        """
+        write the external files of a sampling grid or data channel and return its file name and description of the data,
+        the file name is an absolute path for files in a content store
+        """
+
+        if data_iter["storageType"] == "inplace":
+            if not self.__is_data_loaded(data_iter):
+                self.__load_inplace_data(data_iter)
+            return (None, self.__write_inplace(data_iter["data"]))
+        elif data_iter["storageType"] == "externalFile":
+            if store is not None:
+                return self.__write_to_content_store(data_iter, store, json_pool)
+            return self.__write_to_external_files(data_iter, filepaths, rel_ext_filepaths, json_pool)
+        else:
+            raise ValueError()
+
+
+    def __write_main_files(self, filepaths: List[str], rel_ext_filepaths: List[str], descriptions: dict, validate: str,
+            json_layout="compact_items") -> None:
+        """write the main file of each target, the file names of external data are joined with rel_ext_filepaths"""
+
+        for target_idx, (path, rel_ext_filepath) in enumerate(zip(filepaths, rel_ext_filepaths)):
+
+            def described(data_iter):
+                ext_filename, description = descriptions[id(data_iter)]
+                if ext_filename is not None and os.path.isabs(ext_filename):
+                    #files of a content store are shared by all targets
+                    description = {"relativeFilePath": os.path.relpath(ext_filename, os.path.dirname(os.path.abspath(path))), **description}
+                elif ext_filename is not None:
+                    description = {"relativeFilePath": os.path.join(rel_ext_filepath, ext_filename), **description}
+                return {key: description if key == "data" else value for key, value in data_iter.items()
+                    if key not in ("encoding", "filters") or data_iter["storageType"] == "inplace"}
+
+            file_dict = {
+                "$schema": self.json_validator.schema["$id"],
+                "header": self.header,
+                "data": {
+                    "samplingGrids": [described(sampling_grid) for sampling_grid in self.sampling_grids],
+                    "dataChannels": [described(data_channel) for data_channel in self.data_channels]
+                }
+            }
+
+            #the targets only differ in the paths of external files
+            if target_idx == 0:
+                with stage("validate", path=path, mode=validate):
+                    self.validate_file_dict(file_dict, validate)
+            _dump_main_file(file_dict, path, json_layout)
 
 
     def __write_inplace(self, data:List):
         return {"length": len(data), "items": data}
 
 
-    def __write_to_external_file(self, data:List, filename:str, encoding:str):
-        """write channel or grid data to an external file"""
+    def __write_to_external_files(self, data_iter: dict, filepaths: List[str], rel_ext_filepaths: List[str],
+            json_pool: Optional["Executor"] = None) -> Tuple[str, dict]:
+        """
+        write channel or grid data to an external file next to each of the main files at filepaths
 
-        ext_filepath = os.path.join(self.base_filepath, self.rel_ext_filepath, filename + '.json')
-        ext_file_dir =  os.path.join(self.base_filepath, self.rel_ext_filepath)
-        
-        if not os.path.exists(ext_file_dir):
-            os.makedirs(ext_file_dir)
-
-
-        if encoding == "json":
-            with open(ext_filepath, mode='wt', encoding='utf-8') as file:
-                #write as json to file
-                json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
-        elif encoding == "bin":
-            with open(ext_filepath, mode='wb',) as file:
-                #write binary bytes directly to file
-                file.write(data)
-        else:
-            raise ValueError(f"Encoding: '{encoding}' not supported found")
-        
-        #read back in binary mode for md5 hash
-        with open(ext_filepath, mode='rb') as file:
-            file_hash = hashlib.md5()
-            while chunk := file.read(8192):
-                file_hash.update(chunk)
-
-        md5_checksum = file_hash.hexdigest()
-       
-        external_file = {
-            "relativeFilePath": os.path.join(self.rel_ext_filepath, filename + '.json'),
-            "md5": md5_checksum,
-            "fileEncoding": encoding
-        }
-        return external_file
+        Returns the file name and the external file description without relativeFilePath.
+        """
+
+        is_loaded = self.__is_data_loaded(data_iter)
+        external_file, extension = self.__external_file_of(data_iter, is_loaded)
+        ext_filename = data_iter["name"] + extension
+
+        ext_filepaths = []
+        for path, rel_ext_filepath in zip(filepaths, rel_ext_filepaths):
+            ext_file_dir = os.path.join(os.path.dirname(path), rel_ext_filepath)
+            os.makedirs(ext_file_dir, exist_ok=True)
+            ext_filepaths.append(os.path.join(ext_file_dir, ext_filename))
+
+        #the md5 hash is computed from the bytes while they are written
+        with _open_for_replace(ext_filepaths) as files:
+            hashing_writer = _HashingWriter(*files)
+            binary_layout = self.__write_external_data(data_iter, external_file, is_loaded, hashing_writer, json_pool)
+
+        if not is_loaded:
+            return ext_filename, {key: value for key, value in external_file.items() if key != "relativeFilePath"}
+
+        external_file = {"md5": hashing_writer.file_hash.hexdigest(), **external_file}
+        external_file.update(binary_layout)
+        return ext_filename, external_file
+
+
+    def __write_to_content_store(self, data_iter: dict, store: "ContentStore", json_pool: Optional["Executor"] = None) -> Tuple[str, dict]:
+        """
+        add channel or grid data to a content store unless it has the content already
+
+        Returns the path of the file in the store and the external file description without relativeFilePath.
+        """
+
+        is_loaded = self.__is_data_loaded(data_iter)
+        external_file, extension = self.__external_file_of(data_iter, is_loaded)
+        if not is_loaded:
+            external_file = {key: value for key, value in external_file.items() if key != "relativeFilePath"}
+            #data that was read from the store is referenced without reading it again
+            if store.contains(external_file.get("contentHash", ""), extension):
+                return store.path_of(external_file["contentHash"], extension), external_file
+
+        with store.add(extension) as entry:
+            hashing_writer = _HashingWriter(entry.file, content_hash=entry.hash)
+            binary_layout = self.__write_external_data(data_iter, external_file, is_loaded, hashing_writer, json_pool)
+
+        external_file = {"md5": hashing_writer.file_hash.hexdigest(), **external_file, "contentHash": entry.content_hash}
+        external_file.update(binary_layout)
+        return entry.path, external_file
+
+
+    def __external_file_of(self, data_iter: dict, is_loaded: bool) -> Tuple[dict, str]:
+        """return the external file description of loaded data or of the file that is copied, and the extension of the file"""
+
+        if is_loaded:
+            encoding = data_iter.get("encoding", "json")
+            return {"fileEncoding": encoding}, file_extension(encoding)
+
+        external_file = data_iter["data"]
+        try:
+            return external_file, file_extension(external_file["fileEncoding"])
+        except ValueError:
+            #files of encodings unknown to this version are copied as well
+            return external_file, os.path.splitext(external_file["relativeFilePath"])[1]
+
+
+    def __write_external_data(self, data_iter: dict, external_file: dict, is_loaded: bool, hashing_writer: _HashingWriter,
+            json_pool: Optional["Executor"]) -> dict:
+        """serialize loaded data or copy the file of data that is not loaded, returns the binary layout of loaded data"""
+
+        with stage("write_external", channel=data_iter.get("name"), encoding=external_file["fileEncoding"], copy=not is_loaded) as write_stage:
+            if is_loaded:
+                binary_layout = _serialize_data(data_iter["data"], external_file["fileEncoding"], data_iter.get("filters", []), hashing_writer, json_pool)
+                write_stage.add_bytes(hashing_writer.nbytes)
+                return binary_layout
+
+            #the file is copied as it is, which also works if it is replaced by itself
+            source_filename = os.path.join(self.base_filepath, data_iter["data"]["relativeFilePath"])
+            with open(source_filename, mode='rb', buffering=0) as source_file:
+                while chunk := source_file.read(_IO_BUFFER_SIZE):
+                    hashing_writer.write(chunk)
+            write_stage.add_bytes(hashing_writer.nbytes)
+            if self.verify_checksums is not False and hashing_writer.file_hash.hexdigest() != external_file["md5"]:
+                raise RuntimeError(f"calculated md5 checksum of {source_filename} is different from the specified one")
+            return {}
+
+    @staticmethod
+    def __binary_layout(external_file: dict, file_size: int, filename: str):
+        """return dtype and shape of a typed binary file and check them against the file size"""
+
+        numpy = _import_numpy()
+        dtype = numpy.dtype(external_file["dtype"])
+        shape = tuple(external_file.get("shape", [file_size // dtype.itemsize]))
+
+        if file_size != dtype.itemsize * int(numpy.prod(shape)):
+            raise RuntimeError(f"size of {filename} does not match dtype {dtype.str} and shape {list(shape)}")
+
+        return dtype, shape
+
+    @staticmethod
+    def __decode_binary(buffer: bytearray, external_file: dict, filename: str):
+        """interpret the content of a binary file according to its dtype/shape description"""
+
+        if "dtype" not in external_file:
+            return bytes(buffer)
+
+        numpy = _import_numpy()
+        dtype, shape = MeasurementRecord.__binary_layout(external_file, len(buffer), filename)
+
+        #the array is a view on the buffer, no copy is made
+        return numpy.frombuffer(buffer, dtype=dtype).reshape(shape)
+
+    @staticmethod
+    def __decode_stream(file, file_hash, external_file: dict, filename: str):
+        """read, decompress and unfilter an external file piece by piece into the buffer of the data"""
+
+        def chunks():
+            while chunk := file.read(_IO_BUFFER_SIZE):
+                if file_hash is not None:
+                    file_hash.update(chunk)
+                yield chunk
+
+        base_encoding, compression = split_encoding(external_file["fileEncoding"])
+        pieces = decompress(chunks(), compression, filename)
+        filters = external_file.get("filters", [])
+
+        if base_encoding == "json" or "dtype" not in external_file:
+            if filters:
+                raise RuntimeError(f"Filters of {filename} can only be applied to typed binary data")
+            buffer = bytearray()
+            for piece in pieces:
+                buffer += piece
+            return get_json_backend().loads(buffer) if base_encoding == "json" else bytes(buffer)
+
+        numpy = _import_numpy()
+        dtype = numpy.dtype(external_file["dtype"])
+        try:
+            if "shape" in external_file:
+                #the size is known, so the pieces are written to their final position in the buffer
+                target = FilteredBuffer(dtype.itemsize * int(numpy.prod(external_file["shape"])), dtype, filters)
+                for piece in pieces:
+                    target.write(piece)
+            else:
+                buffer = bytearray()
+                for piece in pieces:
+                    buffer += piece
+                target = FilteredBuffer(len(buffer), dtype, filters)
+                target.write(buffer)
+            buffer = target.finish()
+        except ValueError:
+            raise RuntimeError(f"size of {filename} does not match dtype {dtype.str} and shape {external_file.get('shape')}") from None
+        return MeasurementRecord.__decode_binary(buffer, external_file, filename)
+
+    @staticmethod
+    def __map_binary(external_file: dict, filename: str):
+        """map a binary file read-only into memory so that only accessed pages are read"""
+
+        file_size = os.path.getsize(filename)
+
+        if "dtype" not in external_file:
+            if file_size == 0:
+                return memoryview(b"")
+            with open(filename, mode='rb') as file:
+                #the mapping stays valid after the file is closed
+                return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+        numpy = _import_numpy()
+        dtype, shape = MeasurementRecord.__binary_layout(external_file, file_size, filename)
+
+        if file_size == 0:
+            #empty files can not be mapped
+            return numpy.empty(shape, dtype=dtype)
+        return numpy.memmap(filename, dtype=dtype, mode='r', shape=shape)
 
     @staticmethod
     def __read_inplace(data: dict):
         return data["items"]
 
+    def __get_window(self, data_iter: dict, start: Optional[int], stop: Optional[int]):
+        """return the samples [start:stop] of a sampling grid or data channel, reading as little as possible"""
+
+        if self.__is_data_loaded(data_iter):
+            return data_iter["data"][start:stop]
+
+        external_file = data_iter["data"]
+        if data_iter["storageType"] != "externalFile" or not _is_raw_binary(external_file) or "dtype" not in external_file:
+            self.__load_data(data_iter)
+            return data_iter["data"][start:stop]
+
+        #seek to the first requested row of the typed binary file and read only the window
+        numpy = _import_numpy()
+        filename = os.path.join(self.base_filepath, external_file["relativeFilePath"])
+        with open(filename, mode='rb', buffering=0) as file:
+            dtype, shape = self.__binary_layout(external_file, os.fstat(file.fileno()).st_size, filename)
+            if not shape:
+                raise ValueError(f"Binary data of '{data_iter.get('name')}' is a scalar and can not be sliced")
+            start, stop, _ = slice(start, stop).indices(shape[0])
+            stop = max(start, stop)
+            row_size = dtype.itemsize * int(numpy.prod(shape[1:]))
+            file.seek(start * row_size)
+            buffer = _read_file(file, size=(stop - start) * row_size)
+        return numpy.frombuffer(buffer, dtype=dtype).reshape((stop - start, *shape[1:]))
+
+    async def __aload_data(self, data_iter: dict) -> None:
+        """load data that is not loaded yet in the default executor, concurrent calls for the same data wait for the same future"""
+        import asyncio
+
+        if self.__is_data_loaded(data_iter):
+            return
+        future = self._loading.get(id(data_iter))
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(None, self.__load_data, data_iter)
+            self._loading[id(data_iter)] = future
+            future.add_done_callback(lambda _: self._loading.pop(id(data_iter), None))
+        #a cancelled caller does not cancel the loading for the others
+        await asyncio.shield(future)
+
+    def __load_data(self, data_iter: dict) -> None:
+        if data_iter["storageType"] == "inplace":
+            self.__load_inplace_data(data_iter)
+        else:
+            self.__load_external_data(data_iter)
+
+    def __load_inplace_data(self, data_iter: dict) -> None:
+        """replace inplace data whose items were skipped by from_filename(load='header') with its items"""
+
+        internal_data = data_iter["data"]
+        with stage("load_inplace", channel=data_iter.get("name"), path=internal_data["items"].filename) as load_stage:
+            items = internal_data["items"].load()
+            load_stage.add_bytes(internal_data["items"].end - internal_data["items"].start)
+        if self.validation_mode != "header":
+            _check_items(data_iter.get("name"), {**internal_data, "items": items}, check_items=True)
+        data_iter["data"] = items
+        if self._update_filepath is not None:
+            self._loaded_data[id(data_iter)] = (internal_data, items)
+
+    def __with_cached_data(self, data_iter: dict) -> dict:
+        """return a copy of a sampling grid or data channel with the data of its external file from the channel cache"""
+
+        if self.__is_data_loaded(data_iter):
+            return data_iter
+        if data_iter["storageType"] != "externalFile":
+            #deferred items are part of the main file
+            self.__load_data(data_iter)
+            return data_iter
+
+        external_file = data_iter["data"]
+        key = self.channel_cache.key_of(os.path.join(self.base_filepath, external_file["relativeFilePath"]), external_file.get("md5"))
+        data = self.channel_cache.get(key)
+        if data is None:
+            data, checksum_check = self.__read_from_external_file(external_file, self.base_filepath, self.memory_map, self.verify_checksums,
+                data_iter.get("name"), self.checksum_cache)
+            if checksum_check is not None:
+                self._pending_checksums.append(checksum_check)
+            #raw binary files are read as fast as .npy files of the on-disk cache
+            self.channel_cache.put(key, data, persist=not _is_raw_binary(external_file))
+
+        cached = dict(data_iter, data=data)
+        cached.setdefault("encoding", external_file["fileEncoding"])
+        if external_file.get("filters"):
+            cached.setdefault("filters", external_file["filters"])
+        return cached
+
+    def __load_external_data(self, data_iter: dict) -> None:
+        """replace the external file description of a sampling grid or data channel with its data"""
+
+        external_file = data_iter["data"]
+        data, checksum_check = self.__read_from_external_file(external_file, self.base_filepath, self.memory_map, self.verify_checksums,
+            data_iter.get("name"), self.checksum_cache)
+        if checksum_check is not None:
+            self._pending_checksums.append(checksum_check)
+
+        #write() keeps the encoding of the file unless it was changed
+        data_iter.setdefault("encoding", external_file["fileEncoding"])
+        if external_file.get("filters"):
+            data_iter.setdefault("filters", external_file["filters"])
+        data_iter["data"] = data
+        if self._update_filepath is not None:
+            self._loaded_data[id(data_iter)] = (external_file, data)
+
     @staticmethod
-    def __read_from_external_file(external_file: dict, base_dir: str):
-        """read data from external file with absolute path given by base_dir"""
+    def __read_from_external_file(external_file: dict, base_dir: str, memory_map=False, verify_checksums=None,
+            name: Optional[str] = None, checksum_cache: Optional["ChecksumCache"] = None) -> Tuple[object, Optional["Future"]]:
+        """
+        read data from external file with absolute path given by base_dir
+
+        Returns the data and, if the checksum is verified in the background, the future of the checksum check.
+        Data that is verified in the background must not be modified before the check is done.
+        The name of the sampling grid or data channel is only reported to the observers of the stages.
+        Files that are unchanged since the checksum cache verified them are not hashed.
+        """
 
         md5_checksum_valid = external_file["md5"]
         file_encoding = external_file["fileEncoding"]
         relative_filepath = external_file["relativeFilePath"]
         
         filename = os.path.join(base_dir, relative_filepath)
+        mapped = memory_map and _is_raw_binary(external_file)
+        if verify_checksums is None:
+            verify_checksums = "background" if mapped else True
+        background = verify_checksums == "background"
+        checksum_check = None
+
+        try:
+            base_encoding, compression = split_encoding(file_encoding)
+        except ValueError:
+            raise RuntimeError(f"Unkown encoding {file_encoding}") from None
+
+        #the stat is taken before the file is read, so a file that is modified meanwhile is not added to the cache
+        stat = None
+        if checksum_cache is not None and verify_checksums:
+            stat = os.stat(filename)
+            if checksum_cache.verified_md5(filename, stat) == md5_checksum_valid:
+                verify_checksums = False
+                background = False
+
+        with stage("read_external", channel=name, path=filename, encoding=file_encoding) as external_stage:
+            if mapped:
+                #mapped pages are only read on access so the checksum needs its own pass over the file
+                if background:
+                    checksum_check = _get_checksum_executor().submit(_check_md5, filename, md5_checksum_valid, None, checksum_cache, stat)
+                elif verify_checksums:
+                    with stage("checksum", path=filename):
+                        _check_md5(filename, md5_checksum_valid, None, checksum_cache, stat)
+                external_stage.set("memory_map", True)
+                return MeasurementRecord.__map_binary(external_file, filename), checksum_check
+
+            if compression is not None or external_file.get("filters"):
+                #decompress and reverse the filters while the file is read, the checksum is computed from the stored bytes
+                with open(filename, mode='rb', buffering=0) as file:
+                    file_hash = hashlib.md5() if verify_checksums and not background else None
+                    with stage("read", path=filename) as read_stage:
+                        data = MeasurementRecord.__decode_stream(file, file_hash, external_file, filename)
+                        read_stage.add_bytes(file.tell())
+                    external_stage.add_bytes(file.tell())
+
+                if file_hash is not None and file_hash.hexdigest() != md5_checksum_valid:
+                    raise RuntimeError(f"calculated md5 checksum of {filename} is different from the specified one")
+                if file_hash is not None and checksum_cache is not None:
+                    checksum_cache.add(filename, md5_checksum_valid, stat)
+                if background:
+                    checksum_check = _get_checksum_executor().submit(_check_md5, filename, md5_checksum_valid, None, checksum_cache, stat)
+                return data, checksum_check
+
+            #read the file once and hash the chunks on the way unless the check runs in the background,
+            #while stages are observed the buffer is hashed after reading so that both are timed separately
+            profiling = is_enabled()
+            with open(filename, mode='rb', buffering=0) as file:
+                file_hash = hashlib.md5() if verify_checksums and not background else None
+                with stage("read", path=filename) as read_stage:
+                    buffer = _read_file(file, None if profiling else file_hash)
+                    read_stage.add_bytes(len(buffer))
+                external_stage.add_bytes(len(buffer))
+            if profiling and file_hash is not None:
+                with stage("checksum", path=filename):
+                    file_hash.update(buffer)
+
+            if file_hash is not None and file_hash.hexdigest() != md5_checksum_valid:
+                raise RuntimeError(f"calculated md5 checksum of {filename} is different from the specified one")
+            if file_hash is not None and checksum_cache is not None:
+                checksum_cache.add(filename, md5_checksum_valid, stat)
+
+            if background:
+                checksum_check = _get_checksum_executor().submit(_check_md5, filename, md5_checksum_valid, buffer, checksum_cache, stat)
+
+            with stage("decode", path=filename, encoding=file_encoding):
+                if file_encoding == "json":
+                    data = get_json_backend().loads(buffer)
+                else:
+                    data = MeasurementRecord.__decode_binary(buffer, external_file, filename)
+
+            return data, checksum_check
 
-        #read back in binary mode for md5 hash
-        with open(filename, mode='rb') as file:
-            file_hash = hashlib.md5()
-            while chunk := file.read(8192):
-                file_hash.update(chunk)
+    @staticmethod
+    def __is_data_loaded(data: dict) -> bool:
+        #data is an external file description or inplace data whose items were deferred by from_filename(load='header')
+        return not isinstance(data["data"], dict)
+        
 
-        md5_checksum_actual = file_hash.hexdigest()
+class _ExternalFileAppender:
+    """appends chunks of data to an external file and hashes them on the way"""
+
+    def __init__(self, filepath: str, encoding: str):
+        self.base_encoding, compression = split_encoding(encoding)
+        self.encoding = encoding
+        self.length = 0
+        self.binary_layout = None
+        self.file = open(filepath, mode='wb', buffering=_IO_BUFFER_SIZE)
+        self.hashing_writer = _HashingWriter(self.file)
+        self.writer = self.hashing_writer if compression is None else CompressingWriter(self.hashing_writer, compression)
+        if self.base_encoding == "json":
+            self.writer.write(b"[")
+
+    def append(self, chunk) -> None:
+        """append the items of chunk to the file"""
+
+        if self.base_encoding == "json":
+            if len(chunk) == 0:
+                return
+            #write the items without the enclosing brackets of the list, numpy arrays are encoded by the backend
+            separator = b"," if self.length else b""
+            self.writer.write(separator + get_json_backend().dumps(chunk)[1:-1])
+            self.length += len(chunk)
+            return
+
+        buffer, binary_layout = _encode_binary(chunk)
+        if self.length == 0:
+            self.binary_layout = {**binary_layout, "shape": [0, *binary_layout["shape"][1:]]} if binary_layout else {}
+        if binary_layout:
+            if not binary_layout["shape"]:
+                raise ValueError("Chunks of typed binary data must have at least one dimension")
+            if binary_layout["dtype"] != self.binary_layout.get("dtype") or binary_layout["shape"][1:] != self.binary_layout["shape"][1:]:
+                raise ValueError(f"Chunk of dtype {binary_layout['dtype']} and shape {binary_layout['shape']} does not match the previous chunks")
+            self.binary_layout["shape"][0] += binary_layout["shape"][0]
+        elif self.binary_layout:
+            raise ValueError("Untyped bytes can not be appended to typed binary data")
+
+        self.writer.write(buffer)
+        self.length += len(buffer)
+
+    def close(self) -> Tuple[str, dict]:
+        """finish the file and return its md5 checksum and the dtype/shape description of typed binary data"""
+
+        if self.base_encoding == "json":
+            self.writer.write(b"]")
+        self.writer.close()
+        self.file.close()
+        return self.hashing_writer.file_hash.hexdigest(), self.binary_layout or {}
+
+
+class MeasurementRecordStream:
+    """
+    incremental writer of a MeasurementRecord returned by MeasurementRecord.open_stream
+
+    Chunks of sampling grids and data channels with storageType 'externalFile' are written to their files as they are
+    appended, so memory usage is bounded by the chunk size. Chunks of inplace data are collected in memory.
+    The main JSON file is written by close() or at the end of a with block.
+    """
+
+    def __init__(self, record: MeasurementRecord, filepath: str, validate="structure"):
+        self.record = record
+        self.filepath = filepath
+        self.validate = validate
+        self.closed = False
+
+        base_dir = os.path.dirname(filepath)
+        filename = os.path.splitext(os.path.basename(filepath))[0]
+        self._rel_ext_filepath = os.path.join(record.rel_ext_filepath, filename)
+        ext_file_dir = os.path.join(base_dir, self._rel_ext_filepath)
+
+        #sampling grids can be addressed by index and by name if the name is unique
+        grid_names = [sampling_grid.get("name") for sampling_grid in record.sampling_grids]
+        self._targets = dict(enumerate(record.sampling_grids))
+        for sampling_grid, name in zip(record.sampling_grids, grid_names):
+            if grid_names.count(name) == 1:
+                self._targets[name] = sampling_grid
+        for data_channel in record.data_channels:
+            self._targets[data_channel["name"]] = data_channel
+
+        self._appenders = {}
+        self._inplace_items = {}
+        try:
+            for data_iter in itertools.chain(record.sampling_grids, record.data_channels):
+                data = data_iter["data"]
+                if isinstance(data, dict):
+                    raise ValueError(f"The data of '{data_iter.get('name')}' is not loaded and can not be streamed")
+                if data_iter.get("filters"):
+                    raise ValueError(f"The filters of '{data_iter.get('name')}' need all data and can not be streamed")
+
+                if data_iter["storageType"] == "inplace":
+                    self._inplace_items[id(data_iter)] = []
+                elif data_iter["storageType"] == "externalFile":
+                    encoding = data_iter.get("encoding", "json")
+                    if not os.path.exists(ext_file_dir):
+                        os.makedirs(ext_file_dir)
+                    ext_filepath = os.path.join(ext_file_dir, data_iter["name"] + file_extension(encoding))
+                    self._appenders[id(data_iter)] = _ExternalFileAppender(ext_filepath, encoding)
+                else:
+                    raise ValueError()
+
+                if len(data):
+                    self.__append_to(data_iter, data)
+        except BaseException:
+            self.__close_files()
+            raise
+
+    def __enter__(self) -> "MeasurementRecordStream":
+        return self
 
-        if md5_checksum_actual != md5_checksum_valid:
-            raise RuntimeError(f"calculated md5 checksum of {filename} is different from the specified one")
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            #keep the record as it was and do not write an incomplete main file
+            self.__close_files()
+            self.closed = True
 
-        if file_encoding == "json":
-            with open(filename, mode='rt', encoding='utf-8') as file:
-                data = json.load(file)
-        elif file_encoding == "bin":
-            with open(filename, mode='rb') as file:
-                data = file.read()
+    def append(self, name: Union[str, int], chunk) -> None:
+        """
+        append a chunk of data
+
+        :param name: name of a data channel or sampling grid or the index of a sampling grid
+        :param chunk: list, numpy array, array.array or bytes like the data passed to add_data_channel
+        """
+
+        if self.closed:
+            raise ValueError("The stream is already closed")
+        if name not in self._targets:
+            raise ValueError(f"No data channel or sampling grid with name: '{name}' found")
+        self.__append_to(self._targets[name], chunk)
+
+    def close(self) -> None:
+        """finish all external files, write the main JSON file and let the record refer to the written files"""
+
+        if self.closed:
+            return
+        self.closed = True
+
+        descriptions = {}
+        for data_iter in itertools.chain(self.record.sampling_grids, self.record.data_channels):
+            if data_iter["storageType"] == "inplace":
+                items = self._inplace_items[id(data_iter)]
+                descriptions[id(data_iter)] = {"length": len(items), "items": items}
+            else:
+                appender = self._appenders.pop(id(data_iter))
+                md5_checksum, binary_layout = appender.close()
+                descriptions[id(data_iter)] = {
+                    "relativeFilePath": os.path.join(self._rel_ext_filepath, data_iter["name"] + file_extension(appender.encoding)),
+                    "md5": md5_checksum,
+                    "fileEncoding": appender.encoding,
+                    **binary_layout
+                }
+
+        def described(data_iter):
+            description = {key: value for key, value in data_iter.items() if key not in ("encoding", "filters") or data_iter["storageType"] == "inplace"}
+            description["data"] = descriptions[id(data_iter)]
+            return description
+
+        file_dict = {
+            "$schema": self.record.json_validator.schema["$id"],
+            "header": self.record.header,
+            "data": {
+                "samplingGrids": [described(sampling_grid) for sampling_grid in self.record.sampling_grids],
+                "dataChannels": [described(data_channel) for data_channel in self.record.data_channels]
+            }
+        }
+        self.record.validate_file_dict(file_dict, self.validate)
+        _dump_main_file(file_dict, self.filepath)
+
+        #the record now describes the written files like a lazily loaded one
+        self.record.base_filepath = os.path.dirname(os.path.abspath(self.filepath))
+        for data_iter in itertools.chain(self.record.sampling_grids, self.record.data_channels):
+            description = descriptions[id(data_iter)]
+            if data_iter["storageType"] == "inplace":
+                data_iter["data"] = description["items"]
+            else:
+                data_iter.pop("encoding", None)
+                data_iter["data"] = description
+
+    def __append_to(self, data_iter: dict, chunk) -> None:
+        if data_iter["storageType"] == "inplace":
+            self._inplace_items[id(data_iter)].extend(chunk.tolist() if hasattr(chunk, "tolist") else chunk)
         else:
-            raise RuntimeError(f"Unkown encoding {file_encoding}")
-        
-        return data
+            self._appenders[id(data_iter)].append(chunk)
 
-    @staticmethod
-    def __is_data_loaded(data: dict) -> bool:
-        if data["storageType"] == "externalFile":
-            if "relativeFilePath" in data["data"]:
-                return False
-        return True
-        
\ No newline at end of file
+    def __close_files(self) -> None:
+        for appender in self._appenders.values():
+            appender.file.close()
+        self._appenders = {}
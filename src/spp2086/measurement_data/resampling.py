@@ -0,0 +1,178 @@
+"""Vectorized resampling of channels onto other sampling grids and decimation with anti-aliasing filters"""
+from typing import Optional
+import array
+
+from .measurement_record import _import_numpy
+
+#interpolation methods of resample
+RESAMPLING_METHODS = ("linear", "nearest", "zoh")
+
+#number of target points or output samples that are computed at once, memory mapped data is only read chunk by chunk
+_CHUNK_SIZE = 1 << 18
+
+#number of items gathered at once for filtering, which limits the memory of long filters
+_GATHER_ITEMS = 1 << 22
+
+
+def as_array(data, name: str = "data") -> "numpy.ndarray":
+    """
+    return the items of a sampling grid or data channel as numpy array without copying typed data
+
+    Scalar items give 1-dimensional arrays and numeric tuples 2-dimensional arrays with one column per element.
+    """
+
+    numpy = _import_numpy()
+    if isinstance(data, numpy.ndarray):
+        values = data
+    elif isinstance(data, array.array):
+        values = numpy.frombuffer(data, dtype=data.typecode)
+    elif isinstance(data, (bytes, bytearray, memoryview)):
+        raise ValueError(f"Untyped binary data of '{name}' can not be resampled")
+    else:
+        values = numpy.asarray(data)
+
+    if values.ndim not in (1, 2) or values.dtype.kind not in "biufc":
+        raise ValueError(f"Items of '{name}' must be numbers or numeric tuples of the same length")
+    return values
+
+
+def fir_lowpass(cutoff: float, numtaps: Optional[int] = None) -> "numpy.ndarray":
+    """
+    return the taps of a linear phase FIR lowpass filter designed with a Hamming window
+
+    :param cutoff: cutoff frequency relative to the Nyquist frequency, between 0 and 1
+    :param numtaps: odd number of taps, by default 8 per 1/cutoff which damps aliases by more than 40 dB
+    """
+
+    numpy = _import_numpy()
+    if not 0 < cutoff <= 1:
+        raise ValueError(f"Cutoff {cutoff} must be within (0, 1]")
+    if numtaps is None:
+        numtaps = 8 * int(numpy.ceil(1 / cutoff)) + 1
+    if numtaps < 1 or numtaps % 2 == 0:
+        raise ValueError(f"Number of taps {numtaps} must be odd")
+
+    n = numpy.arange(numtaps) - (numtaps - 1) / 2
+    taps = cutoff * numpy.sinc(cutoff * n) * numpy.hamming(numtaps)
+    return taps / taps.sum()
+
+
+def _filtered_at(values: "numpy.ndarray", taps: Optional["numpy.ndarray"], indices: "numpy.ndarray") -> "numpy.ndarray":
+    """
+    return the values at the increasing indices filtered by taps, only the samples within reach of the filter are read
+
+    The signal is continued with its first and last value beyond its ends.
+    """
+
+    numpy = _import_numpy()
+    if taps is None:
+        lower = int(indices[0]) if len(indices) else 0
+        upper = int(indices[-1]) + 1 if len(indices) else 0
+        return numpy.asarray(values[lower:upper])[indices - lower]
+
+    half = len(taps) // 2
+    offsets = numpy.arange(-half, half + 1)
+    result = numpy.empty((len(indices),) + values.shape[1:], dtype=numpy.result_type(values.dtype, taps.dtype))
+    #the gathered windows of a piece take about _GATHER_ITEMS items
+    piece_size = max(1, _GATHER_ITEMS // len(taps))
+    for start in range(0, len(indices), piece_size):
+        piece = indices[start:start + piece_size]
+        lower, upper = max(int(piece[0]) - half, 0), min(int(piece[-1]) + half + 1, len(values))
+        window = numpy.asarray(values[lower:upper])
+        positions = numpy.clip(piece[:, None] + offsets, 0, len(values) - 1) - lower
+        result[start:start + piece_size] = numpy.tensordot(window[positions], taps, axes=([1], [0]))
+    return result
+
+
+def decimate(values, factor: int, numtaps: Optional[int] = None, chunk_size: int = _CHUNK_SIZE) -> "numpy.ndarray":
+    """
+    keep every factor-th sample after removing the frequencies above the new Nyquist frequency
+
+    Only the kept samples are filtered, chunk by chunk, so memory mapped data is read sequentially.
+
+    :param values: items of scalars or numeric tuples
+    :param factor: ratio of the sampling rates before and after
+    :param numtaps: number of taps of the anti-aliasing filter, see fir_lowpass
+    """
+
+    numpy = _import_numpy()
+    values = as_array(values)
+    if factor < 1:
+        raise ValueError(f"Decimation factor {factor} must be a positive integer")
+    taps = fir_lowpass(1 / factor, numtaps) if factor > 1 else None
+
+    n_out = -(-len(values) // factor)
+    result = numpy.empty((n_out,) + values.shape[1:], dtype=numpy.result_type(values.dtype, numpy.float64))
+    for out_start in range(0, n_out, chunk_size):
+        out_stop = min(out_start + chunk_size, n_out)
+        result[out_start:out_stop] = _filtered_at(values, taps, numpy.arange(out_start, out_stop) * factor)
+    return result
+
+
+def resample(grid, values, target, method="linear", anti_aliasing=True, chunk_size: int = _CHUNK_SIZE) -> "numpy.ndarray":
+    """
+    return the values sampled over grid at the points of target
+
+    The points of target are processed in chunks and only the part of grid and values they cover is read,
+    so memory mapped channels can be resampled without loading them. Points outside the grid are NaN.
+
+    :param grid: monotonically increasing scalar sampling grid
+    :param values: items of scalars or numeric tuples, one per point of grid
+    :param target: monotonically increasing points to sample at
+    :param method: 'linear' to interpolate linearly, 'nearest' for the value of the nearest point or
+        'zoh' (zero-order hold) for the value of the last point at or before the target point
+    :param anti_aliasing: lowpass filter the values first if target is sampled more coarsely than grid,
+        the average spacings of the points decide
+    :return: float64 or complex128 array with the shape of values apart from the length of target
+    """
+
+    numpy = _import_numpy()
+    if method not in RESAMPLING_METHODS:
+        raise ValueError(f"Unsupported method '{method}', use one of {RESAMPLING_METHODS}")
+    grid = as_array(grid, "grid")
+    values = as_array(values, "values")
+    target = numpy.asarray(as_array(target, "target"), dtype=numpy.float64)
+    if grid.ndim != 1 or target.ndim != 1:
+        raise ValueError("Only sampling grids of scalars can be resampled")
+    if len(grid) != len(values):
+        raise ValueError(f"The grid has {len(grid)} points but there are {len(values)} values")
+
+    result = numpy.full((len(target),) + values.shape[1:], numpy.nan, dtype=numpy.result_type(values.dtype, numpy.float64))
+    if len(grid) == 0 or len(target) == 0:
+        return result
+
+    taps = None
+    if anti_aliasing and len(grid) > 1 and len(target) > 1:
+        grid_spacing = (float(grid[-1]) - float(grid[0])) / (len(grid) - 1)
+        target_spacing = (target[-1] - target[0]) / (len(target) - 1)
+        if 0 < grid_spacing < target_spacing:
+            taps = fir_lowpass(grid_spacing / target_spacing)
+
+    first, last = float(grid[0]), float(grid[-1])
+    for start in range(0, len(target), chunk_size):
+        points = target[start:start + chunk_size]
+        inside = (points >= first) & (points <= last)
+        if not inside.any():
+            continue
+        points = points[inside]
+        #the grid points enclosing this chunk
+        lower = max(int(numpy.searchsorted(grid, points[0], side="right")) - 1, 0)
+        upper = min(int(numpy.searchsorted(grid, points[-1], side="left")) + 1, len(grid))
+        grid_chunk = numpy.asarray(grid[lower:upper], dtype=numpy.float64)
+
+        #index of the last grid point at or before each point, only the values at these points are read and filtered
+        before = numpy.clip(numpy.searchsorted(grid_chunk, points, side="right") - 1, 0, len(grid_chunk) - 1)
+        after = numpy.minimum(before + 1, len(grid_chunk) - 1)
+        if method == "zoh":
+            chunk = _filtered_at(values, taps, lower + before)
+        else:
+            span = grid_chunk[after] - grid_chunk[before]
+            with numpy.errstate(invalid="ignore", divide="ignore"):
+                weight = numpy.where(span > 0, (points - grid_chunk[before]) / span, 0.0)
+            if method == "nearest":
+                chunk = _filtered_at(values, taps, lower + numpy.where(weight > 0.5, after, before))
+            else:
+                weight = weight.reshape((-1,) + (1,) * (values.ndim - 1))
+                chunk = _filtered_at(values, taps, lower + before) * (1 - weight) + _filtered_at(values, taps, lower + after) * weight
+        result[start:start + chunk_size][inside] = chunk
+    return result
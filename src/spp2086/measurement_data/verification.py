@@ -0,0 +1,218 @@
+"""Verification of the external files of whole archives with a persistent cache of verified checksums"""
+from typing import Iterable, List, NamedTuple, Optional, Union
+import hashlib
+import os
+import threading
+import time
+
+from .content_store import _main_files
+from .json_scanner import scan_main_file
+
+#size of the chunks in which files are hashed
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+class ChecksumCache:
+    """
+    SQLite database of the md5 checksums of files that were verified, by path, size, modification time and inode
+
+    A file whose size, modification time and inode are unchanged since it was verified is not hashed again by
+    verify_archive() or by records opened with MeasurementRecord.from_filename(filename, checksum_cache=cache).
+    Changes of the content that keep all three, like silent corruption of the storage, are only found by
+    verify_archive(recheck=True). The database can be shared by the threads and processes of a machine.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: path of the SQLite database, it is created if it does not exist
+        """
+
+        #sqlite3 is imported here to keep the import of the package fast
+        import sqlite3
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS verified_files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+                "inode INTEGER, md5 TEXT, verified_at REAL)")
+
+    def __reduce__(self):
+        #worker processes of MeasurementRecord.load_many open the database again
+        return (type(self), (self.path,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM verified_files").fetchone()[0]
+
+    def __enter__(self) -> "ChecksumCache":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def verified_md5(self, filename: str, stat: Optional[os.stat_result] = None) -> Optional[str]:
+        """return the md5 checksum of the file if it was verified and is unchanged since, otherwise None"""
+
+        stat = stat or os.stat(filename)
+        with self._lock:
+            row = self._connection.execute("SELECT size, mtime_ns, inode, md5 FROM verified_files WHERE path = ?",
+                (os.path.abspath(filename),)).fetchone()
+        if row is None or tuple(row[:3]) != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            return None
+        return row[3]
+
+    def add(self, filename: str, md5: str, stat: os.stat_result) -> None:
+        """
+        add a file whose content matched the md5 checksum
+
+        :param stat: result of os.stat of the file taken before it was read, so a file that is modified while it is
+            hashed does not count as verified
+        """
+
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO verified_files VALUES (?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns, stat.st_ino, md5, time.time()))
+
+    def remove_missing(self) -> int:
+        """remove the entries of files that no longer exist and return their number"""
+
+        with self._lock:
+            paths = [row[0] for row in self._connection.execute("SELECT path FROM verified_files")]
+        missing = [(path,) for path in paths if not os.path.exists(path)]
+        with self._lock, self._connection:
+            self._connection.executemany("DELETE FROM verified_files WHERE path = ?", missing)
+        return len(missing)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class VerificationResult(NamedTuple):
+    """
+    result of checking one external file by verify_archive
+
+    status is 'verified' if the file was hashed and matched, 'cached' if it is unchanged since it was verified,
+    'mismatch' if its checksum differs, 'missing' if it does not exist, 'unverifiable' if the record specifies no md5
+    checksum for it or 'error' if it, the main file or the description of the data can not be read.
+    channel and external_file are None for main files that can not be read, external_file for invalid descriptions.
+    """
+    record: str
+    channel: Optional[str]
+    external_file: Optional[str]
+    status: str
+    error: Optional[str]
+
+
+def _md5_of(filename: str) -> str:
+    file_hash = hashlib.md5()
+    buffer = bytearray(_HASH_CHUNK_SIZE)
+    with open(filename, mode='rb', buffering=0) as file:
+        while n_read := file.readinto(buffer):
+            file_hash.update(memoryview(buffer)[:n_read])
+    return file_hash.hexdigest()
+
+
+def _verify_file(filename: str, md5: Optional[str], checksum_cache: Optional[ChecksumCache], recheck: bool):
+    """return the status and error of one external file, md5 is None if the record does not specify it"""
+
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return "missing", None
+    except OSError as err:
+        return "error", str(err)
+
+    if md5 is None:
+        return "unverifiable", "no md5 checksum is specified"
+    if checksum_cache is not None and not recheck and checksum_cache.verified_md5(filename, stat) == md5:
+        return "cached", None
+    try:
+        actual_md5 = _md5_of(filename)
+    except OSError as err:
+        return "error", str(err)
+    if actual_md5 != md5:
+        return "mismatch", f"calculated md5 checksum {actual_md5} is different from the specified one {md5}"
+    if checksum_cache is not None:
+        checksum_cache.add(filename, md5, stat)
+    return "verified", None
+
+
+def verify_archive(sources: Union[str, Iterable[str]], checksum_cache: Optional[ChecksumCache] = None, workers: Optional[int] = None,
+        recheck=False) -> List[VerificationResult]:
+    """
+    check the md5 checksums of the external files of all records
+
+    Only the descriptions of the data are read from the main files. Files that are referenced by several records,
+    like files of a content store, are hashed once. The files are hashed in a thread pool, as hashing and reading
+    release the interpreter lock.
+
+    :param sources: directory that is searched for records or the paths of their main files
+    :param checksum_cache: ChecksumCache whose unchanged files are skipped and to which verified files are added
+    :param workers: number of threads that hash files, by default the default of ThreadPoolExecutor
+    :param recheck: hash all files even if they are unchanged since they were verified, to find silent corruption
+    :return: one result per external file of each record in the order of the records, and one per unreadable main file
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    results = []
+    futures = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path in _main_files(sources, None):
+            try:
+                file_dict = scan_main_file(path)
+                data_iters = file_dict["data"]["samplingGrids"] + file_dict["data"]["dataChannels"]
+            except Exception as err:
+                results.append((path, None, None, None, ("error", f"main file can not be read: {err}")))
+                continue
+
+            base_dir = os.path.dirname(os.path.abspath(path))
+            for data_iter in data_iters:
+                #a malformed description only fails its own result
+                try:
+                    if data_iter.get("storageType") != "externalFile":
+                        continue
+                    ext_filepath = os.path.normpath(os.path.join(base_dir, data_iter["data"]["relativeFilePath"]))
+                    md5 = data_iter["data"].get("md5")
+                except (KeyError, TypeError, AttributeError) as err:
+                    name = data_iter.get("name") if isinstance(data_iter, dict) else None
+                    results.append((path, name, None, None, ("error", f"invalid description of the data: {err!r}")))
+                    continue
+                key = (ext_filepath, md5)
+                if key not in futures:
+                    futures[key] = pool.submit(_verify_file, ext_filepath, md5, checksum_cache, recheck)
+                results.append((path, data_iter.get("name"), ext_filepath, futures[key], None))
+
+        return [VerificationResult(path, name, ext_filepath, *(status if future is None else future.result()))
+            for path, name, ext_filepath, future, status in results]
+
+
+def main(argv=None) -> int:
+    """verify an archive from the command line, the exit status is 1 if a file is missing, damaged or unreadable"""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m spp2086.measurement_data verify", description="Verify the md5 checksums of the external files of all records in a directory")
+    parser.add_argument("directory")
+    parser.add_argument("--cache", help="SQLite database of verified checksums, unchanged files are skipped")
+    parser.add_argument("--workers", type=int, help="number of threads that hash files")
+    parser.add_argument("--recheck", action="store_true", help="hash unchanged files as well")
+    args = parser.parse_args(argv)
+
+    checksum_cache = ChecksumCache(args.cache) if args.cache else None
+    try:
+        results = verify_archive(args.directory, checksum_cache, args.workers, args.recheck)
+    finally:
+        if checksum_cache is not None:
+            checksum_cache.close()
+
+    failures = [result for result in results if result.status not in ("verified", "cached", "unverifiable")]
+    for result in failures:
+        print(f"{result.status}: {result.external_file or result.record} ({result.channel}) {result.error or ''}".rstrip())
+    statuses = [result.status for result in results]
+    print(", ".join(f"{statuses.count(status)} {status}" for status in ("verified", "cached", "unverifiable", "mismatch", "missing", "error")))
+    return 1 if failures else 0
+
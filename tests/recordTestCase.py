@@ -0,0 +1,60 @@
+import datetime
+import tempfile
+import unittest
+import spp2086.measurement_data
+
+
+class RecordTestCase(unittest.TestCase):
+    """base of the test cases, the tests of a class share the temporary directory _tempdir"""
+
+    @classmethod
+    def create_minimal_header(cls) -> dict:
+        tool_dict = {"id": "ID1"}
+        workpiece_dict = {"name": "test piece"}
+        parameters_list = []
+        process_dict = {
+            "processType": "test process",
+            "tool": tool_dict,
+            "workpiece": workpiece_dict,
+            "parameters": parameters_list
+        }
+
+        header_dict = {
+            "projectName": "test project",
+            "location": "nowhere",
+            "creationDate": str(datetime.date.today()),
+            "machine": {"name": "mockup machine"},
+            "process": process_dict
+        }
+
+        return header_dict
+
+    @classmethod
+    def create_record(cls, channels=("force", "inplace")) -> spp2086.measurement_data.MeasurementRecord:
+        """
+        return a record with an external sampling grid of 1000 samples and the given data channels
+
+        :param channels: names out of 'force' (external, json+gzip), 'speed' (external), 'position' (external tuples) and 'inplace'
+        """
+        channel_arguments = {
+            "force": ("N", [float(n) for n in range(1000)], {"storageType": "externalFile", "encoding": "json+gzip"}),
+            "speed": ("1/min", [float(n) for n in range(1000, 2000)], {"storageType": "externalFile"}),
+            "position": ("mm", [[n, 2*n] for n in range(1000)], {"storageType": "externalFile"}),
+            "inplace": ("1", list(range(1000)), {}),
+        }
+
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = cls.create_minimal_header()
+        record.add_sampling_grid("grid", "s", [0.1*n for n in range(1000)], storageType="externalFile")
+        for name in channels:
+            unit, data, kwargs = channel_arguments[name]
+            record.add_data_channel(name, unit, 0, data, **kwargs)
+        return record
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._tempdir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls._tempdir.cleanup()
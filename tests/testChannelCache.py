@@ -0,0 +1,86 @@
+import importlib.util
+import os
+import spp2086.measurement_data
+from recordTestCase import RecordTestCase
+
+
+class TestChannelCache(RecordTestCase):
+
+    def test_cache_hits_and_eviction(self):
+        filename = os.path.join(self._tempdir.name, "test_eviction", "record.json")
+        self.create_record(("force", "speed", "position", "inplace")).write(filename)
+
+        cache = spp2086.measurement_data.ChannelCache()
+        record = spp2086.measurement_data.MeasurementRecord.from_filename(filename, channel_cache=cache)
+        channel, sampling_grid = record.get_data_channel("force")
+        self.assertEqual(999.0, channel["data"][-1])
+        self.assertEqual("json+gzip", channel["encoding"])
+        #the record does not keep the data
+        self.assertIn("relativeFilePath", record.data_channels[0]["data"])
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+
+        #other records of the same file share the cached data
+        other_record = spp2086.measurement_data.MeasurementRecord.from_filename(filename, channel_cache=cache)
+        self.assertIs(channel["data"], other_record.get_data_channel("force")[0]["data"])
+        self.assertIs(sampling_grid["data"], other_record.get_sampling_grid(0)["data"])
+        self.assertEqual((3, 2), (cache.hits, cache.misses))
+        self.assertListEqual(list(range(1000)), other_record.get_data_channel("inplace")[0]["data"])
+
+        #the least recently used data is evicted and read again on the next request
+        cache.max_bytes = cache.nbytes + 1000
+        record.get_data_channel("speed")
+        self.assertEqual(1, cache.evictions)
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(999.0, record.get_data_channel("force")[0]["data"][-1])
+        self.assertEqual(2, cache.evictions)
+
+        #a modified file is read again
+        self.create_record(("force", "speed", "position", "inplace")).write(filename)
+        misses = cache.misses
+        record = spp2086.measurement_data.MeasurementRecord.from_filename(filename, channel_cache=cache)
+        record.get_data_channel("force")
+        self.assertEqual(misses + 2, cache.misses)
+
+    def test_disk_cache(self):
+        if importlib.util.find_spec("numpy") is None:
+            self.skipTest("numpy is required for this test")
+
+        filename = os.path.join(self._tempdir.name, "test_disk_cache", "record.json")
+        self.create_record(("force", "speed", "position", "inplace")).write(filename)
+        disk_dir = os.path.join(self._tempdir.name, "test_disk_cache", "cache")
+
+        record = spp2086.measurement_data.MeasurementRecord.from_filename(filename, channel_cache=spp2086.measurement_data.ChannelCache(disk_dir=disk_dir))
+        expected = record.get_data_channel("position")[0]["data"]
+        self.assertEqual(2, len(os.listdir(disk_dir)))
+        self.assertTrue(all(filename.endswith(".list.npy") for filename in os.listdir(disk_dir)))
+
+        #a new cache, for example of another process, reads the decoded data from disk
+        cache = spp2086.measurement_data.ChannelCache(disk_dir=disk_dir)
+        record = spp2086.measurement_data.MeasurementRecord.from_filename(filename, channel_cache=cache)
+        channel, sampling_grid = record.get_data_channel("position")
+        self.assertEqual((2, 0), (cache.disk_hits, cache.misses))
+        self.assertListEqual(expected, channel["data"])
+        self.assertIsInstance(sampling_grid["data"], list)
+
+    def test_disk_cache_item_types(self):
+        if importlib.util.find_spec("numpy") is None:
+            self.skipTest("numpy is required for this test")
+
+        filename = os.path.join(self._tempdir.name, "test_disk_cache_item_types", "record.json")
+        disk_dir = os.path.join(self._tempdir.name, "test_disk_cache_item_types", "cache")
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        record.add_sampling_grid("grid", "s", [0.0, 0.5, 1.0], storageType="externalFile")
+        record.add_data_channel("mixed", "N", 0, [1, 2.5, 3], storageType="externalFile")
+        record.add_data_channel("mixed_tuples", "mm", 0, [[1, 2], [3.5, 4], [5, 6]], storageType="externalFile")
+        record.add_data_channel("counter", "1", 0, [1, 2, 3], storageType="externalFile")
+        record.write(filename)
+
+        for cache in (spp2086.measurement_data.ChannelCache(disk_dir=disk_dir), spp2086.measurement_data.ChannelCache(disk_dir=disk_dir)):
+            record_loaded = spp2086.measurement_data.MeasurementRecord.from_filename(filename, channel_cache=cache)
+            for channel in record.data_channels:
+                data = record_loaded.get_data_channel(channel["name"])[0]["data"]
+                self.assertEqual(repr(channel["data"]), repr(data), channel["name"])
+        #the lists of mixed ints and floats are not kept on disk
+        self.assertEqual((2, 2), (cache.disk_hits, cache.misses))
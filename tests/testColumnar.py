@@ -0,0 +1,143 @@
+import os
+import spp2086.measurement_data
+from recordTestCase import RecordTestCase
+
+
+class TestColumnar(RecordTestCase):
+
+    def create_record(self, vc: float = 200) -> spp2086.measurement_data.MeasurementRecord:
+        import numpy as np
+
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        record.add_parameter("cutting speed", vc, "m/min", symbol="vc")
+        record.add_sampling_grid("time", "s", [0.1, 0.2, 0.3])
+        record.add_sampling_grid("position", "mm", np.arange(5, dtype=np.float32), storageType="externalFile", encoding="bin")
+        record.add_data_channel("Fc", "N", 0, [1.5, 2.5, 3.5])
+        record.add_data_channel("counter", "1", 1, np.arange(5, dtype=">i4"), storageType="externalFile", encoding="bin")
+        record.add_data_channel("Ff", "N", 0, [4, 5, 6], storageType="externalFile")
+        record.add_data_channel("xy", "mm", 1, np.arange(10, dtype=np.float64).reshape(5, 2), storageType="externalFile", encoding="bin")
+        return record
+
+    def assert_records_equal(self, record, record_imported):
+        import numpy as np
+
+        self.assertDictEqual(record.header, record_imported.header)
+        self.assertListEqual(record.get_data_channel_names(), record_imported.get_data_channel_names())
+        for data_iter, data_iter_imported in zip(record.sampling_grids + record.data_channels, record_imported.sampling_grids + record_imported.data_channels):
+            self.assertSetEqual(set(data_iter), set(data_iter_imported))
+            if isinstance(data_iter["data"], list):
+                self.assertListEqual(data_iter["data"], data_iter_imported["data"])
+            else:
+                self.assertIsInstance(data_iter_imported["data"], np.ndarray)
+                np.testing.assert_array_equal(data_iter["data"], data_iter_imported["data"])
+
+    def test_export_import_record(self):
+        try:
+            import numpy as np
+            import pyarrow
+        except ImportError:
+            self.skipTest("numpy and pyarrow are required for this test")
+
+        record = self.create_record()
+        for format in ("parquet", "arrow"):
+            target = os.path.join(self._tempdir.name, f"record_{format}")
+            paths = spp2086.measurement_data.export_record(record, target, format=format, chunk_rows=2)
+            self.assertListEqual([os.path.join(target, f"grid_{idx}.{format}") for idx in range(2)], paths)
+            self.assert_records_equal(record, spp2086.measurement_data.import_record(target))
+
+        #channels are columns and tuples are lists of a fixed size
+        table = pyarrow.ipc.open_file(pyarrow.memory_map(os.path.join(self._tempdir.name, "record_arrow", "grid_1.arrow"))).read_all()
+        self.assertListEqual(["position", "counter", "xy"], table.column_names)
+        self.assertEqual(pyarrow.list_(pyarrow.float64(), 2), table.schema.field("xy").type)
+
+        #an imported record can be written again
+        filename = os.path.join(self._tempdir.name, "imported.json")
+        spp2086.measurement_data.import_record(os.path.join(self._tempdir.name, "record_parquet")).write(filename)
+        self.assert_records_equal(record, spp2086.measurement_data.MeasurementRecord.from_filename(filename))
+
+        #exporting a record with fewer sampling grids again removes the tables of the others
+        fewer_grids = self.create_record()
+        del fewer_grids.sampling_grids[1]
+        fewer_grids.data_channels = [channel for channel in fewer_grids.data_channels if channel["samplingGridIndex"] == 0]
+        self.assertEqual(1, len(spp2086.measurement_data.export_record(fewer_grids, target)))
+        self.assertListEqual(["_header.json", "grid_0.arrow"], sorted(os.listdir(target)))
+        self.assert_records_equal(fewer_grids, spp2086.measurement_data.import_record(target))
+
+        self.assertRaises(ValueError, spp2086.measurement_data.export_record, record, target, format="csv")
+        record.add_data_channel("short", "1", 0, [1, 2])
+        self.assertRaises(ValueError, spp2086.measurement_data.export_record, record, target)
+
+        #a record without sampling grids keeps its header
+        record = self.create_record()
+        record.sampling_grids, record.data_channels = [], []
+        target = os.path.join(self._tempdir.name, "record_without_grids")
+        self.assertListEqual([], spp2086.measurement_data.export_record(record, target))
+        self.assert_records_equal(record, spp2086.measurement_data.import_record(target))
+        self.assertListEqual([(".", record.header)], [(record_id, imported.header) for record_id, imported in spp2086.measurement_data.import_records(target)])
+        self.assertRaises(ValueError, spp2086.measurement_data.import_record, self._tempdir.name)
+
+    def test_export_import_hdf5(self):
+        try:
+            import numpy as np
+            import h5py
+        except ImportError:
+            self.skipTest("numpy and h5py are required for this test")
+
+        record = self.create_record()
+        filename = os.path.join(self._tempdir.name, "record.h5")
+        spp2086.measurement_data.export_record(record, filename)
+        self.assert_records_equal(record, spp2086.measurement_data.import_record(filename))
+
+        #exporting a record with fewer sampling grids again removes the groups of the others
+        del record.sampling_grids[1]
+        record.data_channels = [channel for channel in record.data_channels if channel["samplingGridIndex"] == 0]
+        spp2086.measurement_data.export_record(record, filename)
+        self.assert_records_equal(record, spp2086.measurement_data.import_record(filename))
+
+        record.sampling_grids, record.data_channels = [], []
+        filename = os.path.join(self._tempdir.name, "record_without_grids.h5")
+        spp2086.measurement_data.export_record(record, filename)
+        self.assert_records_equal(record, spp2086.measurement_data.import_record(filename))
+
+    def test_export_archive(self):
+        try:
+            import numpy as np
+            import pyarrow.dataset
+        except ImportError:
+            self.skipTest("numpy and pyarrow are required for this test")
+
+        archive_dir = os.path.join(self._tempdir.name, "archive")
+        records = {}
+        for record_id, vc in (("a/run_1", 150), ("a/run_2", 250), ("b/run_3", 300)):
+            records[record_id] = self.create_record(vc)
+            #data channels may have the names of partition columns
+            records[record_id].add_data_channel("machine", "1", 0, [1, 2, 3])
+            filename = os.path.join(archive_dir, record_id + ".json")
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            records[record_id].write(filename)
+
+        target = os.path.join(self._tempdir.name, "archive_parquet")
+        self.assertListEqual(list(records), spp2086.measurement_data.export_records(archive_dir, target))
+
+        #the partition columns filter the tables of all records
+        dataset = pyarrow.dataset.dataset(target, format="parquet")
+        table = dataset.to_table(columns=["_partition.record", "Fc", "machine"],
+            filter=(pyarrow.dataset.field("_partition.parameters.vc") > 200) & pyarrow.dataset.field("Fc").is_valid())
+        self.assertListEqual(["a/run_2"] * 3 + ["b/run_3"] * 3, sorted(table.column("_partition.record").to_pylist()))
+        self.assertListEqual([1, 2, 3] * 2, table.column("machine").to_pylist())
+
+        imported = dict(spp2086.measurement_data.import_records(target))
+        self.assertListEqual(list(records), sorted(imported))
+        for record_id, record in records.items():
+            self.assert_records_equal(record, imported[record_id])
+
+        try:
+            import h5py
+        except ImportError:
+            return
+        filename = os.path.join(self._tempdir.name, "archive.h5")
+        spp2086.measurement_data.export_records([os.path.join(archive_dir, record_id + ".json") for record_id in records], filename)
+        imported = dict(spp2086.measurement_data.import_records(filename))
+        self.assertListEqual(list(records), sorted(imported))
+        self.assert_records_equal(records["b/run_3"], imported["b/run_3"])
@@ -0,0 +1,80 @@
+import os
+import unittest.mock
+import spp2086.measurement_data
+from spp2086.measurement_data import content_store
+from recordTestCase import RecordTestCase
+
+
+class TestContentStore(RecordTestCase):
+
+    def create_record(self, calibration: list) -> spp2086.measurement_data.MeasurementRecord:
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        record.add_sampling_grid("time", "s", [0.1, 0.2, 0.3], storageType="externalFile")
+        record.add_data_channel("calibration", "1", 0, calibration, storageType="externalFile", encoding="json+gzip")
+        record.add_data_channel("Fc", "N", 0, [1.5, 2.5, 3.5])
+        return record
+
+    def store_files(self) -> list:
+        return sorted(os.path.join(dir_path, filename) for dir_path, _, filenames in os.walk(self.store_dir) for filename in filenames)
+
+    def test_deduplication(self):
+        for record_idx, calibration in enumerate(([1, 2, 3], [1, 2, 3], [4, 5, 6])):
+            filename = os.path.join(self.archive_dir, f"run_{record_idx}", "record.json")
+            self.create_record(calibration).write(filename, content_store=self.store_dir)
+
+        #the shared time grid and calibration are stored once
+        self.assertEqual(3, len(self.store_files()))
+        record = spp2086.measurement_data.MeasurementRecord.from_filename(os.path.join(self.archive_dir, "run_1", "record.json"), lazy_loading=True)
+        self.assertTrue(record.data_channels[0]["data"]["contentHash"].startswith("blake2b:"))
+        self.assertTrue(record.data_channels[0]["data"]["relativeFilePath"].startswith(os.path.join("..", "store", "")))
+        self.assertListEqual([1, 2, 3], record.get_data_channel("calibration")[0]["data"])
+
+        #data that is not loaded is referenced without copying it
+        copy_filename = os.path.join(self.archive_dir, "copy", "record.json")
+        record = spp2086.measurement_data.MeasurementRecord.from_filename(os.path.join(self.archive_dir, "run_2", "record.json"), lazy_loading=True)
+        record.write(copy_filename, content_store=self.store_dir)
+        self.assertEqual(3, len(self.store_files()))
+        self.assertListEqual([4, 5, 6], spp2086.measurement_data.MeasurementRecord.from_filename(copy_filename).data_channels[0]["data"])
+
+        references = spp2086.measurement_data.count_references(self.store_dir, self.archive_dir)
+        self.assertListEqual([2, 2, 4], sorted(references.values()))
+
+        #the calibration of run_2 and its copy is removed once both records are gone
+        os.remove(copy_filename)
+        self.assertListEqual([], spp2086.measurement_data.collect_garbage(self.store_dir, self.archive_dir))
+        os.remove(os.path.join(self.archive_dir, "run_2", "record.json"))
+        self.assertEqual(1, len(spp2086.measurement_data.collect_garbage(self.store_dir, self.archive_dir, dry_run=True)))
+        removed = spp2086.measurement_data.collect_garbage(self.store_dir, self.archive_dir)
+        self.assertEqual(1, len(removed))
+        self.assertFalse(os.path.exists(removed[0]))
+        self.assertEqual(2, len(self.store_files()))
+
+        self.assertRaises(ValueError, self.create_record([1]).write, copy_filename, content_store=self.store_dir, content_hash="md5")
+
+    def test_duplicates_are_not_written(self):
+        store = content_store.ContentStore(self.store_dir)
+        for size_limit in (content_store._SPOOL_SIZE, 4):
+            with unittest.mock.patch.object(content_store, "_SPOOL_SIZE", size_limit):
+                for _ in range(2):
+                    with store.add(".bin") as entry:
+                        entry.file.write(b"content")
+                        entry.hash.update(b"content")
+                        part_files = [path for path in self.store_files() if path.endswith(".part")]
+                    #small content is only written if the store does not have it, larger content is written while it is hashed
+                    self.assertEqual(0 if size_limit > 4 else 1, len(part_files))
+                    with open(entry.path, mode='rb') as file:
+                        self.assertEqual(b"content", file.read())
+            self.assertListEqual([entry.path], self.store_files())
+            os.remove(entry.path)
+
+        #a failed write leaves nothing behind
+        with unittest.mock.patch.object(content_store, "_SPOOL_SIZE", 4):
+            with self.assertRaises(RuntimeError), store.add(".bin") as entry:
+                entry.file.write(b"content")
+                raise RuntimeError()
+        self.assertListEqual([], self.store_files())
+
+    def setUp(self) -> None:
+        self.archive_dir = os.path.join(self._tempdir.name, self._testMethodName, "archive")
+        self.store_dir = os.path.join(self.archive_dir, "store")
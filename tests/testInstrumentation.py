@@ -0,0 +1,66 @@
+import os
+import spp2086.measurement_data
+from recordTestCase import RecordTestCase
+from spp2086.measurement_data import instrumentation
+
+
+class TestInstrumentation(RecordTestCase):
+
+    def test_profile_load_and_write(self):
+        filename = os.path.join(self._tempdir.name, "profiled", "record.json")
+        with spp2086.measurement_data.RecordProfiler() as profiler:
+            self.create_record().write(filename)
+            record = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+        self.assertEqual(999.0, record.get_data_channel("force")[0]["data"][-1])
+
+        summary = profiler.summary()
+        for name in ("write", "write_external", "validate", "encode_main_file", "write_main_file", "from_filename",
+                "read_main_file", "parse", "read_external", "read", "checksum", "decode"):
+            self.assertIn(name, summary)
+        self.assertEqual(os.path.getsize(filename), summary["read_main_file"]["bytes"])
+        self.assertEqual(os.path.getsize(filename), summary["write_main_file"]["bytes"])
+        self.assertEqual(summary["write_external"]["bytes"], summary["read_external"]["bytes"])
+        self.assertEqual(2, summary["read_external"]["count"])
+
+        #bytes of each channel
+        by_channel = profiler.summary("channel")
+        self.assertEqual(1, by_channel[("read_external", "force")]["count"])
+        self.assertEqual(by_channel[("write_external", "force")]["bytes"], by_channel[("read_external", "force")]["bytes"])
+
+        #the stages of loading are children of from_filename
+        spans = profiler.to_dicts()
+        root_id = next(span["span_id"] for span in spans if span["name"] == "from_filename")
+        self.assertTrue(all(span["parent_id"] == root_id for span in spans if span["name"] in ("read_main_file", "parse", "read_external")))
+
+        otel_span = next(span for span in profiler.to_otel_spans() if span["name"] == "read_external" and span["attributes"]["spp2086.channel"] == "force")
+        self.assertEqual(16, len(otel_span["context"]["span_id"]))
+        self.assertGreaterEqual(otel_span["end_time"], otel_span["start_time"])
+        self.assertEqual("json+gzip", otel_span["attributes"]["spp2086.encoding"])
+        self.assertEqual({"status_code": "OK"}, otel_span["status"])
+
+        #nothing is observed outside of the block
+        spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+        self.assertEqual(len(spans), len(profiler.spans))
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertIs(instrumentation.stage("read"), instrumentation.stage("write"))
+
+    def test_parallel_write_and_errors(self):
+        filename = os.path.join(self._tempdir.name, "parallel", "record.json")
+        spans = []
+        spp2086.measurement_data.add_observer(spans.append)
+        try:
+            self.create_record().write(filename, workers=2)
+            #stages of the worker threads are children of the write stage
+            write_id = next(span.span_id for span in spans if span.name == "write")
+            self.assertTrue(all(span.parent_id == write_id for span in spans if span.name == "write_external"))
+
+            #the checksum is still verified while it is timed separately
+            record = spp2086.measurement_data.MeasurementRecord.from_filename(filename, lazy_loading=True)
+            with open(os.path.join(os.path.dirname(filename), record.sampling_grids[0]["data"]["relativeFilePath"]), mode='ab') as file:
+                file.write(b" ")
+            self.assertRaises(RuntimeError, record.get_data_channel, "force")
+            failed = [span for span in spans if span.error is not None]
+            self.assertListEqual(["read_external"], [span.name for span in failed])
+            self.assertEqual("grid", failed[0].attributes["channel"])
+        finally:
+            spp2086.measurement_data.remove_observer(spans.append)
@@ -0,0 +1,181 @@
+import json
+import math
+import os
+import unittest.mock
+import spp2086.measurement_data
+from spp2086.measurement_data import json_backend
+from recordTestCase import RecordTestCase
+
+
+class TestJsonBackend(RecordTestCase):
+
+    def create_record(self) -> spp2086.measurement_data.MeasurementRecord:
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        #non-ASCII characters and slashes are written as they are by all backends
+        record.header["projectName"] = "test project äöü"
+        record.header["location"] = "nowhere/somewhere"
+        record.add_parameter("cutting speed", 200.5, "m/min", symbol="vc")
+        record.add_sampling_grid("time", "s", [0.1, 0.2, 0.3])
+        record.add_data_channel("Fc", "N", 0, [1.5, -2.5e-12, 3])
+        record.add_data_channel("xy", "mm", 0, [[1, 2], [3, 4], [5, 6]])
+        record.add_data_channel("Ff", "N", 0, [4, 5, 6], storageType="externalFile")
+        return record
+
+    def installed_backends(self) -> list:
+        backends = []
+        for name in spp2086.measurement_data.JSON_BACKENDS:
+            try:
+                backends.append(spp2086.measurement_data.get_json_backend(name))
+            except ImportError:
+                pass
+        return backends
+
+    def test_backends_write_identical_files(self):
+        record = self.create_record()
+        for layout in spp2086.measurement_data.JSON_LAYOUTS:
+            contents = {}
+            for backend in self.installed_backends():
+                #the main files have the same name, so they reference external files at the same relative paths
+                filename = os.path.join(self._tempdir.name, backend.name, f"{layout}.json")
+                spp2086.measurement_data.set_json_backend(backend.name)
+                try:
+                    record.write(filename, json_layout=layout)
+                    record_loaded = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+                finally:
+                    spp2086.measurement_data.set_json_backend(None)
+                self.assertListEqual(record.data_channels[1]["data"], record_loaded.data_channels[1]["data"])
+                self.assertDictEqual(record.header, record_loaded.header)
+                with open(filename, mode='rb') as file:
+                    contents[backend.name] = file.read()
+            self.assertEqual(1, len(set(contents.values())), f"layout {layout}")
+
+        #the indent layout is the one of the json module, compact_items puts the items on one line
+        file_dict = json.loads(self.contents_of("json/indent.json"))
+        self.assertEqual(json.dumps(file_dict, ensure_ascii=False, indent=2), self.contents_of("json/indent.json"))
+        compact_items = self.contents_of("json/compact_items.json")
+        self.assertIn('"items": [[1,2],[3,4],[5,6]]', compact_items)
+        self.assertIn('\n  "header": {\n', compact_items)
+        self.assertEqual(file_dict["data"]["dataChannels"][:2], json.loads(compact_items)["data"]["dataChannels"][:2])
+        self.assertNotIn("\n", self.contents_of("json/compact.json"))
+
+        #header only loading finds the items in all layouts
+        for layout in spp2086.measurement_data.JSON_LAYOUTS:
+            filename = os.path.join(self._tempdir.name, "json", f"{layout}.json")
+            record_loaded = spp2086.measurement_data.MeasurementRecord.from_filename(filename, load="header")
+            self.assertListEqual([[1, 2], [3, 4], [5, 6]], record_loaded.get_data_channel("xy")[0]["data"])
+
+        self.assertRaises(ValueError, record.write, os.path.join(self._tempdir.name, "invalid.json"), json_layout="pretty")
+        self.assertRaises(ValueError, spp2086.measurement_data.set_json_backend, "simplejson")
+
+    def test_non_finite_and_long_integers(self):
+        values = [1.5, float("nan"), float("inf"), -float("inf")]
+        record = self.create_record()
+        record.add_data_channel("nonfinite", "N", 0, values)
+        record.add_data_channel("nonfinite_ext", "N", 0, values, storageType="externalFile")
+        record.add_data_channel("counter", "1", 0, [2**70, -2**70, 1])
+
+        def assert_round_trip(record_loaded):
+            for name in ("nonfinite", "nonfinite_ext"):
+                loaded = record_loaded.get_data_channel(name)[0]["data"]
+                self.assertEqual(1.5, loaded[0])
+                self.assertTrue(math.isnan(loaded[1]))
+                self.assertListEqual([float("inf"), -float("inf")], loaded[2:])
+            self.assertListEqual([2**70, -2**70, 1], record_loaded.get_data_channel("counter")[0]["data"])
+
+        filenames = {}
+        for backend in self.installed_backends():
+            filenames[backend.name] = os.path.join(self._tempdir.name, f"nonfinite_{backend.name}.json")
+            spp2086.measurement_data.set_json_backend(backend.name)
+            try:
+                record.write(filenames[backend.name])
+                assert_round_trip(spp2086.measurement_data.MeasurementRecord.from_filename(filenames[backend.name]))
+            finally:
+                spp2086.measurement_data.set_json_backend(None)
+
+        #files written by one backend are read by all others
+        for backend in self.installed_backends():
+            spp2086.measurement_data.set_json_backend(backend.name)
+            try:
+                for filename in filenames.values():
+                    assert_round_trip(spp2086.measurement_data.MeasurementRecord.from_filename(filename))
+                    assert_round_trip(spp2086.measurement_data.MeasurementRecord.from_filename(filename, load="header"))
+            finally:
+                spp2086.measurement_data.set_json_backend(None)
+
+        #digits after a decimal point are no integer
+        for backend in self.installed_backends():
+            self.assertListEqual([0.000012573022109339312, 12345678901234567890123],
+                backend.loads(b"[0.000012573022109339312,12345678901234567890123]"))
+
+    def test_numpy_external_json(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("numpy is required for this test")
+
+        record = self.create_record()
+        record.add_data_channel("Fp", "N", 0, np.array([1.25, 2.5, 3.75]), storageType="externalFile")
+        record.add_data_channel("counter", "1", 0, np.arange(3, dtype=">i4"), storageType="externalFile")
+        record.add_data_channel("uv", "mm", 0, np.arange(6, dtype=np.float32).reshape(3, 2), storageType="externalFile")
+        for backend in self.installed_backends():
+            filename = os.path.join(self._tempdir.name, f"numpy_{backend.name}.json")
+            spp2086.measurement_data.set_json_backend(backend.name)
+            try:
+                record.write(filename)
+                #the stream writes the first chunk and the appended ones with the backend
+                stream_filename = os.path.join(self._tempdir.name, f"numpy_stream_{backend.name}.json")
+                with self.create_record().open_stream(stream_filename) as stream:
+                    stream.append("Ff", np.array([7, 8]))
+            finally:
+                spp2086.measurement_data.set_json_backend(None)
+
+            record_loaded = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+            self.assertListEqual([1.25, 2.5, 3.75], record_loaded.get_data_channel("Fp")[0]["data"])
+            self.assertListEqual([0, 1, 2], record_loaded.get_data_channel("counter")[0]["data"])
+            self.assertListEqual([[0, 1], [2, 3], [4, 5]], record_loaded.get_data_channel("uv")[0]["data"])
+            record_loaded = spp2086.measurement_data.MeasurementRecord.from_filename(stream_filename)
+            self.assertListEqual([4, 5, 6, 7, 8], record_loaded.get_data_channel("Ff")[0]["data"])
+
+    def test_float32_arrays(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("numpy is required for this test")
+
+        values = np.array([0.1, 1/3, -1.7], dtype=np.float32)
+        record = self.create_record()
+        record.add_data_channel("Fs", "N", 0, values, storageType="externalFile")
+        record.add_data_channel("Fs2", "N", 0, np.stack([values, values], axis=1), storageType="externalFile")
+        contents = {}
+        for backend in self.installed_backends():
+            #the items of inplace data are placed in the main file in the indent layout
+            self.assertEqual(spp2086.measurement_data.get_json_backend("json").dumps({"items": [values]}),
+                backend.dumps({"items": [values]}), backend.name)
+            filename = os.path.join(self._tempdir.name, "float32", backend.name, "record.json")
+            spp2086.measurement_data.set_json_backend(backend.name)
+            try:
+                record.write(filename)
+            finally:
+                spp2086.measurement_data.set_json_backend(None)
+            for name in ("Fs", "Fs2"):
+                with open(os.path.join(os.path.dirname(filename), "data", "record", f"{name}.json"), mode='rb') as file:
+                    contents.setdefault(name, set()).add(file.read())
+            record_loaded = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+            self.assertListEqual(values.tolist(), record_loaded.get_data_channel("Fs")[0]["data"])
+        self.assertDictEqual({"Fs": 1, "Fs2": 1}, {name: len(content) for name, content in contents.items()})
+
+    def test_null_values(self):
+        #null values of the header are written by orjson itself
+        try:
+            backend = spp2086.measurement_data.get_json_backend("orjson")
+        except ImportError:
+            self.skipTest("orjson is required for this test")
+        document = {"header": {"notes": None}, "items": [1.5, None, [2, 3.5]]}
+        with unittest.mock.patch.object(json_backend._StdlibBackend, "dumps") as stdlib_dumps:
+            self.assertEqual(b'{"header":{"notes":null},"items":[1.5,null,[2,3.5]]}', backend.dumps(document))
+        stdlib_dumps.assert_not_called()
+
+    def contents_of(self, filename: str) -> str:
+        with open(os.path.join(self._tempdir.name, filename), mode='rt', encoding='utf-8') as file:
+            return file.read()
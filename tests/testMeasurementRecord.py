@@ -1,16 +1,57 @@
 from ast import Import
-import datetime
-import unittest
+import array
+import itertools
+import json
 import spp2086.measurement_data
+from recordTestCase import RecordTestCase
 import jsonschema
-import tempfile
 import os
+import subprocess
+import sys
+import time
 
-class TestMeasurementRecord(unittest.TestCase):
+class TestMeasurementRecord(RecordTestCase):
 
     def test_create_json_validator(self):
         json_validator = spp2086.measurement_data.create_json_validator()
         self.assertIsInstance(json_validator, jsonschema.validators.Draft7Validator)
+        json_validator = spp2086.measurement_data.create_json_validator(check_schema=True)
+        self.assertEqual(json_validator.schema["$id"], spp2086.measurement_data.DEFAULT_SCHEMA_ID)
+        self.assertRaises(ValueError, spp2086.measurement_data.create_json_validator, "https://spp2086.de/unknown")
+
+
+    def test_json_validator_is_cached(self):
+        json_validator = spp2086.measurement_data.get_json_validator()
+        self.assertIs(json_validator, spp2086.measurement_data.get_json_validator(spp2086.measurement_data.DEFAULT_SCHEMA_ID))
+        self.assertIs(json_validator, spp2086.measurement_data.MeasurementRecord.json_validator)
+
+
+    def test_import_time(self):
+        """import the package in a fresh interpreter and check that nothing expensive is loaded on import"""
+        import_times = self.measure_import("spp2086.measurement_data")
+        for module in ("jsonschema", "importlib_resources", "concurrent.futures", "numpy", "spp2086.measurement_data.schemas"):
+            self.assertNotIn(module, import_times)
+
+        #the package must import faster than jsonschema, whose import is deferred to the first validation,
+        #the best of several runs is compared as the import times of single runs vary a lot
+        package_time = min(self.measure_import("spp2086.measurement_data")["spp2086.measurement_data"] for _ in range(3))
+        jsonschema_time = min(self.measure_import("jsonschema")["jsonschema"] for _ in range(3))
+        self.assertLess(package_time, jsonschema_time)
+
+
+    @staticmethod
+    def measure_import(module: str) -> dict:
+        """return the cumulative import times in microseconds of all modules imported by importing module in a fresh interpreter"""
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            env=env, capture_output=True, text=True, check=True)
+
+        import_times = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+                _, cumulative, imported_module = line.split("|")
+                import_times[imported_module.strip()] = int(cumulative)
+        return import_times
 
 
     def test_empty_header_not_valid(self):
@@ -75,6 +116,34 @@ class TestMeasurementRecord(unittest.TestCase):
         self.assertEqual(write_data, read_data)
 
 
+    def test_write_is_repeatable(self):
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        record.add_sampling_grid("grid", "", [1,2,3])
+        record.add_data_channel("inplace", "1", 0, [0.1, 0.2, 0.3])
+        record.add_data_channel("external", "1", 0, [0.4, 0.5, 0.6], storageType="externalFile")
+        channels_before = json.dumps(record.data_channels)
+
+        filenames = [os.path.join(self._tempdir.name, "test_repeatable", target, "record.json") for target in ("cache", "archive")]
+        record.write(filenames)
+        record.write(filenames[0])
+        self.assertEqual(channels_before, json.dumps(record.data_channels))
+        self.assertEqual("data", record.rel_ext_filepath)
+
+        for filename in filenames:
+            record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+            self.assertListEqual([0.4, 0.5, 0.6], record_read.get_data_channel("external")[0]["data"])
+
+        #data that is not loaded is copied from the source files, also onto themselves
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filenames[1], lazy_loading=True)
+        copy_filename = os.path.join(self._tempdir.name, "test_repeatable", "copy.json")
+        record_read.write([copy_filename, filenames[1]])
+        for filename in (copy_filename, filenames[1]):
+            record_copy = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+            self.assertListEqual([0.4, 0.5, 0.6], record_copy.get_data_channel("external")[0]["data"])
+        self.assertIn("relativeFilePath", record_read.data_channels[1]["data"])
+
+
     def test_read_write_binary_file(self):
         
         #only run if numpy is installed
@@ -98,6 +167,384 @@ class TestMeasurementRecord(unittest.TestCase):
         self.assertTrue(np.array_equal(write_data, read_data))
 
 
+    def test_read_write_typed_binary_file(self):
+
+        #only run if numpy is installed
+        try:
+            import numpy as np
+        except ImportError as err:
+            self.skipTest("Skipping since numpy is not installed")
+
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        record.add_sampling_grid("grid", "", np.arange(4, dtype=np.int16), storageType="externalFile", encoding="bin")
+        write_data = np.asarray([[0.1, 0.2], [0.3, 0.4], [0.5, 0.6], [0.7, 0.8]], dtype=">f4")
+        record.add_data_channel("mockup data", "1", 0, write_data, storageType="externalFile", encoding="bin")
+        filename = os.path.join(self._tempdir.name, "test_read_write_typed_data.json")
+        record.write(filename)
+
+        with open(filename, mode='rt', encoding='utf-8') as file:
+            external_file = json.load(file)["data"]["dataChannels"][0]["data"]
+        self.assertEqual(external_file["dtype"], ">f4")
+        self.assertListEqual(external_file["shape"], [4, 2])
+
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+        read_channel, read_grid = record_read.get_data_channel("mockup data")
+        self.assertIsInstance(read_channel["data"], np.ndarray)
+        self.assertEqual(read_channel["data"].dtype, np.dtype(">f4"))
+        self.assertTrue(np.array_equal(write_data, read_channel["data"]))
+        self.assertTrue(np.array_equal(np.arange(4), read_grid["data"]))
+
+
+    def test_read_write_compressed_files(self):
+
+        #only run if numpy is installed
+        try:
+            import numpy as np
+        except ImportError as err:
+            self.skipTest("Skipping since numpy is not installed")
+
+        t = np.linspace(0, 1, 5000)
+        signal = np.sin(2*np.pi*5*t) + 0.01*np.random.default_rng(0).standard_normal(len(t))
+        for compression in spp2086.measurement_data.COMPRESSIONS:
+            for filters in ([], ["shuffle"], ["delta", "shuffle"]):
+                with self.subTest(compression=compression, filters=filters):
+                    record = spp2086.measurement_data.MeasurementRecord()
+                    record.header = self.create_minimal_header()
+                    try:
+                        record.add_sampling_grid("grid", "s", t.tolist(), storageType="externalFile", encoding="json+" + compression)
+                        record.add_data_channel("signal", "1", 0, signal.astype(">f4"), storageType="externalFile", encoding="bin+" + compression, filters=filters)
+                        filename = os.path.join(self._tempdir.name, "test_compressed", f"{compression}_{len(filters)}.json")
+                        record.write(filename)
+                    except ImportError as err:
+                        self.skipTest(str(err))
+
+                    record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename, lazy_loading=True)
+                    external_file = record_read.data_channels[0]["data"]
+                    self.assertEqual("bin+" + compression, external_file["fileEncoding"])
+                    self.assertListEqual(filters, external_file.get("filters", []))
+                    if filters:
+                        #noisy floats are only compressible after their bytes are shuffled
+                        self.assertLess(os.path.getsize(os.path.join(self._tempdir.name, "test_compressed", external_file["relativeFilePath"])), signal.astype(">f4").nbytes)
+
+                    read_channel, read_grid = record_read.get_data_channel("signal")
+                    self.assertTrue(np.array_equal(signal.astype(">f4"), read_channel["data"]))
+                    self.assertListEqual(t.tolist(), read_grid["data"])
+                    self.assertTrue(np.array_equal(signal.astype(">f4")[10:20], record_read.get_data_channel("signal", 10, 20)[0]["data"]))
+
+        #gzip output does not depend on the time it was written
+        filename = os.path.join(self._tempdir.name, "test_compressed", "gzip_0.json")
+        md5_checksum = spp2086.measurement_data.MeasurementRecord.from_filename(filename, lazy_loading=True).sampling_grids[0]["data"]["md5"]
+        record = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+        record.write(filename)
+        record = spp2086.measurement_data.MeasurementRecord.from_filename(filename, lazy_loading=True)
+        self.assertEqual(md5_checksum, record.sampling_grids[0]["data"]["md5"])
+
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.add_sampling_grid("grid", "s", [1, 2])
+        self.assertRaises(ValueError, record.add_data_channel, "signal", "1", 0, [1, 2], filters=["shuffle"])
+        self.assertRaises(ValueError, record.add_data_channel, "signal", "1", 0, signal, storageType="externalFile", encoding="bin", filters=["shuffle", "delta"])
+
+
+    def test_read_write_array_module_binary_file(self):
+
+        #only run if numpy is installed
+        try:
+            import numpy as np
+        except ImportError as err:
+            self.skipTest("Skipping since numpy is not installed")
+
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        record.add_sampling_grid("grid", "", [1,2,3])
+        write_data = array.array("d", [0.1, 0.2, 0.112])
+        record.add_data_channel("mockup data", "1", 0, write_data, storageType="externalFile", encoding="bin")
+        filename = os.path.join(self._tempdir.name, "test_read_write_array_data.json")
+        record.write(filename)
+
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+        read_data = record_read.data_channels[0]["data"]
+        self.assertListEqual(write_data.tolist(), read_data.tolist())
+
+
+    def test_memory_mapped_binary_file(self):
+
+        #only run if numpy is installed
+        try:
+            import numpy as np
+        except ImportError as err:
+            self.skipTest("Skipping since numpy is not installed")
+
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        record.add_sampling_grid("grid", "s", np.linspace(0, 1, 1000), storageType="externalFile", encoding="bin")
+        write_data = np.sin(np.linspace(0, 10, 1000))
+        record.add_data_channel("typed", "N", 0, write_data, storageType="externalFile", encoding="bin")
+        record.add_data_channel("untyped", "N", 0, write_data.tobytes(), storageType="externalFile", encoding="bin")
+        filename = os.path.join(self._tempdir.name, "test_memory_mapped_data.json")
+        record.write(filename)
+
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename, lazy_loading=True, memory_map=True)
+        read_channel, read_grid = record_read.get_data_channel("typed")
+        self.assertIsInstance(read_channel["data"], np.memmap)
+        self.assertIsInstance(read_grid["data"], np.memmap)
+        self.assertTrue(np.array_equal(write_data[100:200], read_channel["data"][100:200]))
+        self.assertRaises(ValueError, read_channel["data"].__setitem__, 0, 1.0)
+
+        read_channel, _ = record_read.get_data_channel("untyped")
+        self.assertIsInstance(read_channel["data"], memoryview)
+        self.assertTrue(np.array_equal(write_data, np.frombuffer(read_channel["data"], dtype=np.float64)))
+        record_read.wait_for_checksums()
+
+        #the checksums of mapped files are verified in the background unless the check is requested explicitly
+        external_file = spp2086.measurement_data.MeasurementRecord.from_filename(filename, lazy_loading=True).data_channels[0]["data"]
+        with open(os.path.join(self._tempdir.name, external_file["relativeFilePath"]), mode='r+b') as file:
+            file.write(b"\1")
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename, memory_map=True)
+        self.assertRaises(RuntimeError, record_read.wait_for_checksums)
+        self.assertRaises(RuntimeError, spp2086.measurement_data.MeasurementRecord.from_filename, filename, memory_map=True, verify_checksums=True)
+        self.assertRaises(RuntimeError, spp2086.measurement_data.MeasurementRecord.from_filename, filename)
+
+
+    def test_checksum_verification(self):
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        record.add_sampling_grid("grid", "", [1,2,3])
+        write_data = [0.1, 0.2, 0.112]
+        record.add_data_channel("mockup data", "1", 0, write_data, storageType="externalFile")
+        filename = os.path.join(self._tempdir.name, "test_checksum_data.json")
+        record.write(filename)
+
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename, verify_checksums="background")
+        self.assertListEqual(write_data, record_read.data_channels[0]["data"])
+        record_read.wait_for_checksums()
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename, lazy_loading=True)
+
+        #corrupt the external file while keeping its length
+        ext_filename = os.path.join(self._tempdir.name, record_read.data_channels[0]["data"]["relativeFilePath"])
+        with open(ext_filename, mode='r+b') as file:
+            file.write(b"[0.3")
+
+        self.assertRaises(RuntimeError, spp2086.measurement_data.MeasurementRecord.from_filename, filename)
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename, verify_checksums="background")
+        self.assertRaises(RuntimeError, record_read.wait_for_checksums)
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename, verify_checksums=False)
+        self.assertListEqual([0.3, 0.2, 0.112], record_read.data_channels[0]["data"])
+
+
+    def test_validation_modes(self):
+        valid_items = [[0.1, 2, -3e5], [[0, 1], [0.5, 1.5, 2]], [], [1, [2, 3]]]
+        invalid_items = [["0.1"], [True, 1.0], [[1]], [[1, "2"]], [None], [{"a": 1}]]
+
+        for items, is_valid in itertools.chain(zip(valid_items, itertools.repeat(True)), zip(invalid_items, itertools.repeat(False))):
+            file_dict = self.create_file_dict(items)
+            for validate in ("full", "structure"):
+                with self.subTest(items=items, validate=validate):
+                    filename = os.path.join(self._tempdir.name, "test_validation_modes.json")
+                    with open(filename, mode='wt', encoding='utf-8') as file:
+                        json.dump(file_dict, file)
+                    if is_valid:
+                        spp2086.measurement_data.MeasurementRecord.from_filename(filename, validate=validate)
+                    else:
+                        self.assertRaises(jsonschema.ValidationError, spp2086.measurement_data.MeasurementRecord.from_filename, filename, validate=validate)
+
+            #the header mode does not look at the data
+            spp2086.measurement_data.MeasurementRecord.from_filename(filename, validate="header")
+
+
+    def test_validation_checks_length(self):
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        record.add_sampling_grid("grid", "", [1,2,3])
+        filename = os.path.join(self._tempdir.name, "test_validation_length.json")
+        record.write(filename, validate="structure")
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename, validate="structure")
+        self.assertListEqual(record_read.sampling_grids[0]["data"], [1,2,3])
+
+        file_dict = self.create_file_dict([1,2,3])
+        file_dict["data"]["samplingGrids"][0]["data"]["length"] = 4
+        with open(filename, mode='wt', encoding='utf-8') as file:
+            json.dump(file_dict, file)
+
+        for validate in ("full", "structure"):
+            self.assertRaises(jsonschema.ValidationError, spp2086.measurement_data.MeasurementRecord.from_filename, filename, validate=validate)
+        self.assertRaises(ValueError, spp2086.measurement_data.MeasurementRecord.from_filename, filename, validate="none")
+
+
+    def test_stream_writer(self):
+
+        #only run if numpy is installed
+        try:
+            import numpy as np
+        except ImportError as err:
+            self.skipTest("Skipping since numpy is not installed")
+
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        grid_idx = record.add_sampling_grid("time", "s", np.empty(0), storageType="externalFile", encoding="bin")
+        record.add_sampling_grid("setpoints", "", [0, 1])
+        record.add_data_channel("force", "N", grid_idx, np.empty((0, 3), dtype=np.float32), storageType="externalFile", encoding="bin")
+        record.add_data_channel("temperature", "K", grid_idx, [], storageType="externalFile")
+        record.add_data_channel("state", "", grid_idx, [1])
+        filename = os.path.join(self._tempdir.name, "test_stream.json")
+
+        time = np.arange(10, dtype=np.float64)
+        force = np.arange(30, dtype=np.float32).reshape(10, 3)
+        with record.open_stream(filename) as stream:
+            for start in range(0, 10, 4):
+                stream.append("time", time[start:start+4])
+                stream.append("force", force[start:start+4])
+                stream.append("temperature", time[start:start+4] + 273.15)
+                stream.append("state", [1] * len(time[start:start+4]))
+            stream.append(1, [2])
+            self.assertRaises(ValueError, stream.append, "force", np.zeros((1, 2), dtype=np.float32))
+            self.assertRaises(ValueError, stream.append, "pressure", [1.0])
+
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+        force_channel, time_grid = record_read.get_data_channel("force")
+        self.assertTrue(np.array_equal(force, force_channel["data"]))
+        self.assertTrue(np.array_equal(time, time_grid["data"]))
+        self.assertListEqual((time + 273.15).tolist(), record_read.get_data_channel("temperature")[0]["data"])
+        self.assertListEqual([1] * 11, record_read.get_data_channel("state")[0]["data"])
+        self.assertListEqual([0, 1, 2], record_read.sampling_grids[1]["data"])
+
+        #after closing the stream the record refers to the written files
+        self.assertIn("relativeFilePath", record.data_channels[0]["data"])
+        self.assertTrue(np.array_equal(force, record.get_data_channel("force")[0]["data"]))
+
+
+    def test_windowed_read(self):
+
+        #only run if numpy is installed
+        try:
+            import numpy as np
+        except ImportError as err:
+            self.skipTest("Skipping since numpy is not installed")
+
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        time = np.linspace(0, 9.9, 100)
+        record.add_sampling_grid("time", "s", time, storageType="externalFile", encoding="bin")
+        record.add_sampling_grid("index", "", list(range(100)))
+        record.add_data_channel("force", "N", 0, np.arange(200, dtype="<i4").reshape(100, 2), storageType="externalFile", encoding="bin")
+        record.add_data_channel("temperature", "K", 0, time.tolist(), storageType="externalFile")
+        record.add_data_channel("counter", "", 1, list(range(0, 200, 2)))
+        filename = os.path.join(self._tempdir.name, "test_windowed_read.json")
+        record.write(filename)
+
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename, lazy_loading=True)
+        force_channel, time_grid = record_read.get_data_channel("force", 10, 12)
+        self.assertListEqual([[20, 21], [22, 23]], force_channel["data"].tolist())
+        self.assertTrue(np.array_equal(time[10:12], time_grid["data"]))
+        self.assertListEqual([[196, 197], [198, 199]], record_read.get_data_channel("force", -2)[0]["data"].tolist())
+        self.assertEqual((0, 2), record_read.get_data_channel("force", 200, 300)[0]["data"].shape)
+
+        #the record itself is not loaded by windowed reads of binary files
+        self.assertIn("relativeFilePath", record_read.data_channels[0]["data"])
+        self.assertIn("relativeFilePath", record_read.sampling_grids[0]["data"])
+
+        force_channel, time_grid = record_read.slice_by_grid("force", 2.0, 2.25)
+        self.assertTrue(np.array_equal(time[20:23], time_grid["data"]))
+        self.assertListEqual([[40, 41], [42, 43], [44, 45]], force_channel["data"].tolist())
+
+        temperature_channel, _ = record_read.slice_by_grid("temperature", 5.0, 5.0)
+        self.assertListEqual(time[50:51].tolist(), temperature_channel["data"])
+
+        counter_channel, index_grid = record_read.slice_by_grid("counter", 10.5, 13)
+        self.assertListEqual([11, 12, 13], index_grid["data"])
+        self.assertListEqual([22, 24, 26], counter_channel["data"])
+        self.assertListEqual([], record_read.slice_by_grid("counter", 200, 300)[0]["data"])
+
+
+    def test_load_many(self):
+        filenames = []
+        for record_idx in range(5):
+            record = spp2086.measurement_data.MeasurementRecord()
+            record.header = self.create_minimal_header()
+            record.add_sampling_grid("grid", "", [1,2,3])
+            record.add_data_channel("inplace", "1", 0, [record_idx]*3)
+            record.add_data_channel("external", "1", 0, [0.5*record_idx]*3, storageType="externalFile")
+            filename = os.path.join(self._tempdir.name, f"test_load_many_{record_idx}.json")
+            record.write(filename)
+            filenames.append(filename)
+
+        #a missing file is reported without stopping the batch
+        filenames.insert(2, os.path.join(self._tempdir.name, "test_load_many_missing.json"))
+
+        for executor in ("thread", "process"):
+            with self.subTest(executor=executor):
+                results = list(spp2086.measurement_data.MeasurementRecord.load_many(filenames, workers=2, executor=executor, validate="structure"))
+                self.assertListEqual(filenames, [result.path for result in results])
+                self.assertIsInstance(results[2].error, FileNotFoundError)
+                self.assertIsNone(results[2].record)
+
+                for record_idx, result in enumerate(results[:2] + results[3:]):
+                    self.assertIsNone(result.error)
+                    self.assertListEqual([record_idx]*3, result.record.data_channels[0]["data"])
+                    self.assertListEqual([0.5*record_idx]*3, result.record.data_channels[1]["data"])
+
+        results = spp2086.measurement_data.MeasurementRecord.load_many(filenames, workers=2, executor="thread", ordered=False, lazy_loading=True)
+        self.assertListEqual(sorted(filenames), sorted(result.path for result in results))
+
+
+    def test_async_load_write(self):
+        import asyncio
+
+        async def write_and_load(record_idx):
+            record = spp2086.measurement_data.MeasurementRecord()
+            record.header = self.create_minimal_header()
+            record.add_sampling_grid("grid", "", [1,2,3], storageType="externalFile")
+            for channel_idx in range(4):
+                record.add_data_channel(f"external_{channel_idx}", "1", 0, [record_idx, channel_idx, 0.5], storageType="externalFile")
+            filename = os.path.join(self._tempdir.name, "test_async", f"record_{record_idx}.json")
+            await record.awrite(filename)
+
+            record_read = await spp2086.measurement_data.MeasurementRecord.aload(filename)
+            self.assertListEqual([record_idx, 3, 0.5], record_read.data_channels[3]["data"])
+
+            #concurrent requests of channels on the same sampling grid load it once
+            record_lazy = await spp2086.measurement_data.MeasurementRecord.aload(filename, lazy_loading=True)
+            results = await asyncio.gather(*(record_lazy.aget_data_channel(f"external_{channel_idx}") for channel_idx in range(4)))
+            self.assertListEqual([[record_idx, channel_idx, 0.5] for channel_idx in range(4)], [channel["data"] for channel, _ in results])
+            self.assertTrue(all(sampling_grid is record_lazy.sampling_grids[0] for _, sampling_grid in results))
+            channel, sampling_grid = await record_lazy.aget_data_channel("external_1", 1, 3)
+            self.assertListEqual([1, 0.5], channel["data"])
+            self.assertListEqual([2, 3], sampling_grid["data"])
+            return filename
+
+        async def main():
+            return await asyncio.gather(*(write_and_load(record_idx) for record_idx in range(8)))
+
+        filenames = asyncio.run(main())
+        with open(filenames[0], mode='rt', encoding='utf-8') as file:
+            file_dict = json.load(file)
+        self.assertListEqual(["grid"], [sampling_grid["name"] for sampling_grid in file_dict["data"]["samplingGrids"]])
+        self.assertListEqual([f"external_{channel_idx}" for channel_idx in range(4)], [channel["name"] for channel in file_dict["data"]["dataChannels"]])
+
+
+    def test_parallel_write(self):
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        record.add_sampling_grid("grid", "", list(range(20000)), storageType="externalFile")
+        for channel_idx in range(8):
+            encoding = "json+gzip" if channel_idx % 2 else "json"
+            record.add_data_channel(f"external_{channel_idx}", "1", 0, [channel_idx + 0.5*n for n in range(20000)], storageType="externalFile", encoding=encoding)
+        record.add_data_channel("inplace", "1", 0, list(range(20000)))
+
+        #the main file and external files are the same however they are written
+        main_files = []
+        for workers, json_processes in ((None, None), (4, None), (4, 2)):
+            filename = os.path.join(self._tempdir.name, f"test_parallel_write_{workers}_{json_processes}", "record.json")
+            record.write(filename, workers=workers, json_processes=json_processes)
+            with open(filename, mode='rt', encoding='utf-8') as file:
+                main_files.append(file.read())
+        self.assertEqual(main_files[0], main_files[1])
+        self.assertEqual(main_files[0], main_files[2])
+
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+        self.assertListEqual(record.data_channels[7]["data"], record_read.get_data_channel("external_7")[0]["data"])
+
+
     def test_data_channel_util(self):
         record = spp2086.measurement_data.MeasurementRecord()
         grid_idx = record.add_sampling_grid("grid", "m", [1,2,3])
@@ -110,6 +557,50 @@ class TestMeasurementRecord(unittest.TestCase):
         self.assertDictEqual(channel, record.data_channels[0])
         self.assertDictEqual(grid, record.sampling_grids[0])
         self.assertRaises(ValueError, record.get_data_channel, "channel 3")
+        self.assertRaises(ValueError, record.add_data_channel, "channel 1", "", grid_idx, [1,1,1])
+
+
+    def test_data_channel_index(self):
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.add_sampling_grid("grid 1", "m", [1,2,3])
+        record.add_sampling_grid("grid 2", "s", [1,2])
+        for channel_idx in range(6):
+            record.add_data_channel(f"channel {channel_idx}", "", channel_idx % 2, [channel_idx]*(3 - channel_idx % 2))
+
+        self.assertListEqual(["channel 1", "channel 3", "channel 5"], record.get_data_channel_names(1))
+        self.assertListEqual([], record.get_data_channel_names(2))
+        self.assertListEqual([3, 3], record.get_data_channel("channel 3")[0]["data"])
+
+        #changes made directly to data_channels are picked up
+        record.data_channels[3]["name"] = "renamed"
+        self.assertListEqual([3, 3], record.get_data_channel("renamed")[0]["data"])
+        self.assertRaises(ValueError, record.get_data_channel, "channel 3")
+        self.assertRaises(ValueError, record.add_data_channel, "renamed", "", 0, [1,2,3])
+        record.add_data_channel("channel 3", "", 1, [3, 3])
+        self.assertListEqual(["channel 1", "renamed", "channel 5", "channel 3"], record.get_data_channel_names(1))
+        del record.data_channels[-1]
+        del record.data_channels[0]
+        self.assertRaises(ValueError, record.get_data_channel, "channel 0")
+        self.assertListEqual([5]*2, record.get_data_channel("channel 5")[0]["data"])
+        record.data_channels = record.data_channels + [dict(record.data_channels[0])]
+        self.assertRaises(ValueError, record.get_data_channel, "channel 1")
+        self.assertListEqual(["channel 1", "renamed", "channel 5", "channel 1"], record.get_data_channel_names(1))
+
+
+    def test_add_data_channel_cost(self):
+        """adding a channel must not compare its name with all existing channels"""
+        def add_channels(record, prefix: str, count: int) -> float:
+            start = time.perf_counter()
+            for channel_idx in range(count):
+                record.add_data_channel(f"{prefix} {channel_idx}", "", 0, [0.0])
+            return time.perf_counter() - start
+
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.add_sampling_grid("grid", "s", [0.0])
+        empty_time = min(add_channels(record, f"first {run}", 1000) for run in range(3))
+        add_channels(record, "filler", 50_000)
+        full_time = min(add_channels(record, f"last {run}", 1000) for run in range(3))
+        self.assertLess(full_time, 10 * empty_time)
 
 
     def test_lazy_loading(self):
@@ -131,32 +622,46 @@ class TestMeasurementRecord(unittest.TestCase):
         self.assertListEqual(write_data, read_channel["data"])
 
 
-    @classmethod
-    def create_minimal_header(cls) -> dict:       
-        tool_dict = {"id": "ID1"}
-        workpiece_dict = {"name": "test piece"}
-        parameters_list = []
-        process_dict = {
-            "processType": "test process",
-            "tool": tool_dict,
-            "workpiece": workpiece_dict,
-            "parameters": parameters_list
-        }
-
-        header_dict = {
-            "projectName": "test project",
-            "location": "nowhere",
-            "creationDate": str(datetime.date.today()),
-            "machine": {"name": "mockup machine"},
-            "process": process_dict
-        }
-
-        return header_dict
-    
-    @classmethod
-    def setUpClass(cls) -> None:
-        cls._tempdir = tempfile.TemporaryDirectory()
+    def test_header_only_loading(self):
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        record.header["projectName"] = 'test "project" [1]'
+        record.add_sampling_grid("grid", "", [1,2,3], notes="{not data}")
+        record.add_data_channel("tuples", "1", 0, [[0, 1], [0.5, 1.5], [2, -3e5]])
+        record.add_data_channel("external", "1", 0, [0.1, 0.2, 0.3], storageType="externalFile")
+        filename = os.path.join(self._tempdir.name, "test_header_only_loading.json")
+        record.write(filename)
+
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename, load="header")
+        self.assertDictEqual(record.header, record_read.header)
+        self.assertListEqual(["tuples", "external"], record_read.get_data_channel_names())
+        self.assertEqual("{not data}", record_read.sampling_grids[0]["notes"])
+        self.assertEqual(3, record_read.data_channels[0]["data"]["length"])
+        self.assertIn("relativeFilePath", record_read.data_channels[1]["data"])
+
+        #the items are parsed when the data channel is requested
+        read_channel, read_grid = record_read.get_data_channel("tuples")
+        self.assertListEqual([[0, 1], [0.5, 1.5], [2, -3e5]], read_channel["data"])
+        self.assertListEqual([1,2,3], read_grid["data"])
+        self.assertListEqual([0.1, 0.2], record_read.get_data_channel("external", 0, 2)[0]["data"])
+
+        #invalid items are found when they are loaded
+        file_dict = self.create_file_dict([1, "2", 3])
+        with open(filename, mode='wt', encoding='utf-8') as file:
+            json.dump(file_dict, file)
+        record_read = spp2086.measurement_data.MeasurementRecord.from_filename(filename, load="header")
+        self.assertRaises(jsonschema.ValidationError, record_read.load_external_data)
+        self.assertRaises(ValueError, spp2086.measurement_data.MeasurementRecord.from_filename, filename, load="items")
+
+        #items that are nested deeper or mixed with arrays are found by the general scan
+        for items in ([[[1, 2]], [[3, 4]]], [1, [2, 3]], [[1, 2], [[3]]], [[1, 2], [3, 4]], [[], [1]], [[1, [2]]], [[1, [2], 3], [4]], [[1], 2, [3]]):
+            for indent in (None, 1):
+                with open(filename, mode='wt', encoding='utf-8') as file:
+                    json.dump(self.create_file_dict(items), file, indent=indent)
+                file_dict = spp2086.measurement_data.json_scanner.scan_main_file(filename)
+                self.assertListEqual(items, file_dict["data"]["samplingGrids"][0]["data"]["items"].load())
 
     @classmethod
-    def tearDownClass(cls) -> None:
-        cls._tempdir.cleanup()
\ No newline at end of file
+    def create_file_dict(cls, items: list) -> dict:
+        sampling_grid = {"name": "grid", "unit": "", "storageType": "inplace", "data": {"length": len(items), "items": items}}
+        return {"header": cls.create_minimal_header(), "data": {"samplingGrids": [sampling_grid], "dataChannels": []}}
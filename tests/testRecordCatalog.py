@@ -0,0 +1,119 @@
+import os
+import tempfile
+import time
+import spp2086.measurement_data
+from recordTestCase import RecordTestCase
+
+
+class TestRecordCatalog(RecordTestCase):
+
+    def test_find_records(self):
+        catalog = spp2086.measurement_data.RecordCatalog()
+        summary = catalog.update(self._tempdir.name)
+        self.assertEqual(3, len(summary["added"]))
+        self.assertListEqual([], summary["failed"])
+
+        self.assertListEqual([self.filenames[1], self.filenames[2]], catalog.find(parameters=[("vc", ">", 200)]))
+        self.assertListEqual([self.filenames[2]], catalog.find(parameters=[("vc", ">", 200)], machine="machine B"))
+        self.assertListEqual([self.filenames[0]], catalog.find(parameters=[("cutting speed", "<=", 150)]))
+        self.assertListEqual([self.filenames[1]], catalog.find(parameters=[("coolant", "=", "cryogenic")]))
+        self.assertListEqual(self.filenames, catalog.find(channels=["Fc"]))
+        self.assertListEqual([self.filenames[0]], catalog.find(channels=["Fc", "temperature"]))
+        self.assertListEqual(self.filenames, catalog.find(process_type="test process"))
+        self.assertListEqual([], catalog.find(process_type="Aussenlaengsdrehen"))
+        self.assertRaises(ValueError, catalog.find, parameters=[("vc", "LIKE", 1)])
+        self.assertRaises(ValueError, catalog.find, tool="ID1")
+
+        header = catalog.get_header(self.filenames[2])
+        self.assertEqual("machine B", header["machine"]["name"])
+
+        lengths = catalog.connection.execute("SELECT name, length FROM data_channels WHERE path = ? ORDER BY name", (self.filenames[0],)).fetchall()
+        self.assertListEqual([("Fc", 3), ("temperature", None)], lengths)
+
+
+    def test_incremental_update(self):
+        catalog_filename = os.path.join(self._tempdir.name, "catalog.sqlite")
+        with spp2086.measurement_data.RecordCatalog(catalog_filename) as catalog:
+            catalog.update(self._tempdir.name)
+
+        with spp2086.measurement_data.RecordCatalog(catalog_filename) as catalog:
+            summary = catalog.update(self._tempdir.name)
+            self.assertListEqual([], summary["added"] + summary["updated"] + summary["removed"])
+
+            #touching a file without changing it does not re-index it
+            os.utime(self.filenames[0], ns=(time.time_ns(), time.time_ns() + 10**9))
+            summary = catalog.update(self._tempdir.name)
+            self.assertListEqual([], summary["updated"])
+
+            filename = os.path.join(self._tempdir.name, "archive", "new.json")
+            self.create_record(filename, 400, "machine C", ["Fc"])
+            summary = catalog.update(self._tempdir.name)
+            self.assertListEqual([filename], summary["added"])
+            self.assertListEqual([filename], catalog.find(machine="machine C"))
+
+            self.create_record(filename, 100, "machine C", ["Fc"])
+            summary = catalog.update(self._tempdir.name)
+            self.assertListEqual([filename], summary["updated"])
+            self.assertListEqual([], catalog.find(parameters=[("vc", ">", 200)], machine="machine C"))
+
+            #a file that fails to re-index is removed from the catalog until it can be read again
+            with open(filename, mode='ab') as file:
+                file.write(b"}")
+            summary = catalog.update(self._tempdir.name)
+            self.assertListEqual([filename], summary["failed"])
+            self.assertListEqual([], catalog.find(machine="machine C"))
+            self.create_record(filename, 100, "machine C", ["Fc"])
+            summary = catalog.update(self._tempdir.name)
+            self.assertListEqual([filename], summary["added"])
+
+            os.remove(filename)
+            summary = catalog.update(self._tempdir.name)
+            self.assertListEqual([filename], summary["removed"])
+            self.assertListEqual([], catalog.find(machine="machine C"))
+            self.assertEqual(0, catalog.connection.execute("SELECT COUNT(*) FROM parameters WHERE path = ?", (filename,)).fetchone()[0])
+
+
+    def test_update_case_sensitive_paths(self):
+        #directories whose names only differ in case are separate roots on case-sensitive file systems,
+        #they are not placed in the directory that the other tests index
+        with tempfile.TemporaryDirectory() as root_dir:
+            filenames = [os.path.join(root_dir, "Run", "record.json"), os.path.join(root_dir, "run", "record.json")]
+            self.create_record(filenames[0], 100, "machine D", ["Fc"])
+            self.create_record(filenames[1], 100, "machine D", ["Fc"])
+            if len(os.listdir(root_dir)) < 2:
+                self.skipTest("the file system is not case-sensitive")
+
+            with spp2086.measurement_data.RecordCatalog(os.path.join(root_dir, "case.sqlite")) as catalog:
+                catalog.update(os.path.join(root_dir, "run"))
+                summary = catalog.update(os.path.join(root_dir, "Run"))
+                self.assertListEqual([], summary["removed"])
+                self.assertListEqual(sorted(filenames), sorted(catalog.find(machine="machine D")))
+                summary = catalog.update(os.path.join(root_dir, "run"))
+                self.assertListEqual([], summary["added"] + summary["removed"])
+
+
+    @classmethod
+    def create_record(cls, filename: str, vc: float, machine: str, channels: list, coolant="none") -> None:
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = cls.create_minimal_header()
+        record.header["machine"]["name"] = machine
+        record.add_parameter("cutting speed", vc, "m/min", symbol="vc")
+        record.add_parameter("coolant", coolant, "")
+        record.add_sampling_grid("grid", "s", [0.1, 0.2, 0.3])
+        for channel in channels:
+            storage_type = "inplace" if channel == "Fc" else "externalFile"
+            record.add_data_channel(channel, "", 0, [1, 2, 3], storageType=storage_type)
+        record.write(filename)
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        archive_dir = os.path.join(cls._tempdir.name, "archive")
+        cls.filenames = [
+            os.path.join(archive_dir, "a", "run_1.json"),
+            os.path.join(archive_dir, "a", "run_2.json"),
+            os.path.join(archive_dir, "b", "run_3.json")
+        ]
+        cls.create_record(cls.filenames[0], 150, "machine A", ["Fc", "temperature"])
+        cls.create_record(cls.filenames[1], 250, "machine A", ["Fc"], coolant="cryogenic")
+        cls.create_record(cls.filenames[2], 300, "machine B", ["Fc"])
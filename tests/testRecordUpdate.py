@@ -0,0 +1,71 @@
+import array
+import os
+import spp2086.measurement_data
+from recordTestCase import RecordTestCase
+
+
+class TestRecordUpdate(RecordTestCase):
+
+    def file_states(self, dirname: str) -> dict:
+        states = {}
+        for dir_path, _, filenames in os.walk(dirname):
+            for filename in filenames:
+                stat = os.stat(os.path.join(dir_path, filename))
+                states[os.path.relpath(os.path.join(dir_path, filename), dirname)] = (stat.st_ino, stat.st_mtime_ns)
+        return states
+
+    def test_add_channel(self):
+        filename = os.path.join(self._tempdir.name, "add", "record.json")
+        self.create_record(("force", "position", "inplace")).write(filename, json_layout="indent")
+        data_dir = os.path.join(os.path.dirname(filename), "data")
+        states = self.file_states(data_dir)
+
+        record = spp2086.measurement_data.MeasurementRecord.open_for_update(filename)
+        descriptions = [dict(data_iter["data"]) for data_iter in record.sampling_grids + record.data_channels[:2]]
+        force, _ = record.get_data_channel("force")
+        record.add_data_channel("force_squared", "N^2", 0, array.array("d", [value**2 for value in force["data"]]),
+            storageType="externalFile", encoding="bin")
+        record.add_data_channel("force_inplace", "N", 0, force["data"][:])
+        record.header["process"]["parameters"].append({"name": "feature", "symbol": "", "valueType": "string", "value": "squared", "unit": ""})
+        record.commit()
+
+        #existing external files are neither rewritten nor hashed again, the inplace items are copied as they are
+        new_states = self.file_states(data_dir)
+        self.assertDictEqual(states, {path: state for path, state in new_states.items() if path in states})
+        self.assertIn(os.path.join("record", "force_squared.bin"), new_states)
+        with open(filename, mode='rt', encoding='utf-8') as file:
+            content = file.read()
+        self.assertIn('"items": [\n            0,\n            1,', content)
+
+        #the record refers to the written files
+        self.assertListEqual(descriptions, [data_iter["data"] for data_iter in record.sampling_grids + record.data_channels[:2]])
+        self.assertListEqual(list(range(1000)), record.get_data_channel("inplace")[0]["data"])
+        self.assertEqual(998001.0, record.get_data_channel("force_squared")[0]["data"][-1])
+
+        record = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+        self.assertListEqual(["force", "position", "inplace", "force_squared", "force_inplace"], record.get_data_channel_names())
+        self.assertEqual("squared", record.header["process"]["parameters"][-1]["value"])
+        self.assertEqual(999.0, record.get_data_channel("force_inplace")[0]["data"][-1])
+
+    def test_replace_channel(self):
+        filename = os.path.join(self._tempdir.name, "replace", "record.json")
+        self.create_record(("force", "position", "inplace")).write(filename, json_layout="indent")
+        force_filename = os.path.join(os.path.dirname(filename), "data", "record", "force.json.gz")
+        force_state = self.file_states(os.path.dirname(force_filename))["force.json.gz"]
+
+        #data is only written if it was replaced
+        record = spp2086.measurement_data.MeasurementRecord.open_for_update(filename)
+        position, _ = record.get_data_channel("position")
+        position["data"] = [[n, 3*n] for n in range(1000)]
+        record.get_data_channel("force")
+        inplace, _ = record.get_data_channel("inplace")
+        inplace["data"] = list(range(1, 1001))
+        record.commit()
+        self.assertEqual(force_state, self.file_states(os.path.dirname(force_filename))["force.json.gz"])
+
+        record = spp2086.measurement_data.MeasurementRecord.from_filename(filename)
+        self.assertListEqual([999, 2997], record.get_data_channel("position")[0]["data"][-1])
+        self.assertListEqual(list(range(1, 1001)), record.get_data_channel("inplace")[0]["data"])
+        self.assertEqual(999.0, record.get_data_channel("force")[0]["data"][-1])
+
+        self.assertRaises(RuntimeError, record.commit)
@@ -0,0 +1,75 @@
+import os
+import spp2086.measurement_data
+from recordTestCase import RecordTestCase
+
+
+class TestResampling(RecordTestCase):
+
+    def create_record(self):
+        import numpy as np
+
+        record = spp2086.measurement_data.MeasurementRecord()
+        record.header = self.create_minimal_header()
+        t_fast = np.arange(10000) * 1e-4
+        t_slow = np.arange(101) * 1e-2
+        record.add_sampling_grid("fast timer", "s", t_fast, storageType="externalFile", encoding="bin")
+        record.add_sampling_grid("slow timer", "s", t_slow.tolist())
+        #a slow signal with a disturbance at 3025 Hz that aliases if it is not filtered
+        record.add_data_channel("force", "N", 0, np.sin(2*np.pi*2*t_fast) + np.sin(2*np.pi*3025*t_fast), storageType="externalFile", encoding="bin")
+        record.add_data_channel("position", "mm", 0, np.stack([t_fast, 2*t_fast], axis=1), storageType="externalFile", encoding="bin")
+        record.add_data_channel("temperature", "K", 1, [20.0 + n for n in range(101)])
+        return record
+
+    def test_resample(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("numpy is required for this test")
+        from spp2086.measurement_data.resampling import resample
+
+        grid = [0.0, 1.0, 2.0, 4.0]
+        values = [0, 10, 20, 40]
+        target = [-1.0, 0.0, 0.4, 0.6, 1.0, 3.0, 4.0, 5.0]
+        nan = float("nan")
+        np.testing.assert_array_equal([nan, 0, 4, 6, 10, 30, 40, nan], resample(grid, values, target, "linear", chunk_size=3))
+        np.testing.assert_array_equal([nan, 0, 0, 10, 10, 20, 40, nan], resample(grid, values, target, "nearest", chunk_size=3))
+        np.testing.assert_array_equal([nan, 0, 0, 0, 10, 20, 40, nan], resample(grid, values, target, "zoh", chunk_size=3))
+
+        #numeric tuples are resampled per element
+        tuples = resample(grid, [[v, -v] for v in values], [0.5, 3.0], "linear", anti_aliasing=False)
+        np.testing.assert_array_equal([[5, -5], [30, -30]], tuples)
+        self.assertRaises(ValueError, resample, grid, values, target, "cubic")
+        self.assertRaises(ValueError, resample, grid, values[:3], target)
+
+    def test_align_channels(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("numpy is required for this test")
+
+        filename = os.path.join(self._tempdir.name, "test_align", "record.json")
+        self.create_record().write(filename)
+        record = spp2086.measurement_data.MeasurementRecord.from_filename(filename, lazy_loading=True, memory_map=True)
+
+        grid, aligned = record.align_channels(["temperature", "force", "position"])
+        self.assertEqual(101, len(grid))
+        np.testing.assert_array_equal(np.arange(101) + 20.0, aligned["temperature"])
+        self.assertEqual((101, 2), aligned["position"].shape)
+        np.testing.assert_allclose(np.stack([grid, 2*grid], axis=1)[5:-5], aligned["position"][5:-5])
+        self.assertTrue(np.isnan(aligned["position"][-1]).all())
+        #the disturbance is removed instead of aliasing onto the slow grid
+        expected = np.sin(2*np.pi*2*grid)
+        self.assertLess(np.max(np.abs(aligned["force"][5:-5] - expected[5:-5])), 0.05)
+        _, aliased = record.align_channels(["force"], sampling_grid=1, anti_aliasing=False)
+        self.assertGreater(np.max(np.abs(aliased["force"] - expected)[:-1]), 0.5)
+
+        #a channel aligned onto a finer grid
+        grid, aligned = record.align_channels(["temperature"], sampling_grid=0, method="zoh")
+        self.assertEqual(10000, len(aligned["temperature"]))
+        self.assertEqual(20.0, aligned["temperature"][99])
+        self.assertEqual(21.0, aligned["temperature"][100])
+
+        channel, sampling_grid = record.decimate_channel("force", 100)
+        self.assertEqual(100, len(channel["data"]))
+        np.testing.assert_array_equal(record.sampling_grids[0]["data"][::100], sampling_grid["data"])
+        self.assertLess(np.max(np.abs(channel["data"][5:-5] - np.sin(2*np.pi*2*sampling_grid["data"][5:-5]))), 0.05)
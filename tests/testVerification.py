@@ -0,0 +1,78 @@
+import contextlib
+import io
+import json
+import os
+import spp2086.measurement_data
+from recordTestCase import RecordTestCase
+from spp2086.measurement_data import verification
+
+
+class TestVerification(RecordTestCase):
+
+    def test_verify_archive(self):
+        archive_dir = os.path.join(self._tempdir.name, "archive")
+        for record_id in ("run_1", "run_2"):
+            self.create_record().write(os.path.join(archive_dir, record_id + ".json"))
+        with open(os.path.join(archive_dir, "broken.json"), mode='wt') as file:
+            file.write('{"$schema": "https://spp2086.de/v1.0/base-schema", "header": {')
+
+        with spp2086.measurement_data.ChecksumCache(os.path.join(self._tempdir.name, "checksums.sqlite")) as cache:
+            results = spp2086.measurement_data.verify_archive(archive_dir, cache, workers=2)
+            self.assertListEqual(["error"] + ["verified"] * 4, [result.status for result in results])
+            self.assertEqual(4, len(cache))
+
+            #unchanged files are skipped, changed and missing ones are found
+            force_filename = os.path.join(archive_dir, "data", "run_1", "force.json.gz")
+            with open(force_filename, mode='ab') as file:
+                file.write(b"\0")
+            os.remove(os.path.join(archive_dir, "data", "run_2", "grid.json"))
+            results = spp2086.measurement_data.verify_archive(archive_dir, cache)
+            statuses = {(os.path.basename(result.record), result.channel): result.status for result in results}
+            self.assertDictEqual({("broken.json", None): "error", ("run_1.json", "grid"): "cached", ("run_1.json", "force"): "mismatch",
+                ("run_2.json", "grid"): "missing", ("run_2.json", "force"): "cached"}, statuses)
+            self.assertEqual("verified", spp2086.measurement_data.verify_archive([os.path.join(archive_dir, "run_2.json")], cache,
+                recheck=True)[1].status)
+            self.assertEqual(1, cache.remove_missing())
+
+    def test_descriptions_without_md5(self):
+        archive_dir = os.path.join(self._tempdir.name, "without_md5")
+        filename = os.path.join(archive_dir, "record.json")
+        self.create_record().write(filename)
+        with open(filename, mode='rt', encoding='utf-8') as file:
+            file_dict = json.load(file)
+        #md5 is optional, a description without the path is invalid
+        del file_dict["data"]["samplingGrids"][0]["data"]["md5"]
+        del file_dict["data"]["dataChannels"][0]["data"]["relativeFilePath"]
+        with open(filename, mode='wt', encoding='utf-8') as file:
+            json.dump(file_dict, file)
+
+        results = spp2086.measurement_data.verify_archive(archive_dir)
+        self.assertListEqual([("grid", "unverifiable"), ("force", "error")], [(result.channel, result.status) for result in results])
+        self.assertIsNone(results[1].external_file)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(1, verification.main([archive_dir]))
+        self.assertIn("1 unverifiable", output.getvalue())
+
+    def test_load_with_checksum_cache(self):
+        filename = os.path.join(self._tempdir.name, "load", "record.json")
+        self.create_record().write(filename)
+
+        with spp2086.measurement_data.ChecksumCache(os.path.join(self._tempdir.name, "load.sqlite")) as cache:
+            record = spp2086.measurement_data.MeasurementRecord.from_filename(filename, checksum_cache=cache)
+            self.assertEqual(2, len(cache))
+            grid_filename = os.path.join(os.path.dirname(filename), "data", "record", "grid.json")
+            stat = os.stat(grid_filename)
+            self.assertEqual(record.data_channels[0]["data"][-1], 999.0)
+
+            #a file that is unchanged since it was verified is trusted, a modified one is hashed again
+            with spp2086.measurement_data.RecordProfiler() as profiler:
+                spp2086.measurement_data.MeasurementRecord.from_filename(filename, checksum_cache=cache)
+            self.assertNotIn("checksum", profiler.summary())
+            with open(grid_filename, mode='r+b') as file:
+                file.write(b" ")
+            os.utime(grid_filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+            self.assertRaises(RuntimeError, spp2086.measurement_data.MeasurementRecord.from_filename, filename, checksum_cache=cache)
+
+            #records loaded in worker processes open the cache again
+            results = list(spp2086.measurement_data.MeasurementRecord.load_many([filename], workers=1, checksum_cache=cache))
+            self.assertIsInstance(results[0].error, RuntimeError)